@@ -0,0 +1,64 @@
+"""
+Benchmarks placing, moving and bulk-removing many objects on a single map.
+
+Run from the repository root with:
+    python -m benchmarks.bench_map_objects [object_count]
+"""
+import contextlib
+import io
+import sys
+import time
+
+from src.map_manager import MapManager
+from src.map_object import MapObject
+
+
+def run(object_count):
+    """Places object_count objects on one map, then moves each of them once."""
+    manager = MapManager()
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager.create_map("bench", 1000, 1000)
+        objects = [MapObject(x=i % 1000, y=i // 1000, layer=1) for i in range(object_count)]
+
+        start = time.perf_counter()
+        for obj in objects:
+            manager.add_object_to_map("bench", obj)
+        placed = time.perf_counter()
+        for obj in objects:
+            manager.move_object("bench", obj.id, obj.x, (obj.y + 1) % 1000)
+        moved = time.perf_counter()
+
+    return placed - start, moved - placed
+
+
+def run_bulk(object_count):
+    """Places object_count objects with a single bulk call, then removes them the same way."""
+    manager = MapManager()
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager.create_map("bench", 1000, 1000)
+        objects = [MapObject(x=i % 1000, y=i // 1000, layer=1) for i in range(object_count)]
+
+        start = time.perf_counter()
+        manager.add_objects("bench", objects)
+        placed = time.perf_counter()
+        manager.remove_objects("bench", [obj.id for obj in objects])
+        removed = time.perf_counter()
+
+    return placed - start, removed - placed
+
+
+def main():
+    target = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    print(f"{'objects':>8} {'place (s)':>10} {'move (s)':>10} {'us/op':>8}")
+    # Doubling the object count should roughly double the time if add/get are O(1)
+    for count in (target // 4, target // 2, target):
+        place_time, move_time = run(count)
+        per_op = (place_time + move_time) / (2 * count) * 1e6
+        print(f"{count:>8} {place_time:>10.3f} {move_time:>10.3f} {per_op:>8.2f}")
+
+    place_time, remove_time = run_bulk(target)
+    print(f"\nBulk add_objects/remove_objects of {target}: {place_time:.3f}s / {remove_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
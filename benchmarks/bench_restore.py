@@ -0,0 +1,60 @@
+"""
+Benchmarks restoring a full game state, as a client does for every
+`full_state` message, and profiles where the time goes.
+
+Run from the repository root with:
+    python -m benchmarks.bench_restore [restores] [objects]
+"""
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import sys
+import time
+
+from benchmarks.bench_save_formats import build_campaign
+from src.engine import Engine
+
+
+def restore(engine, message):
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.load_game_from_dict(json.loads(message)['payload'])
+
+
+def timed_restores(engine, message, count, reload_module):
+    start = time.perf_counter()
+    for _ in range(count):
+        if reload_module:
+            # What every restore used to cost: reading the module and running its scripts
+            engine.active_module = None
+            engine.module_loader._loaded_from.clear()
+        restore(engine, message)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    objects = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    source = build_campaign(1, objects)
+    with contextlib.redirect_stdout(io.StringIO()):
+        source.load_system_module("dnd5e")
+    game_state = source.get_persistence_manager().gather_game_state(source)
+    message = json.dumps({"type": "full_state", "payload": game_state})
+
+    client = Engine()
+    restore(client, message)
+    print(f"{objects} objects, {len(message) / 1024:.0f} KB message, {count} restores")
+    print(f"reloading the module each time: {timed_restores(client, message, count, True) * 1000:8.1f} ms per restore")
+    print(f"reusing the active module:      {timed_restores(client, message, count, False) * 1000:8.1f} ms per restore")
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    timed_restores(client, message, count, False)
+    profiler.disable()
+    print("\nWhere a restore spends its time:")
+    pstats.Stats(profiler).sort_stats('tottime').print_stats(8)
+
+
+if __name__ == "__main__":
+    main()
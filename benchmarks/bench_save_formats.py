@@ -0,0 +1,58 @@
+"""
+Benchmarks saving and loading a campaign in the JSON and binary formats.
+
+Run from the repository root with:
+    python -m benchmarks.bench_save_formats [map_count] [objects_per_map]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from src.engine import Engine
+from src.map_object import MapObject
+
+
+def build_campaign(map_count, objects_per_map):
+    """Returns an engine holding map_count maps of objects_per_map objects each."""
+    engine = Engine()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for m in range(map_count):
+            game_map = engine.get_map_manager().create_map(f"map{m}", 500, 500)
+            game_map.add_objects([MapObject(x=i % 500, y=i // 500, layer=1) for i in range(objects_per_map)])
+    return engine
+
+
+def run(engine, suffix):
+    """Saves and reloads the campaign, returning (save seconds, load seconds, file bytes)."""
+    handle, path = tempfile.mkstemp(suffix=suffix)
+    os.close(handle)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            engine.save_game(path)
+            saved = time.perf_counter()
+            Engine().load_game(path)
+            loaded = time.perf_counter()
+        return saved - start, loaded - saved, os.path.getsize(path)
+    finally:
+        os.remove(path)
+
+
+def main():
+    map_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    objects_per_map = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    engine = build_campaign(map_count, objects_per_map)
+
+    print(f"{map_count} maps x {objects_per_map} objects")
+    print(f"{'format':>8} {'save (s)':>10} {'load (s)':>10} {'size (KB)':>10}")
+    # Loading a binary save only decodes the active map
+    for name, suffix in (("json", ".json"), ("binary", ".vttb")):
+        save_time, load_time, size = run(engine, suffix)
+        print(f"{name:>8} {save_time:>10.3f} {load_time:>10.3f} {size / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmarks building and encoding a full game state snapshot, as a save or
+a websocket join does, on a large map where only a few objects change.
+
+Run from the repository root with:
+    python -m benchmarks.bench_snapshot [objects] [changed]
+"""
+import json
+import sys
+import time
+
+from benchmarks.bench_save_formats import build_campaign
+from src.fragments import encode
+
+
+def snapshot(engine):
+    return encode(engine.get_persistence_manager().gather_game_state(engine))
+
+
+def uncached_snapshot(engine):
+    """What every snapshot cost before fragments: to_dict and json.dumps for everything."""
+    game_map = engine.get_map_manager().get_map("map0")
+    return json.dumps({
+        'entity_manager': {'entities': [e.to_dict() for e in engine.get_entity_manager().list_entities()]},
+        'map_manager': {'maps': {'map0': {
+            'name': game_map.name, 'width': game_map.width, 'height': game_map.height,
+            'objects': [o.to_dict() for o in game_map.objects]
+        }}}
+    }, separators=(',', ':'))
+
+
+def timed(func, *args, repeat=1):
+    """Returns the best of `repeat` timings and the last result."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    objects = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    changed = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    engine = build_campaign(1, objects)
+    game_map = engine.get_map_manager().get_map("map0")
+
+    uncached, _ = timed(uncached_snapshot, engine, repeat=3)
+    first, _ = timed(snapshot, engine)
+    for obj in list(game_map.objects)[:changed]:
+        game_map.move_object(obj.id, obj.x, obj.y + 1)
+    cached, text = timed(snapshot, engine, repeat=3)
+
+    print(f"{objects} objects, {changed} changed between snapshots, {len(text) / 1024:.0f} KB")
+    print(f"{'to_dict + json.dumps every time':<36} {uncached * 1000:8.1f} ms")
+    print(f"{'first snapshot, filling the cache':<36} {first * 1000:8.1f} ms")
+    print(f"{'next snapshot, from cached fragments':<36} {cached * 1000:8.1f} ms  ({uncached / cached:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmarks the SQLite backend against JSON saves of a large campaign.
+
+Run from the repository root with:
+    python -m benchmarks.bench_sqlite_store [object_count] [map_count]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_save_formats import build_campaign
+from src.engine import Engine
+from src.sqlite_store import SQLiteStore
+
+
+def timed(func):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    object_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    map_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    engine = build_campaign(map_count, object_count // map_count)
+    first_map = engine.get_map_manager().get_map("map0")
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "campaign.json")
+        db_path = os.path.join(directory, "campaign.db")
+
+        json_save, _ = timed(lambda: engine.save_game(json_path))
+        db_first_save, _ = timed(lambda: engine.save_game(db_path))
+
+        # A typical turn: a handful of objects move on one map
+        for obj in list(first_map.objects)[:10]:
+            first_map.move_object(obj.id, obj.x, obj.y + 1)
+        json_resave, _ = timed(lambda: engine.save_game(json_path))
+        db_resave, _ = timed(lambda: engine.save_game(db_path))
+
+        json_load, _ = timed(lambda: Engine().load_game(json_path))
+
+        def load_one_map():
+            restored = Engine()
+            restored.load_game(db_path)
+            return restored.get_map_manager().get_map("map0")
+        db_load, _ = timed(load_one_map)
+
+        store = SQLiteStore(db_path)
+        db_query, found = timed(lambda: store.objects_in_rect("map0", 0, 0, 99, 1))
+        store.close()
+
+        print(f"{object_count} objects on {map_count} maps")
+        print(f"{'operation':<34} {'JSON (s)':>9} {'SQLite (s)':>10}")
+        print(f"{'first save':<34} {json_save:>9.3f} {db_first_save:>10.3f}")
+        print(f"{'save after moving 10 objects':<34} {json_resave:>9.3f} {db_resave:>10.3f}")
+        print(f"{'load (SQLite: build one map)':<34} {json_load:>9.3f} {db_load:>10.3f}")
+        print(f"{'query a 100x2 area, no load':<34} {'-':>9} {db_query:>10.4f}  ({len(found)} objects)")
+        print(f"File sizes: JSON {os.path.getsize(json_path) / 1024:.0f} KB, "
+              f"SQLite {os.path.getsize(db_path) / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,31 @@
 import asyncio
 import sys
+import threading
 import uvicorn
 
 from src.engine import Engine
+from src.user import User, UserRole
 from src.network import Server, Client
 from src.server import create_app
 from src.gui.app import App
 import pygame
 
+# Commands are journaled here so a crashed session can be recovered on the next start
+JOURNAL_DIR = "session_journal"
+# Hosted sessions are also saved here in the background
+AUTOSAVE_PATH = "autosave.vttb"
+# How often a local session writes journal entries that have waited too long
+JOURNAL_TICK_SECONDS = 0.25
+
+
+def tick_journal(engine, stop):
+    """Writes overdue journal entries while the local session waits for input."""
+    while not stop.wait(JOURNAL_TICK_SECONDS):
+        engine.tick_journal()
+
 
 async def handle_user_input(client):
-    """Handles user input in a non-blocking way and sends it to the server."""
+    """Handles user input in a non-blocking way: read-only commands run locally, the rest go to the server."""
     loop = asyncio.get_event_loop()
     while True:
         try:
@@ -19,7 +34,7 @@ async def handle_user_input(client):
                 continue
             if user_input.strip().lower() == 'exit':
                 break
-            await client.send_message(user_input)
+            await client.handle_input(user_input)
         except (EOFError, KeyboardInterrupt):
             break
     print("\nExiting.")
@@ -71,11 +86,17 @@ def main():
             print("Error: Could not find the 'dnd5e' module.")
             return
 
+        engine.open_journal(JOURNAL_DIR)
+        engine.start_autosave(AUTOSAVE_PATH)
         app = create_app(engine)
 
         print(f"Starting server on port {port}...")
         print("The GM should connect using a separate client.")
-        uvicorn.run(app, host="0.0.0.0", port=port)
+        try:
+            uvicorn.run(app, host="0.0.0.0", port=port)
+        finally:
+            engine.stop_autosave()
+            engine.close_journal()
 
     elif mode == "connect":
         try:
@@ -94,6 +115,10 @@ def main():
         print("Starting local single-player session...")
         engine = Engine()
         engine.load_system_module("dnd5e")
+        engine.open_journal(JOURNAL_DIR)
+        stop_ticking = threading.Event()
+        threading.Thread(target=tick_journal, args=(engine, stop_ticking), daemon=True).start()
+        gm = User("GM", UserRole.GM)
         # You can add a local CLI loop here if needed
         print("Local session started. Type 'exit' to quit.")
         while True:
@@ -101,9 +126,11 @@ def main():
                 cmd = input("> ")
                 if cmd.strip().lower() == "exit":
                     break
-                engine.execute_command(cmd)
+                engine.execute_command(cmd, gm)
             except (KeyboardInterrupt, EOFError):
                 break
+        stop_ticking.set()
+        engine.close_journal()
         print("Local session ended.")
 
     else:
@@ -0,0 +1,152 @@
+import math
+from enum import Enum, auto
+from functools import lru_cache
+
+from .hex import Hex, OffsetCoord, roffset_to_cube, roffset_from_cube, hex_distance
+from .map import GridType
+from .token import Token
+
+# Tolerance for cells whose centre falls exactly on a template edge
+EPSILON = 1e-9
+SQRT3_2 = math.sqrt(3) / 2
+
+
+class TemplateShape(Enum):
+    SPHERE = auto()
+    CONE = auto()
+    LINE = auto()
+    CUBE = auto()
+
+
+def _normalize_direction(shape, direction):
+    """Directions are whole degrees; spheres ignore them so they share one cache entry."""
+    if shape == TemplateShape.SPHERE:
+        return 0
+    return int(round(direction)) % 360
+
+
+def _cell_center(grid_type, a, b):
+    """
+    Returns the continuous position of a relative cell, with neighbouring
+    cells one unit apart. Square cells are (dx, dy); hex cells are axial (dq, dr).
+    """
+    if grid_type == GridType.HEX:
+        return a + b / 2, b * SQRT3_2
+    return float(a), float(b)
+
+
+def _covers(grid_type, shape, size, dir_x, dir_y, a, b):
+    """Returns True if the relative cell (a, b) lies inside the template."""
+    if shape == TemplateShape.SPHERE:
+        if grid_type == GridType.HEX:
+            return hex_distance(Hex(a, b, -a - b), Hex(0, 0, 0)) <= size
+        return a * a + b * b <= size * size + EPSILON
+
+    # The other shapes extend away from the origin along the direction
+    x, y = _cell_center(grid_type, a, b)
+    forward = x * dir_x + y * dir_y
+    lateral = -x * dir_y + y * dir_x
+    if forward <= EPSILON or forward > size + EPSILON:
+        return False
+
+    if shape == TemplateShape.CONE:
+        # As wide as it is far from the origin
+        return abs(lateral) <= forward / 2 + EPSILON
+    if shape == TemplateShape.LINE:
+        return abs(lateral) <= 0.5 + EPSILON
+    if shape == TemplateShape.CUBE:
+        # A half-open interval keeps even-sized cubes exactly size cells wide
+        return -size / 2 - EPSILON <= lateral < size / 2 - EPSILON
+    raise ValueError(f"Unknown template shape: {shape}")
+
+
+@lru_cache(maxsize=256)
+def template_offsets(grid_type, shape, size, direction=0):
+    """
+    Returns the cells covered by a template relative to its origin, as a
+    frozenset of (dx, dy) on square grids or axial (dq, dr) on hex grids.
+
+    Args:
+        grid_type (GridType): The grid the template is laid on.
+        shape (TemplateShape): The template shape.
+        size (int): Radius for spheres, length for cones and lines, edge for cubes, in cells.
+        direction (int): Degrees clockwise from east (screen coordinates, y down).
+            Ignored for spheres.
+
+    Results are cached per (grid type, shape, size, direction), so repeated
+    casts only pay for translating the mask to a new origin.
+    """
+    direction = _normalize_direction(shape, direction)
+    angle = math.radians(direction)
+    dir_x, dir_y = math.cos(angle), math.sin(angle)
+
+    reach = size + 1
+    return frozenset(
+        (a, b)
+        for b in range(-reach, reach + 1)
+        for a in range(-reach, reach + 1)
+        if _covers(grid_type, shape, size, dir_x, dir_y, a, b)
+    )
+
+
+def template_cells(game_map, shape, origin, size, direction=0):
+    """
+    Returns the set of (x, y) cells of a map covered by a template cast from origin.
+    Cells outside the map are dropped.
+    """
+    offsets = template_offsets(game_map.grid_type, shape, size, _normalize_direction(shape, direction))
+    ox, oy = origin
+
+    cells = set()
+    if game_map.grid_type == GridType.HEX:
+        center = roffset_to_cube(OffsetCoord(ox, oy))
+        for dq, dr in offsets:
+            q, r = center.q + dq, center.r + dr
+            cell = roffset_from_cube(Hex(q, r, -q - r))
+            if 0 <= cell.col < game_map.width and 0 <= cell.row < game_map.height:
+                cells.add((cell.col, cell.row))
+    else:
+        for dx, dy in offsets:
+            x, y = ox + dx, oy + dy
+            if 0 <= x < game_map.width and 0 <= y < game_map.height:
+                cells.add((x, y))
+    return cells
+
+
+def tokens_in_template(game_map, shape, origin, size, direction=0):
+    """Returns the tokens whose footprint overlaps a template, looked up through the map's spatial index."""
+    cells = template_cells(game_map, shape, origin, size, direction)
+    return [obj for obj in game_map.objects_in_cells(cells) if isinstance(obj, Token)]
+
+
+def rect_cells(x0, y0, x1, y1, outline=False):
+    """Returns the cells of the inclusive rectangle (x0, y0)-(x1, y1), or only its border."""
+    x0, x1 = sorted((x0, x1))
+    y0, y1 = sorted((y0, y1))
+    return [
+        (x, y)
+        for y in range(y0, y1 + 1)
+        for x in range(x0, x1 + 1)
+        if not outline or x in (x0, x1) or y in (y0, y1)
+    ]
+
+
+def line_cells(x0, y0, x1, y1):
+    """Returns the cells on the straight line from (x0, y0) to (x1, y1) (Bresenham)."""
+    cells = []
+    dx, dy = abs(x1 - x0), -abs(y1 - y0)
+    step_x = 1 if x0 < x1 else -1
+    step_y = 1 if y0 < y1 else -1
+    error = dx + dy
+    x, y = x0, y0
+    while True:
+        cells.append((x, y))
+        if (x, y) == (x1, y1):
+            return cells
+        doubled = 2 * error
+        if doubled >= dy:
+            error += dy
+            x += step_x
+        if doubled <= dx:
+            error += dx
+            y += step_y
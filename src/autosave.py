@@ -0,0 +1,158 @@
+import threading
+import time
+
+
+class AutosaveService:
+    """
+    Saves the game on a worker thread so the engine never waits for a save.
+
+    A save has two halves. The snapshot, gathering the game state into plain
+    dictionaries, runs on the engine thread between commands, so it sees one
+    consistent state; it is the cheap half. Encoding the snapshot and writing
+    it to disk, the expensive half, happens on the worker thread, through a
+    temporary file that replaces the save once it is complete.
+
+    A save is taken automatically once `change_threshold` state-changing
+    commands have run, or when `tick` is called `interval` seconds or more
+    after the last save and something has changed since. Either trigger can be
+    turned off by setting it to None. Saves requested while the worker is
+    still writing are merged: only the newest snapshot waiting for each path
+    is written.
+
+    Only JSON and binary saves are supported; a SQLite database is updated in
+    place and has no file to replace.
+    """
+
+    def __init__(self, engine, filepath, interval=300.0, change_threshold=50):
+        persistence_manager = engine.get_persistence_manager()
+        if persistence_manager.is_database(filepath):
+            raise ValueError("Autosave writes JSON or binary saves, not databases.")
+        self.engine = engine
+        self.filepath = filepath
+        self.interval = interval
+        self.change_threshold = change_threshold
+        self.changes = 0
+        self._last_save = time.monotonic()
+
+        # Metrics, in seconds and bytes
+        self.saves = 0
+        self.failures = 0
+        self.merged = 0
+        self.last_error = None
+        self.last_snapshot_seconds = 0.0
+        self.last_write_seconds = 0.0
+        self.max_write_seconds = 0.0
+        self.total_write_seconds = 0.0
+        self.last_bytes = 0
+
+        self._condition = threading.Condition()
+        self._pending = {}  # path -> newest snapshot waiting to be written
+        self._writing = False
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def record_change(self):
+        """Counts one state-changing command, saving once enough have run."""
+        self.changes += 1
+        if self.change_threshold is not None and self.changes >= self.change_threshold:
+            self.save_now()
+
+    def tick(self):
+        """Saves if the interval has passed and the game changed since the last save."""
+        if self.interval is None or not self.changes:
+            return False
+        if time.monotonic() - self._last_save < self.interval:
+            return False
+        self.save_now()
+        return True
+
+    def save_now(self, filepath=None):
+        """
+        Takes a snapshot of the game and hands it to the worker thread. Must
+        be called from the thread that runs the engine.
+
+        Returns:
+            float: The seconds the snapshot took, which is all the caller waits for.
+        """
+        if self._stopping:
+            raise RuntimeError("The autosave service has been stopped.")
+        filepath = filepath or self.filepath
+        start = time.perf_counter()
+        game_state = self.engine.get_persistence_manager().gather_game_state(self.engine)
+        self.last_snapshot_seconds = time.perf_counter() - start
+        if filepath == self.filepath:
+            self.changes = 0
+            self._last_save = time.monotonic()
+
+        with self._condition:
+            if filepath in self._pending:
+                self.merged += 1
+            self._pending[filepath] = game_state
+            self._condition.notify_all()
+        return self.last_snapshot_seconds
+
+    def wait(self, timeout=None):
+        """Blocks until every snapshot handed over so far is written. Returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def stop(self):
+        """Writes any waiting snapshot and stops the worker thread."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        persistence_manager = self.engine.get_persistence_manager()
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._stopping)
+                if not self._pending:
+                    return
+                filepath = next(iter(self._pending))
+                game_state = self._pending.pop(filepath)
+                self._writing = True
+
+            start = time.perf_counter()
+            try:
+                size = persistence_manager.write_file(game_state, filepath)
+                error = None
+            except (OSError, ValueError, TypeError) as e:
+                size, error = 0, e
+            elapsed = time.perf_counter() - start
+
+            with self._condition:
+                if error is None:
+                    self.saves += 1
+                    self.last_bytes = size
+                    self.last_write_seconds = elapsed
+                    self.max_write_seconds = max(self.max_write_seconds, elapsed)
+                    self.total_write_seconds += elapsed
+                else:
+                    self.failures += 1
+                    self.last_error = f"{filepath}: {error}"
+                self._writing = False
+                self._condition.notify_all()
+
+    def metrics(self):
+        """Returns the save counts and durations as a dictionary."""
+        with self._condition:
+            return {
+                'saves': self.saves,
+                'failures': self.failures,
+                'merged': self.merged,
+                'pending': len(self._pending) + self._writing,
+                'changes_since_save': self.changes,
+                'last_snapshot_seconds': self.last_snapshot_seconds,
+                'last_write_seconds': self.last_write_seconds,
+                'max_write_seconds': self.max_write_seconds,
+                'average_write_seconds': self.total_write_seconds / self.saves if self.saves else 0.0,
+                'last_bytes': self.last_bytes,
+                'last_error': self.last_error
+            }
@@ -0,0 +1,129 @@
+import json
+import struct
+import zlib
+
+from .map_manager import DeferredMap
+from .fragments import encode
+
+MAGIC = b'VTTB'
+FORMAT_VERSION = 1
+BINARY_EXTENSIONS = ('.vttb',)
+
+_HEADER = struct.Struct('<4sHI')     # magic, format version, section count
+_NAME_LENGTH = struct.Struct('<H')
+_LOCATION = struct.Struct('<QQ')     # offset from the start of the file, length
+
+META_SECTION = 'meta'
+ENTITIES_SECTION = 'entities'
+INITIATIVE_SECTION = 'initiative'
+MAP_SECTION_PREFIX = 'map:'
+
+
+def _encode(data):
+    return zlib.compress(encode(data).encode('utf-8'))
+
+
+def _decode(payload):
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+
+def write_binary_save(game_state, filepath):
+    """
+    Writes a game state as a sectioned binary file.
+
+    The file starts with a header and a table of (name, offset, length)
+    entries, followed by one zlib-compressed compact JSON section each for
+    the metadata, the entities, the initiative tracker and every map, so a
+    reader can decode any one of them without touching the others.
+    """
+    map_manager_state = dict(game_state.get('map_manager', {}))
+    maps = map_manager_state.pop('maps', {})
+
+    map_index = []
+    sections = []
+    for name, map_data in maps.items():
+        section = MAP_SECTION_PREFIX + name
+        template = map_data.get('template') if map_data.get('map_type') == 'instance' else None
+        map_index.append({'name': name, 'section': section, 'template': template})
+        sections.append((section, _encode(map_data)))
+
+    meta = {key: value for key, value in game_state.items()
+            if key not in ('entity_manager', 'initiative_tracker', 'map_manager')}
+    meta['map_manager'] = map_manager_state
+    meta['maps'] = map_index
+    sections.insert(0, (META_SECTION, _encode(meta)))
+    sections.insert(1, (ENTITIES_SECTION, _encode(game_state.get('entity_manager', {}))))
+    sections.insert(2, (INITIATIVE_SECTION, _encode(game_state.get('initiative_tracker', {}))))
+
+    names = [name.encode('utf-8') for name, _ in sections]
+    offset = _HEADER.size + sum(_NAME_LENGTH.size + len(name) + _LOCATION.size for name in names)
+    table = bytearray()
+    for name, (_, payload) in zip(names, sections):
+        table += _NAME_LENGTH.pack(len(name)) + name + _LOCATION.pack(offset, len(payload))
+        offset += len(payload)
+
+    with open(filepath, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections)))
+        f.write(table)
+        for _, payload in sections:
+            f.write(payload)
+
+
+class BinarySaveReader:
+    """
+    Reads the section table of a binary save. The raw, still compressed
+    bytes are held in memory and each section is decoded when asked for.
+    """
+
+    def __init__(self, filepath):
+        with open(filepath, 'rb') as f:
+            self._data = f.read()
+
+        if len(self._data) < _HEADER.size:
+            raise ValueError(f"{filepath} is too short to be a binary save.")
+        magic, version, count = _HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{filepath} is not a binary save.")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{filepath} uses binary save format {version}; this version reads up to {FORMAT_VERSION}.")
+
+        self._sections = {}
+        position = _HEADER.size
+        for _ in range(count):
+            (name_length,) = _NAME_LENGTH.unpack_from(self._data, position)
+            position += _NAME_LENGTH.size
+            name = self._data[position:position + name_length].decode('utf-8')
+            position += name_length
+            self._sections[name] = _LOCATION.unpack_from(self._data, position)
+            position += _LOCATION.size
+
+    @property
+    def section_names(self):
+        return list(self._sections)
+
+    def read_section(self, name):
+        """Decodes one section. Raises KeyError if the file has no such section."""
+        offset, length = self._sections[name]
+        return _decode(self._data[offset:offset + length])
+
+    def game_state(self):
+        """
+        Returns the game state with its maps deferred: each one is decoded
+        only when the map manager first builds it.
+        """
+        meta = self.read_section(META_SECTION)
+        map_manager_state = dict(meta.pop('map_manager', {}))
+        map_manager_state['maps'] = {
+            entry['name']: DeferredMap(lambda section=entry['section']: self.read_section(section), entry['template'])
+            for entry in meta.pop('maps', [])
+        }
+        game_state = meta
+        game_state['entity_manager'] = self.read_section(ENTITIES_SECTION)
+        game_state['initiative_tracker'] = self.read_section(INITIATIVE_SECTION)
+        game_state['map_manager'] = map_manager_state
+        return game_state
+
+
+def read_binary_save(filepath):
+    """Reads a binary save. Maps in the returned state are DeferredMaps."""
+    return BinarySaveReader(filepath).game_state()
@@ -0,0 +1,844 @@
+import hashlib
+import json
+import os
+from collections import ChainMap, Counter, OrderedDict
+from functools import wraps
+
+from .hex import OffsetCoord, roffset_neighbors
+from .fragments import encode
+from .group import Group, group_subtree, check_group_members
+from .map import Map, GridType
+from .terrain import TerrainLayer
+from .occupancy import occupies, find_move_conflicts
+from .map_events import (
+    MapEventSource, ObjectMove, ObjectsAdded, ObjectsRemoved, ObjectsMoved, PropertyChanged, TerrainChanged
+)
+
+# Rough per-object overhead used to estimate how much memory a loaded chunk holds
+OBJECT_MEMORY_ESTIMATE = 600
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+
+def _within_budget(method):
+    """
+    Evicts chunks over the memory budget once the outermost public call
+    returns, so chunks are never dropped while an operation still uses them.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        chunked_map = getattr(self, '_map', self)
+        chunked_map._call_depth += 1
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            chunked_map._call_depth -= 1
+            if chunked_map._call_depth == 0:
+                chunked_map._enforce_budget()
+    return wrapper
+
+
+class ChunkedMap(MapEventSource):
+    """
+    A very large map whose objects and terrain are split into fixed-size
+    square chunks stored on disk.
+
+    Chunks are only deserialized when a query or mutation touches them, and
+    the least recently used chunks are written back and dropped once the
+    estimated memory of the loaded chunks passes the budget. It offers the
+    same interface as Map, but anything that walks every object (objects,
+    iter_draw_order) loads every chunk and should be avoided on large maps.
+
+    Each chunk is stored as a small Map whose objects keep their world
+    coordinates; objects belong to the chunk containing their anchor cell.
+    Changes are reported through the same version counter and events as Map.
+    """
+
+    def __init__(self, name, width, height, store_dir, chunk_size=64,
+                 grid_type=GridType.SQUARE, background_asset_path=None,
+                 memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.store_dir = store_dir
+        self.chunk_size = chunk_size
+        self.grid_type = grid_type
+        self.background_asset_path = background_asset_path
+        self.memory_budget = memory_budget
+
+        self._loaded = OrderedDict()   # (cx, cy) -> Map, least recently used first
+        self._signatures = {}          # (cx, cy) -> digest of the chunk as last stored
+        self._object_chunks = {}       # object_id -> (cx, cy)
+        self._chunk_object_counts = Counter()
+        self._object_order = {}        # object_id -> draw order sequence number, across chunks
+        self._next_order = 0
+        self._group_parent = {}        # member_id -> ID of the group holding it, across chunks
+        self._max_object_size = 1
+        self._call_depth = 0
+        self._distances = None
+        self.terrain = ChunkedTerrain(self)
+        self._init_events()
+
+        os.makedirs(os.path.join(self.store_dir, "chunks"), exist_ok=True)
+        self._read_manifest()
+
+    # --- Chunk storage ---
+
+    def _manifest_path(self):
+        return os.path.join(self.store_dir, "manifest.json")
+
+    def _chunk_path(self, key):
+        return os.path.join(self.store_dir, "chunks", f"{key[0]}_{key[1]}.json")
+
+    def _read_manifest(self):
+        if not os.path.exists(self._manifest_path()):
+            return
+        with open(self._manifest_path(), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        self._object_chunks = {obj_id: tuple(key) for obj_id, key in manifest.get('object_chunks', {}).items()}
+        self._chunk_object_counts = Counter(self._object_chunks.values())
+        # Stores written before the draw order was kept fall back to the order objects were filed in
+        order = manifest.get('object_order') or {obj_id: seq for seq, obj_id in enumerate(self._object_chunks)}
+        self._object_order = dict(order)
+        self._next_order = max(self._object_order.values(), default=-1) + 1
+        self._group_parent = manifest.get('group_parents', {})
+        self._max_object_size = manifest.get('max_object_size', 1)
+
+    def _write_manifest(self):
+        """Writes the object index, replacing the previous one only once it is complete."""
+        manifest = {
+            'object_chunks': {obj_id: list(key) for obj_id, key in self._object_chunks.items()},
+            'object_order': self._object_order,
+            'group_parents': self._group_parent,
+            'max_object_size': self._max_object_size
+        }
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._manifest_path())
+
+    def _new_chunk(self, key):
+        return Map(
+            name=f"{self.name}[{key[0]},{key[1]}]",
+            width=self.chunk_size,
+            height=self.chunk_size,
+            grid_type=self.grid_type
+        )
+
+    def _chunk(self, key):
+        """Returns a chunk, loading it from disk on first access."""
+        chunk = self._loaded.get(key)
+        if chunk is not None:
+            self._loaded.move_to_end(key)
+            return chunk
+
+        path = self._chunk_path(key)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            chunk = Map.from_dict(json.loads(text))
+            self._signatures[key] = hashlib.sha1(text.encode('utf-8')).digest()
+        else:
+            chunk = self._new_chunk(key)
+            self._signatures[key] = None
+        self._loaded[key] = chunk
+        return chunk
+
+    def _store_chunk(self, key, chunk):
+        """
+        Writes a chunk back to disk if its contents changed since it was loaded or stored.
+
+        Returns:
+            bool: True if the chunk's file was written or deleted.
+        """
+        path = self._chunk_path(key)
+        if not chunk.objects and chunk.terrain.is_default():
+            self._signatures[key] = None
+            if os.path.exists(path):
+                os.remove(path)
+                return True
+            return False
+
+        # Objects can be mutated in place, so compare serialized contents rather than trusting flags
+        text = encode(chunk.to_dict())
+        signature = hashlib.sha1(text.encode('utf-8')).digest()
+        if signature == self._signatures.get(key):
+            return False
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        self._signatures[key] = signature
+        return True
+
+    def _chunk_memory(self, chunk):
+        return chunk.terrain.cells.nbytes + len(chunk.objects) * OBJECT_MEMORY_ESTIMATE
+
+    def _enforce_budget(self):
+        """
+        Stores and drops the least recently used chunks until the loaded ones
+        fit the budget. If any chunk was written, the object index is written
+        too, so the store on disk stays in step with the chunks it holds.
+        """
+        used = sum(self._chunk_memory(chunk) for chunk in self._loaded.values())
+        written = False
+        # The most recently used chunk always stays loaded
+        while used > self.memory_budget and len(self._loaded) > 1:
+            key, chunk = self._loaded.popitem(last=False)
+            written |= self._store_chunk(key, chunk)
+            self._signatures.pop(key, None)
+            used -= self._chunk_memory(chunk)
+        if written:
+            self._write_manifest()
+
+    def flush(self):
+        """Writes every changed loaded chunk and the object index to disk."""
+        for key, chunk in self._loaded.items():
+            self._store_chunk(key, chunk)
+        self._write_manifest()
+
+    @property
+    def loaded_chunks(self):
+        """The keys of the chunks currently held in memory, least recently used first."""
+        return list(self._loaded.keys())
+
+    def chunk_key(self, x, y):
+        """Returns the (cx, cy) key of the chunk containing a cell."""
+        return x // self.chunk_size, y // self.chunk_size
+
+    def _file_object(self, object_id, key):
+        """
+        Records which chunk an object is filed under (None to forget it). A new
+        object is placed above every other one in the draw order; refiling an
+        object keeps its place.
+        """
+        old_key = self._object_chunks.pop(object_id, None)
+        if old_key is not None:
+            self._chunk_object_counts[old_key] -= 1
+            if not self._chunk_object_counts[old_key]:
+                del self._chunk_object_counts[old_key]
+        if key is None:
+            self._object_order.pop(object_id, None)
+        elif old_key is None:
+            self._raise_to_top(object_id)
+        if key is not None:
+            self._object_chunks[object_id] = key
+            self._chunk_object_counts[key] += 1
+
+    def _chunks_for_rect(self, x0, y0, x1, y1):
+        """
+        Yields the chunks that may hold objects overlapping the inclusive
+        rectangle. Chunks without objects are skipped and never loaded.
+        """
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        # Objects are filed under their anchor, but large footprints reach right and down
+        reach = self._max_object_size - 1
+        cx0, cy0 = self.chunk_key(max(x0 - reach, 0), max(y0 - reach, 0))
+        cx1, cy1 = self.chunk_key(min(x1, self.width - 1), min(y1, self.height - 1))
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                if (cx, cy) in self._chunk_object_counts:
+                    yield self._chunk((cx, cy))
+
+    def _raise_to_top(self, object_id):
+        self._object_order[object_id] = self._next_order
+        self._next_order += 1
+
+    def _merge_layer_order(self, results):
+        """
+        Combines per-chunk results into draw order: by layer, then by the order
+        objects were added to the map, as Map does. The chunks' own orders
+        cannot be used, as an object refiled into a chunk comes last there.
+        """
+        return sorted(results, key=lambda o: (o.layer, self._object_order[o.id]))
+
+    # --- Map interface ---
+
+    @property
+    def objects(self):
+        """A view over every object of the map. Iterating it loads every chunk that holds objects."""
+        return ChunkedObjectsView(self)
+
+    @_within_budget
+    def add_object(self, obj):
+        """Adds an object to the map. Objects whose ID is already present are ignored."""
+        if obj.id in self._object_chunks:
+            return
+        if isinstance(obj, Group):
+            check_group_members(obj.id, obj.object_ids, self._group_parent)
+        key = self.chunk_key(obj.x, obj.y)
+        self._chunk(key).add_object(obj)
+        self._file_object(obj.id, key)
+        self._track_group(obj)
+        self._max_object_size = max(self._max_object_size, obj.size or 1)
+        self._emit(ObjectsAdded, objects=(obj,))
+
+    @_within_budget
+    def remove_object(self, object_id):
+        """Removes an object from the map by its ID. Raises ValueError if not found."""
+        key = self._object_chunks.get(object_id)
+        if key is None:
+            raise ValueError(f"Object with ID '{object_id}' not found on map '{self.name}'.")
+        obj = self._chunk(key).release_object(object_id)
+        self._file_object(object_id, None)
+        self._untrack_group(obj)
+        self._emit(ObjectsRemoved, objects=(obj,))
+
+    @_within_budget
+    def add_objects(self, objs):
+        """
+        Adds many objects in one batch, one chunk at a time. Returns the objects that were added.
+        Groups are checked first, so a batch that would form a cycle raises ValueError and adds nothing.
+        """
+        by_chunk = {}
+        parents = ChainMap({}, self._group_parent)
+        for obj in objs:
+            if obj.id in self._object_chunks:
+                continue
+            if isinstance(obj, Group):
+                check_group_members(obj.id, obj.object_ids, parents)
+                parents.maps[0].update(dict.fromkeys(obj.object_ids, obj.id))
+            by_chunk.setdefault(self.chunk_key(obj.x, obj.y), []).append(obj)
+
+        added = []
+        for key, chunk_objs in by_chunk.items():
+            for obj in self._chunk(key).add_objects(chunk_objs):
+                self._file_object(obj.id, key)
+                self._track_group(obj)
+                self._max_object_size = max(self._max_object_size, obj.size or 1)
+                added.append(obj)
+        if added:
+            self._emit(ObjectsAdded, objects=tuple(added))
+        return added
+
+    @_within_budget
+    def remove_objects(self, object_ids):
+        """Removes many objects by ID in one batch. Unknown IDs are skipped. Returns the removed objects."""
+        by_chunk = {}
+        for object_id in object_ids:
+            key = self._object_chunks.get(object_id)
+            if key is not None:
+                by_chunk.setdefault(key, []).append(object_id)
+
+        removed = []
+        for key, ids in by_chunk.items():
+            chunk = self._chunk(key)
+            for object_id in ids:
+                obj = chunk.release_object(object_id)
+                self._file_object(object_id, None)
+                removed.append(obj)
+        for obj in removed:
+            self._untrack_group(obj)
+        if removed:
+            self._emit(ObjectsRemoved, objects=tuple(removed))
+        return removed
+
+    @_within_budget
+    def replace_objects(self, objs):
+        """
+        Brings objects up to date from their copies made elsewhere. See
+        Map.replace_objects. An object whose copy lies in another chunk is
+        refiled there; one whose layer changed goes above the objects on it.
+
+        Returns:
+            list: The objects that were added rather than replaced.
+        """
+        replaced, old_objs, new_objs = [], [], []
+        for obj in objs:
+            key = self._object_chunks.get(obj.id)
+            if key is None:
+                new_objs.append(obj)
+                continue
+            chunk = self._chunk(key)
+            old = chunk.get_object(obj.id)
+            new_key = self.chunk_key(obj.x, obj.y)
+            if new_key == key:
+                chunk._replace(obj)
+            else:
+                chunk.release_object(obj.id)
+                self._chunk(new_key).add_object(obj)
+                self._file_object(obj.id, new_key)
+            if obj.layer != old.layer:
+                self._raise_to_top(obj.id)
+            if isinstance(old, Group):
+                for member_id in old.object_ids:
+                    if self._group_parent.get(member_id) == obj.id:
+                        del self._group_parent[member_id]
+            self._track_group(obj)
+            self._max_object_size = max(self._max_object_size, obj.size or 1)
+            replaced.append(obj)
+            old_objs.append(old)
+        if replaced:
+            self._emit(ObjectsRemoved, objects=tuple(old_objs))
+            self._emit(ObjectsAdded, objects=tuple(replaced))
+        return self.add_objects(new_objs)
+
+    @_within_budget
+    def get_object(self, object_id):
+        """Retrieves an object from the map by its ID, loading only its chunk."""
+        key = self._object_chunks.get(object_id)
+        if key is None:
+            return None
+        return self._chunk(key).get_object(object_id)
+
+    @_within_budget
+    def move_object(self, object_id, new_x, new_y):
+        """Moves an object to new coordinates, refiling it if it crosses into another chunk."""
+        if object_id not in self._object_chunks:
+            raise ValueError(f"Object with ID '{object_id}' not found on map '{self.name}'.")
+        obj, move = self._relocate(object_id, new_x, new_y)
+        self._emit(ObjectsMoved, moves=(move,))
+        return obj
+
+    def _relocate(self, object_id, new_x, new_y):
+        """Moves a known object without emitting an event. Returns the object and its ObjectMove."""
+        key = self._object_chunks[object_id]
+        new_key = self.chunk_key(new_x, new_y)
+        chunk = self._chunk(key)
+        obj = chunk.get_object(object_id)
+        move = ObjectMove(object_id, (obj.x, obj.y), (new_x, new_y))
+        if new_key == key:
+            return chunk.move_object(object_id, new_x, new_y), move
+
+        obj = chunk.release_object(object_id)
+        obj.x, obj.y = new_x, new_y
+        self._chunk(new_key).add_object(obj)
+        self._file_object(object_id, new_key)
+        return obj, move
+
+    def _track_group(self, obj):
+        if isinstance(obj, Group):
+            for member_id in obj.object_ids:
+                self._group_parent[member_id] = obj.id
+
+    def _untrack_group(self, obj):
+        """Forgets a removed object's memberships and drops it from the group that held it."""
+        if isinstance(obj, Group):
+            for member_id in obj.object_ids:
+                if self._group_parent.get(member_id) == obj.id:
+                    del self._group_parent[member_id]
+        parent_id = self._group_parent.pop(obj.id, None)
+        parent = self.get_object(parent_id) if parent_id is not None else None
+        if parent is not None and obj.id in parent.object_ids:
+            before = list(parent.object_ids)
+            self._chunk(self._object_chunks[parent_id]).remove_from_group(parent_id, [obj.id])
+            self._emit(PropertyChanged, object_id=parent_id, name='object_ids',
+                       before=before, after=list(parent.object_ids))
+
+    def _get_group(self, group_id):
+        group = self.get_object(group_id)
+        if not isinstance(group, Group):
+            raise ValueError(f"Group with ID '{group_id}' not found on map '{self.name}'.")
+        return group
+
+    @_within_budget
+    def move_group(self, group_id, new_x, new_y):
+        """
+        Moves a group and every object below it by the same offset. The subtree
+        is resolved first, so a missing member or a cycle raises ValueError and
+        moves nothing. Returns the moved objects, the group first.
+        """
+        group = self._get_group(group_id)
+        members = group_subtree(group, self.get_object)
+        dx = new_x - group.x
+        dy = new_y - group.y
+        moved, moves = [], []
+        for obj in [group] + members:
+            obj, move = self._relocate(obj.id, obj.x + dx, obj.y + dy)
+            moved.append(obj)
+            moves.append(move)
+        self._emit(ObjectsMoved, moves=tuple(moves))
+        return moved
+
+    @_within_budget
+    def add_to_group(self, group_id, member_ids):
+        """Adds objects to a group. Raises ValueError if that would form a cycle."""
+        group = self._get_group(group_id)
+        member_ids = [m for m in member_ids if m not in group.object_ids]
+        check_group_members(group_id, member_ids, self._group_parent)
+        if not member_ids:
+            return
+        before = list(group.object_ids)
+        self._chunk(self._object_chunks[group_id]).add_to_group(group_id, member_ids)
+        for member_id in member_ids:
+            self._group_parent[member_id] = group_id
+        self._emit(PropertyChanged, object_id=group_id, name='object_ids', before=before, after=list(group.object_ids))
+
+    @_within_budget
+    def remove_from_group(self, group_id, member_ids):
+        """Removes objects from a group, leaving them on the map."""
+        group = self._get_group(group_id)
+        before = list(group.object_ids)
+        self._chunk(self._object_chunks[group_id]).remove_from_group(group_id, member_ids)
+        for member_id in member_ids:
+            if self._group_parent.get(member_id) == group_id:
+                del self._group_parent[member_id]
+        if group.object_ids != before:
+            self._emit(PropertyChanged, object_id=group_id, name='object_ids',
+                       before=before, after=list(group.object_ids))
+
+    def parent_group(self, object_id):
+        """Returns the ID of the group directly holding an object, or None."""
+        return self._group_parent.get(object_id)
+
+    @_within_budget
+    def group_members(self, group_id):
+        """Returns every object below a group, nested groups included."""
+        return group_subtree(self._get_group(group_id), self.get_object)
+
+    @_within_budget
+    def group_bounds(self, group_id):
+        """
+        Returns the inclusive bounding box (x0, y0, x1, y1) of a group's members.
+        Members may live in other chunks, so the box is computed on every call.
+        """
+        group = self._get_group(group_id)
+        # Like Map, empty groups count as their own anchor
+        leaves = [obj for obj in group_subtree(group, self.get_object)
+                  if not isinstance(obj, Group) or not obj.object_ids] or [group]
+        return (min(o.x for o in leaves), min(o.y for o in leaves),
+                max(o.x + o.size - 1 for o in leaves), max(o.y + o.size - 1 for o in leaves))
+
+    @_within_budget
+    def occupants_at(self, x, y):
+        """Returns the tokens and movement-blocking objects covering a cell."""
+        return [obj for obj in self.objects_at(x, y) if occupies(obj)]
+
+    @_within_budget
+    def check_move(self, object_id, new_x, new_y):
+        """Checks whether an object's footprint fits at new coordinates. See Map.check_move."""
+        obj = self.get_object(object_id)
+        if obj is None:
+            raise ValueError(f"Object with ID '{object_id}' not found on map '{self.name}'.")
+        return find_move_conflicts(self, obj, new_x, new_y, self.occupants_at)
+
+    @_within_budget
+    def token_distances(self, rule=None):
+        """Returns the distances between all tokens. See Map.token_distances. Loads every chunk."""
+        from .distance import DistanceCache, DistanceRule  # distance imports the map module
+        if self._distances is None:
+            self._distances = DistanceCache()
+        return self._distances.get(self, rule or DistanceRule.CHEBYSHEV)
+
+    @_within_budget
+    def set_object_layer(self, object_id, layer):
+        """Moves an object to another layer, above the objects already on it."""
+        key = self._object_chunks.get(object_id)
+        if key is None:
+            raise ValueError(f"Object with ID '{object_id}' not found on map '{self.name}'.")
+        chunk = self._chunk(key)
+        before = chunk.get_object(object_id).layer
+        chunk.set_object_layer(object_id, layer)
+        self._raise_to_top(object_id)
+        self._emit(PropertyChanged, object_id=object_id, name='layer', before=before, after=layer)
+
+    @_within_budget
+    def set_object_property(self, object_id, name, value):
+        """Changes one attribute of an object. See Map.set_object_property."""
+        if name == 'layer':
+            self.set_object_layer(object_id, value)
+            return
+        key = self._object_chunks.get(object_id)
+        if key is None:
+            raise ValueError(f"Object with ID '{object_id}' not found on map '{self.name}'.")
+        chunk = self._chunk(key)
+        before = getattr(chunk.get_object(object_id), name, None)
+        chunk.set_object_property(object_id, name, value)
+        if name == 'size':
+            self._max_object_size = max(self._max_object_size, value or 1)
+        self._emit(PropertyChanged, object_id=object_id, name=name, before=before, after=value)
+
+    @property
+    def triggers(self):
+        """Chunked maps have no triggers."""
+        return []
+
+    def get_trigger(self, trigger_id):
+        return None
+
+    def add_trigger(self, trigger):
+        """Triggers would need an index spanning every chunk, so they are not supported here."""
+        raise ValueError(f"Map '{self.name}' is a chunked map; triggers are not supported on chunked maps.")
+
+    def remove_trigger(self, trigger_id):
+        raise ValueError(f"Trigger with ID '{trigger_id}' not found on map '{self.name}'.")
+
+    @_within_budget
+    def iter_draw_order(self):
+        """Iterates over all objects bottom to top. Loads every chunk that holds objects."""
+        keys = sorted(self._chunk_object_counts)
+        return iter(self._merge_layer_order(obj for key in keys for obj in self._chunk(key).objects))
+
+    @_within_budget
+    def objects_at(self, x, y):
+        """Returns the objects whose footprint covers a cell, in layer order (topmost last)."""
+        return self._merge_layer_order(
+            obj for chunk in self._chunks_for_rect(x, y, x, y) for obj in chunk.objects_at(x, y)
+        )
+
+    def top_object_at(self, x, y):
+        """Returns the topmost object covering a cell, or None."""
+        objects_here = self.objects_at(x, y)
+        return objects_here[-1] if objects_here else None
+
+    @_within_budget
+    def objects_in_rect(self, x0, y0, x1, y1):
+        """Returns the objects overlapping the inclusive rectangle (x0, y0)-(x1, y1), in layer order."""
+        return self._merge_layer_order(
+            obj for chunk in self._chunks_for_rect(x0, y0, x1, y1)
+            for obj in chunk.objects_in_rect(x0, y0, x1, y1)
+        )
+
+    @_within_budget
+    def objects_in_radius(self, x, y, radius):
+        """Returns the objects with any footprint cell within radius of (x, y), in layer order."""
+        return self._merge_layer_order(
+            obj for chunk in self._chunks_for_rect(x - radius, y - radius, x + radius, y + radius)
+            for obj in chunk.objects_in_radius(x, y, radius)
+        )
+
+    @_within_budget
+    def objects_in_cells(self, cells):
+        """Returns the objects whose footprint covers any of the given cells, in layer order."""
+        cells = list(cells)
+        if not cells:
+            return []
+        xs = [x for x, _ in cells]
+        ys = [y for _, y in cells]
+        return self._merge_layer_order(
+            obj for chunk in self._chunks_for_rect(min(xs), min(ys), max(xs), max(ys))
+            for obj in chunk.objects_in_cells(cells)
+        )
+
+    @_within_budget
+    def footprint(self, object_id):
+        """Returns the cells an object on this map currently covers."""
+        key = self._object_chunks.get(object_id)
+        if key is None:
+            return ()
+        return self._chunk(key).footprint(object_id)
+
+    def to_dict(self):
+        """
+        Flushes changed chunks to the chunk store and returns a small
+        serializable reference to it. The chunks themselves are not inlined.
+        """
+        self.flush()
+        return {
+            'map_type': 'chunked',
+            'name': self.name,
+            'width': self.width,
+            'height': self.height,
+            'grid_type': self.grid_type.name,
+            'background_asset_path': self.background_asset_path,
+            'store_dir': self.store_dir,
+            'chunk_size': self.chunk_size,
+            'memory_budget': self.memory_budget
+        }
+
+    def to_inline_dict(self):
+        """
+        Returns the whole map as the dictionary of a plain Map, with every
+        object and the terrain inline, for a copy of the map that cannot open
+        the chunk store, such as a network client's. Every stored chunk is
+        read, one at a time within the memory budget.
+        """
+        terrain = TerrainLayer(self.width, self.height, hex_layout=self.grid_type == GridType.HEX)
+        objects = []
+        size = self.chunk_size
+        for key in sorted(self._stored_chunks()):
+            chunk = self._chunk(key)
+            ox, oy = key[0] * size, key[1] * size
+            w, h = min(size, self.width - ox), min(size, self.height - oy)
+            terrain.cells[oy:oy + h, ox:ox + w] = chunk.terrain.cells[:h, :w]
+            objects.extend(chunk.objects)
+            self._enforce_budget()
+        data = {
+            'name': self.name,
+            'width': self.width,
+            'height': self.height,
+            'grid_type': self.grid_type.name,
+            'background_asset_path': self.background_asset_path,
+            'objects': [obj.to_fragment() for obj in self._merge_layer_order(objects)]
+        }
+        if not terrain.is_default():
+            data['terrain'] = terrain.to_dict()
+        return data
+
+    def _stored_chunks(self):
+        """The keys of every chunk holding objects or terrain, loaded or on disk."""
+        keys = set(self._loaded) | set(self._chunk_object_counts)
+        for filename in os.listdir(os.path.join(self.store_dir, "chunks")):
+            cx, cy = os.path.splitext(filename)[0].split('_')
+            keys.add((int(cx), int(cy)))
+        return keys
+
+    @classmethod
+    def from_dict(cls, data):
+        """Opens a chunked map from its reference without loading any chunk."""
+        grid_type_name = data.get('grid_type', 'SQUARE')
+        try:
+            grid_type = GridType[grid_type_name]
+        except KeyError:
+            print(f"Warning: Unknown grid type '{grid_type_name}'. Defaulting to SQUARE.")
+            grid_type = GridType.SQUARE
+
+        return cls(
+            name=data['name'],
+            width=data['width'],
+            height=data['height'],
+            store_dir=data['store_dir'],
+            chunk_size=data.get('chunk_size', 64),
+            grid_type=grid_type,
+            background_asset_path=data.get('background_asset_path'),
+            memory_budget=data.get('memory_budget', DEFAULT_MEMORY_BUDGET)
+        )
+
+
+class ChunkedObjectsView:
+    """A read-only view over all objects of a ChunkedMap."""
+
+    def __init__(self, chunked_map):
+        self._map = chunked_map
+
+    def __len__(self):
+        return len(self._map._object_chunks)
+
+    def __contains__(self, object_id):
+        return object_id in self._map._object_chunks
+
+    def __iter__(self):
+        for key in sorted(self._map._chunk_object_counts):
+            yield from list(self._map._chunk(key).objects)
+        self._map._enforce_budget()
+
+
+class ChunkedTerrain:
+    """Presents the per-chunk terrain layers of a ChunkedMap as one terrain layer in world coordinates."""
+
+    def __init__(self, chunked_map):
+        self._map = chunked_map
+
+    @property
+    def width(self):
+        return self._map.width
+
+    @property
+    def height(self):
+        return self._map.height
+
+    @property
+    def hex_layout(self):
+        return self._map.grid_type == GridType.HEX
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def _locate(self, x, y):
+        """Returns the chunk terrain layer holding a cell and the cell's local coordinates."""
+        size = self._map.chunk_size
+        key = self._map.chunk_key(x, y)
+        return self._map._chunk(key).terrain, x - key[0] * size, y - key[1] * size
+
+    @_within_budget
+    def get_cost(self, x, y):
+        layer, lx, ly = self._locate(x, y)
+        return layer.get_cost(lx, ly)
+
+    def blocks_movement(self, x, y):
+        return self.in_bounds(x, y) and self._query('blocks_movement', x, y)
+
+    def blocks_light(self, x, y):
+        return self.in_bounds(x, y) and self._query('blocks_light', x, y)
+
+    @_within_budget
+    def _query(self, name, x, y):
+        layer, lx, ly = self._locate(x, y)
+        return getattr(layer, name)(lx, ly)
+
+    @_within_budget
+    def set_cell(self, x, y, cost=None, blocks_movement=None, blocks_light=None):
+        """Updates the given properties of a single cell."""
+        if not self.in_bounds(x, y):
+            raise ValueError(f"Cell ({x}, {y}) is outside the terrain bounds.")
+        layer, lx, ly = self._locate(x, y)
+        layer.set_cell(lx, ly, cost, blocks_movement, blocks_light)
+        self._map._emit(TerrainChanged, region=(x, y, x, y))
+
+    def fill(self, cost=None, blocks_movement=None, blocks_light=None):
+        """Updates the given properties on every cell. This touches every chunk of the map."""
+        return self.fill_rect(0, 0, self.width - 1, self.height - 1, cost, blocks_movement, blocks_light)
+
+    def fill_rect(self, x0, y0, x1, y1, cost=None, blocks_movement=None, blocks_light=None):
+        """
+        Updates the given properties on every cell in the inclusive rectangle,
+        one chunk at a time, clipped to the map bounds.
+
+        Returns:
+            int: The number of cells updated.
+        """
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.width - 1), min(y1, self.height - 1)
+        if x0 > x1 or y0 > y1:
+            return 0
+
+        size = self._map.chunk_size
+        count = 0
+        cx0, cy0 = self._map.chunk_key(x0, y0)
+        cx1, cy1 = self._map.chunk_key(x1, y1)
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                ox, oy = cx * size, cy * size
+                count += self._fill_chunk((cx, cy), max(x0, ox) - ox, max(y0, oy) - oy,
+                                          min(x1, ox + size - 1) - ox, min(y1, oy + size - 1) - oy,
+                                          cost, blocks_movement, blocks_light)
+        self._map._emit(TerrainChanged, region=(x0, y0, x1, y1))
+        return count
+
+    @_within_budget
+    def _fill_chunk(self, key, x0, y0, x1, y1, cost, blocks_movement, blocks_light):
+        return self._map._chunk(key).terrain.fill_rect(x0, y0, x1, y1, cost, blocks_movement, blocks_light)
+
+    @_within_budget
+    def flood_fill(self, x, y, cost=None, blocks_movement=None, blocks_light=None):
+        """
+        Updates the given properties on the connected region of cells that
+        share the starting cell's exact value, across chunk boundaries.
+
+        Returns:
+            int: The number of cells updated.
+        """
+        if not self.in_bounds(x, y):
+            raise ValueError(f"Cell ({x}, {y}) is outside the terrain bounds.")
+
+        def raw(cx, cy):
+            layer, lx, ly = self._locate(cx, cy)
+            return layer.cells[ly, lx]
+
+        target = raw(x, y)
+        region = {(x, y)}
+        frontier = [(x, y)]
+        while frontier:
+            cx, cy = frontier.pop()
+            if self.hex_layout:
+                neighbors = roffset_neighbors(OffsetCoord(cx, cy))
+            else:
+                neighbors = ((cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1))
+            for nx, ny in neighbors:
+                if (nx, ny) not in region and self.in_bounds(nx, ny) and raw(nx, ny) == target:
+                    region.add((nx, ny))
+                    frontier.append((nx, ny))
+
+        for cx, cy in region:
+            layer, lx, ly = self._locate(cx, cy)
+            layer.set_cell(lx, ly, cost, blocks_movement, blocks_light)
+        xs = [cx for cx, _ in region]
+        ys = [cy for _, cy in region]
+        self._map._emit(TerrainChanged, region=(min(xs), min(ys), max(xs), max(ys)))
+        return len(region)
+
+    def is_default(self):
+        """Chunked terrain is persisted in the chunk store, never inline."""
+        return True
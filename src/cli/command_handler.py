@@ -5,11 +5,16 @@ from src.map_object import MapObject
 from src.shape import Shape, ShapeType
 from src.path import Path
 from src.group import Group
+from src.trigger import Trigger
+from src.distance import DistanceRule
 import src.fov as fov
+from src.pathfinding import find_path
+from src.aoe import TemplateShape, template_cells, tokens_in_template, rect_cells, line_cells
 
 
 from .parser import CommandParser
 from functools import wraps
+import time
 from src.user import UserRole
 
 def gm_only(func):
@@ -64,18 +69,41 @@ class CommandHandler:
         print("  add <name>                    - Adds a character to the initiative tracker.")
         print("  init                          - Rolls initiative for all combatants.")
         print("  attack <target> with <actor>  - Executes an attack.")
-        print("  map create <name> <w> <h> [type=hex] [bg=path] - Creates a new map.")
+        print("  map create <name> <w> <h> [type=hex] [bg=path] [store=dir] [chunk=N] - Creates a new map (chunked on disk if store is given).")
+        print("  map instance <template> <name> - Creates a copy-on-write instance of a prepared map.")
+        print("  map delete <name>             - Deletes a map (templates only once their instances are gone).")
         print("  map list                      - Lists all created maps.")
         print("  map view <map> [from=<id>]    - Shows a map. Optionally, view from an object's perspective (FOV).")
-        print("  token place <ent> <map> <x> <y> [layer=4] [light=R] [blocks=T/F] - Places an entity's token.")
-        print("  object place <char> <map> <x> <y> <layer> [light=R] [blocks=T/F] - Places a generic object.")
-        print("  object move <id> <map> <x> <y> - Moves any object or token to new coordinates.")
+        print("  map view <map> <x0> <y0> <w> <h> [list=false] - Shows only a window of a map, optionally without the object list.")
+        print("  token place <ent> <map> <x> <y> [layer=4] [size=N] [light=R] [blocks=T/F] - Places an entity's token.")
+        print("  object place <char> <map> <x> <y> <layer> [light=R] [blocks=T/F] [solid=T/F] [size=N] - Places a generic object (solid objects block movement).")
+        print("  object fill <char> <map> <x0> <y0> <x1> <y1> <layer> [shape=rect|outline|line] - Places objects over an area in one batch.")
+        print("  object move <id> <map> <x> <y> [force=true] - Moves any object or token. Tokens cannot move into occupied cells unless forced.")
         print("  object remove <id> <map>      - Removes an object or token from a map.")
+        print("  object clear <map> <x0> <y0> <x1> <y1> [layer=N] - Removes every object in an area in one batch.")
         print("  shape place <type> <map> <x> <y> [opts] - Places a shape on a map (e.g. fill_color=#ff0000).")
-        print("  draw path <map> <x,y>... [opts] - Draws a path with a series of points.")
-        print("  group create <map> <id1> <id2>... - Groups multiple objects together.")
-        print("  save <filepath>               - Saves the game state.")
+        print("  draw path <map> <x,y>... [opts] - Draws a path with a series of points (simplify=N drops points within N cells of the line).")
+        print("  group create <map> <id1> <id2>... - Groups multiple objects (or groups) together.")
+        print("  group add <map> <group> <id>... - Adds objects or groups to a group.")
+        print("  group remove <map> <group> <id>... - Takes objects out of a group, leaving them on the map.")
+        print("  group bounds <map> <group>    - Shows the area a group covers.")
+        print("  terrain rect <map> <x0> <y0> <x1> <y1> [opts] - Sets terrain in a rectangle (cost=N, blocks_movement=T/F, blocks_light=T/F).")
+        print("  terrain fill <map> [opts]     - Sets terrain on the whole map.")
+        print("  terrain flood <map> <x> <y> [opts] - Sets terrain on the connected region around a cell.")
+        print("  terrain path <map> <x0> <y0> <x1> <y1> - Finds the cheapest route between two cells.")
+        print("  aoe <shape> <map> <x> <y> <size> [dir=deg] - Lists tokens in a sphere/cone/line/cube template.")
+        print("  range <map> <token> <distance> [rule=chebyshev|alternating|euclidean] - Lists the tokens within a distance of a token.")
+        print("  trigger add <map> <x> <y> <w> <h> [enter=...] [leave=...] [name=...] - Reacts when tokens enter or leave an area.")
+        print("  trigger aura <map> <object> <radius> [enter=...] [leave=...] [name=...] - Adds a trigger that moves with an object.")
+        print("  trigger remove <map> <id>     - Removes a trigger.")
+        print("  trigger list <map>            - Lists a map's triggers.")
+        print("  save <filepath>               - Saves the game state (.vttb: compact binary, .db: SQLite, else JSON).")
         print("  load <filepath>               - Loads the game state.")
+        print("  autosave [now]                - Shows background save timings, or saves right away.")
+        print("  history save <dir> [label]    - Adds a snapshot to a save history that stores only what changed.")
+        print("  history list <dir>            - Lists the snapshots in a save history.")
+        print("  history restore <dir> [id]    - Restores a snapshot, the latest if no ID is given.")
+        print("  history prune <dir> <keep>    - Keeps only the newest snapshots and deletes unused data.")
         print("  players                       - Lists connected players.")
         print("  assign <token> to <player>    - (GM only) Assigns a token to a player.")
         print("  exit                          - Exits the application.")
@@ -122,7 +150,7 @@ class CommandHandler:
             game_map = map_manager.get_map(map_name)
             for obj in game_map.objects:
                 if isinstance(obj, Token) and obj.entity_id == entity.id:
-                    obj.owner_id = player.id
+                    game_map.set_object_property(obj.id, 'owner_id', player.id)
                     token_found = True
                     print(f"Assigned token '{token_name}' to player '{player_name}'.")
                     break
@@ -248,6 +276,74 @@ class CommandHandler:
         else:
             print(f"Failed to save game to {filepath}.")
 
+    def do_autosave(self, args):
+        """Reports on the background autosave, or starts a save. Usage: autosave [now]"""
+        autosave = self.engine.autosave
+        if autosave is None:
+            print("Autosave is not running.")
+            return
+        if args and args[0].lower() == 'now':
+            autosave.save_now()
+            print(f"Autosaving to {autosave.filepath}.")
+            return
+
+        metrics = autosave.metrics()
+        triggers = []
+        if autosave.interval is not None:
+            triggers.append(f"every {autosave.interval:g}s")
+        if autosave.change_threshold is not None:
+            triggers.append(f"every {autosave.change_threshold} changes")
+        print(f"Autosaving to {autosave.filepath} {' or '.join(triggers) or 'on request only'}.")
+        print(f"  {metrics['saves']} saves, {metrics['failures']} failed, {metrics['merged']} merged, "
+              f"{metrics['pending']} waiting, {metrics['changes_since_save']} changes since the last save.")
+        if metrics['saves']:
+            print(f"  Last save: {metrics['last_snapshot_seconds'] * 1000:.1f} ms snapshot, "
+                  f"{metrics['last_write_seconds'] * 1000:.1f} ms write, {metrics['last_bytes'] / 1024:.0f} KB. "
+                  f"Writes average {metrics['average_write_seconds'] * 1000:.1f} ms, "
+                  f"slowest {metrics['max_write_seconds'] * 1000:.1f} ms.")
+        if metrics['last_error']:
+            print(f"  Last error: {metrics['last_error']}")
+
+    def do_history(self, args):
+        """Handles save history commands. Usage: history <save|list|restore|prune> <directory> ..."""
+        usage = "Usage: history <save|list|restore|prune> <directory> ..."
+        if len(args) < 2:
+            print(usage)
+            return
+
+        subcommand, directory = args[0].lower(), args[1]
+        try:
+            if subcommand == 'save':
+                self.engine.save_history(directory, " ".join(args[2:]))
+
+            elif subcommand == 'list':
+                snapshots = self.engine.get_persistence_manager().history(directory).snapshots()
+                if not snapshots:
+                    print(f"No snapshots in {directory}.")
+                for snapshot in snapshots:
+                    created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot['created']))
+                    label = f" {snapshot['label']}" if snapshot['label'] else ""
+                    print(f"  - {snapshot['id']}: {created}{label}")
+
+            elif subcommand == 'restore':
+                snapshot_id = int(args[2]) if len(args) > 2 else None
+                if self.engine.restore_history(directory, snapshot_id):
+                    print(f"Game restored from {directory}.")
+                else:
+                    print(f"Failed to restore game from {directory}.")
+
+            elif subcommand == 'prune':
+                if len(args) != 3:
+                    print("Usage: history prune <directory> <keep>")
+                    return
+                dropped, removed = self.engine.get_persistence_manager().history(directory).gc(int(args[2]))
+                print(f"Deleted {dropped} snapshots and {removed} unused blobs from {directory}.")
+
+            else:
+                print(usage)
+        except ValueError as e:
+            print(f"Error: {e}")
+
     def do_load(self, args):
         """Loads the game state. Usage: load <filepath>"""
         if len(args) != 1:
@@ -271,7 +367,7 @@ class CommandHandler:
         """Handles map-related commands. Usage: map <subcommand> [...]"""
         if not args:
             print("Usage: map <subcommand> [args...]")
-            print("Available subcommands: create, list, view")
+            print("Available subcommands: create, instance, delete, list, view")
             return
 
         subcommand = args[0].lower()
@@ -279,7 +375,7 @@ class CommandHandler:
 
         if subcommand == "create":
             if len(args) < 4:
-                print("Usage: map create <name> <width> <height> [type=hex] [bg=path]")
+                print("Usage: map create <name> <width> <height> [type=hex] [bg=path] [store=dir] [chunk=N]")
                 return
 
             name, width_str, height_str = args[1], args[2], args[3]
@@ -301,7 +397,33 @@ class CommandHandler:
                     print(f"Warning: Unknown grid type '{kwargs['type']}'. Defaulting to SQUARE.")
 
             background = kwargs.get('bg')
-            map_manager.create_map(name, width, height, grid_type, background)
+            if 'store' in kwargs:
+                try:
+                    chunk_size = int(kwargs.get('chunk', 64))
+                except ValueError:
+                    print("Error: Chunk size must be an integer.")
+                    return
+                map_manager.create_chunked_map(name, width, height, kwargs['store'], chunk_size, grid_type, background)
+            else:
+                map_manager.create_map(name, width, height, grid_type, background)
+
+        elif subcommand == "instance":
+            if len(args) != 3:
+                print("Usage: map instance <template_map> <new_name>")
+                return
+            try:
+                map_manager.create_instance(args[1], args[2])
+            except ValueError as e:
+                print(f"Error: {e}")
+
+        elif subcommand == "delete":
+            if len(args) != 2:
+                print("Usage: map delete <name>")
+                return
+            try:
+                map_manager.delete_map(args[1])
+            except ValueError as e:
+                print(f"Error: {e}")
 
         elif subcommand == "list":
             maps = map_manager.list_maps()
@@ -313,19 +435,39 @@ class CommandHandler:
                 print(f"  - {map_name}")
 
         elif subcommand == "view":
+            usage = "Usage: map view <map_name> [<x0> <y0> <w> <h>] [from=<id>] [list=false]"
             if len(args) < 2:
-                print("Usage: map view <map_name> [from=<id>]")
+                print(usage)
                 return
 
             map_name = args[1]
+            positional = [a for a in args[2:] if '=' not in a]
             kwargs = self._parse_kwargs(args[2:])
             viewer_id = kwargs.get('from')
+            show_list = kwargs.get('list', 'true').lower() in ['true', 't', '1', 'yes']
 
             game_map = map_manager.get_map(map_name)
             if not game_map:
                 print(f"Error: Map '{map_name}' not found.")
                 return
 
+            # Without a viewport the whole map is shown
+            x0, y0, x1, y1 = 0, 0, game_map.width - 1, game_map.height - 1
+            if positional:
+                if len(positional) != 4:
+                    print(usage)
+                    return
+                try:
+                    vx, vy, vw, vh = (int(v) for v in positional)
+                except ValueError:
+                    print("Error: Viewport coordinates and size must be integers.")
+                    return
+                x0, y0 = max(vx, 0), max(vy, 0)
+                x1, y1 = min(vx + vw - 1, game_map.width - 1), min(vy + vh - 1, game_map.height - 1)
+                if vw <= 0 or vh <= 0 or x0 > x1 or y0 > y1:
+                    print("Error: The viewport does not overlap the map.")
+                    return
+
             visible_tiles = None
             if viewer_id:
                 viewer = game_map.get_object(viewer_id)
@@ -338,49 +480,22 @@ class CommandHandler:
                 else:
                     visible_tiles = fov.calculate_fov(game_map, viewer.x, viewer.y, viewer.light_radius)
 
-            top_objects = {}
-            for obj in game_map.objects:
-                pos = (obj.x, obj.y)
-                if 0 <= obj.x < game_map.width and 0 <= obj.y < game_map.height:
-                    if pos not in top_objects or obj.layer > top_objects[pos].layer:
-                        top_objects[pos] = obj
-
-            em = self.engine.get_entity_manager()
-            from src.map import GridType
-
             title = f"--- Map: {game_map.name} ({game_map.grid_type.name.lower()} grid {game_map.width}x{game_map.height}) ---"
+            if positional:
+                title += f"\nViewport: ({x0}, {y0}) to ({x1}, {y1})"
             if game_map.background_asset_path:
                 title += f"\nBackground: {game_map.background_asset_path}"
             print(title)
 
-            if game_map.grid_type == GridType.SQUARE:
-                header = "  " + " ".join([str(i) for i in range(game_map.width)])
-                print(header)
-                print("  " + "-" * (game_map.width * 2 - 1))
-                for y in range(game_map.height):
-                    row_str = f"{y}| "
-                    for x in range(game_map.width):
-                        if visible_tiles is not None and (x, y) not in visible_tiles:
-                            row_str += "  "
-                            continue
-                        obj = top_objects.get((x, y))
-                        row_str += (obj.display_char if obj else ".") + " "
-                    print(row_str.rstrip())
-
-            elif game_map.grid_type == GridType.HEX:
-                for r in range(game_map.height):
-                    row_str = " " * (r % 2)
-                    for c in range(game_map.width):
-                        if visible_tiles is not None and (c, r) not in visible_tiles:
-                            row_str += "   "
-                            continue
-                        obj = top_objects.get((c, r))
-                        row_str += f"[{obj.display_char if obj else '.'}]"
-                    print(row_str)
-
-            if game_map.objects:
+            # One indexed lookup fetches everything in the window; rows are printed as they are built
+            in_view = game_map.objects_in_rect(x0, y0, x1, y1)
+            for row in self._render_map_rows(game_map, x0, y0, x1, y1, in_view, visible_tiles):
+                print(row)
+
+            if show_list and in_view:
+                em = self.engine.get_entity_manager()
                 print("\nObjects on this map (sorted by layer):")
-                for obj in sorted(game_map.objects, key=lambda o: o.layer):
+                for obj in in_view:
                     info = f"at ({obj.x}, {obj.y}), Layer: {obj.layer}"
                     if obj.light_radius is not None:
                         info += f", Light: {obj.light_radius}"
@@ -399,6 +514,49 @@ class CommandHandler:
         else:
             print(f"Unknown map command: '{subcommand}'")
 
+    def _render_map_rows(self, game_map, x0, y0, x1, y1, in_view, visible_tiles=None):
+        """
+        Yields the text rows of the inclusive window (x0, y0)-(x1, y1), one at a time.
+
+        Args:
+            in_view (list): The objects overlapping the window, bottom to top.
+            visible_tiles (set): If given, cells outside it are drawn blank.
+        """
+        from src.map import GridType
+
+        # Objects are in layer order, so later ones overwrite the cells they share
+        top_chars = {}
+        for obj in in_view:
+            for cell in game_map.footprint(obj.id):
+                top_chars[cell] = obj.display_char
+
+        def cell_char(x, y):
+            if visible_tiles is not None and (x, y) not in visible_tiles:
+                return None
+            char = top_chars.get((x, y))
+            return char if char is not None else self._terrain_char(game_map, x, y)
+
+        columns = range(x0, x1 + 1)
+        if game_map.grid_type == GridType.SQUARE:
+            yield "  " + " ".join(str(x) for x in columns)
+            yield "  " + "-" * (len(columns) * 2 - 1)
+            for y in range(y0, y1 + 1):
+                chars = (cell_char(x, y) for x in columns)
+                yield (f"{y}| " + " ".join(c or " " for c in chars)).rstrip()
+        else:
+            for y in range(y0, y1 + 1):
+                chars = (cell_char(x, y) for x in columns)
+                yield " " * (y % 2) + "".join(f"[{c}]" if c else "   " for c in chars)
+
+    def _terrain_char(self, game_map, x, y):
+        """Returns the character used to draw an empty cell based on its terrain."""
+        terrain = game_map.terrain
+        if terrain.blocks_movement(x, y) or terrain.blocks_light(x, y):
+            return "#"
+        if terrain.get_cost(x, y) > 1:
+            return "~"
+        return "."
+
     def _create_map_object_from_args(self, args, required_arg_count):
         """Helper to parse common arguments for object and token placement."""
         # ... (implementation to be added)
@@ -445,16 +603,17 @@ class CommandHandler:
         try:
             x, y = int(x_str), int(y_str)
             layer = int(kwargs.get('layer', 4))
+            size = int(kwargs.get('size', 1))
             light_radius = int(kwargs['light']) if 'light' in kwargs else None
             blocks_light = kwargs.get('blocks', 'false').lower() in ['true', 't', '1', 'yes']
         except ValueError:
-            print("Error: x, y, layer, and light radius must be integers.")
+            print("Error: x, y, layer, size and light radius must be integers.")
             return
 
         display_char = entity.attributes.get('name', '?')[0].upper()
 
         new_token = Token(
-            entity_id=entity.id, x=x, y=y, layer=layer, display_char=display_char,
+            entity_id=entity.id, x=x, y=y, layer=layer, display_char=display_char, size=size,
             light_radius=light_radius, blocks_light=blocks_light, owner_id=owner_id
         )
 
@@ -465,15 +624,19 @@ class CommandHandler:
         """Handles generic object commands."""
         if not args:
             print("Usage: object <subcommand> [...]")
-            print("Available subcommands: place, move, remove")
+            print("Available subcommands: place, fill, move, remove, clear")
             return
 
         subcommand = args[0].lower()
         map_manager = self.engine.get_map_manager()
 
+        if subcommand in ('fill', 'clear') and self.engine.current_user.role != UserRole.GM:
+            print("Error: This command can only be used by the Game Master.")
+            return
+
         if subcommand == 'place':
             if len(args) < 6:
-                print("Usage: object place <char> <map> <x> <y> <layer> [light=R] [blocks=T/F]")
+                print("Usage: object place <char> <map> <x> <y> <layer> [light=R] [blocks=T/F] [solid=T/F] [size=N]")
                 return
 
             char, map_name, x_str, y_str, layer_str = args[1], args[2], args[3], args[4], args[5]
@@ -490,24 +653,95 @@ class CommandHandler:
             try:
                 x, y, layer = int(x_str), int(y_str), int(layer_str)
                 light_radius = int(kwargs['light']) if 'light' in kwargs else None
+                size = int(kwargs.get('size', 1))
                 blocks_light = kwargs.get('blocks', 'false').lower() in ['true', 't', '1', 'yes']
+                blocks_movement = kwargs.get('solid', 'false').lower() in ['true', 't', '1', 'yes']
             except ValueError:
-                print("Error: x, y, layer, and light radius must be integers.")
+                print("Error: x, y, layer, size and light radius must be integers.")
                 return
 
             new_obj = MapObject(
-                x=x, y=y, layer=layer, display_char=char,
-                light_radius=light_radius, blocks_light=blocks_light
+                x=x, y=y, layer=layer, display_char=char, size=size,
+                light_radius=light_radius, blocks_light=blocks_light, blocks_movement=blocks_movement
             )
             map_manager.add_object_to_map(map_name, new_obj)
             print(f"Placed object '{char}' on map '{map_name}' at ({x},{y}). ID: {new_obj.id}")
 
+        elif subcommand == 'fill':
+            if len(args) < 8:
+                print("Usage: object fill <char> <map> <x0> <y0> <x1> <y1> <layer> [shape=rect|outline|line] [light=R] [blocks=T/F] [solid=T/F]")
+                return
+
+            char, map_name = args[1], args[2]
+            kwargs = self._parse_kwargs(args[8:])
+
+            if len(char) != 1:
+                print("Error: Display character must be a single character.")
+                return
+
+            if not map_manager.get_map(map_name):
+                print(f"Error: Map '{map_name}' not found.")
+                return
+
+            try:
+                x0, y0, x1, y1, layer = (int(v) for v in args[3:8])
+                light_radius = int(kwargs['light']) if 'light' in kwargs else None
+                blocks_light = kwargs.get('blocks', 'false').lower() in ['true', 't', '1', 'yes']
+                blocks_movement = kwargs.get('solid', 'false').lower() in ['true', 't', '1', 'yes']
+            except ValueError:
+                print("Error: Coordinates, layer, and light radius must be integers.")
+                return
+
+            shape = kwargs.get('shape', 'rect').lower()
+            if shape == 'rect':
+                cells = rect_cells(x0, y0, x1, y1)
+            elif shape == 'outline':
+                cells = rect_cells(x0, y0, x1, y1, outline=True)
+            elif shape == 'line':
+                cells = line_cells(x0, y0, x1, y1)
+            else:
+                print(f"Error: Unknown fill shape '{shape}'. Valid shapes are: rect, outline, line.")
+                return
+
+            new_objects = [
+                MapObject(x=x, y=y, layer=layer, display_char=char, light_radius=light_radius,
+                          blocks_light=blocks_light, blocks_movement=blocks_movement)
+                for x, y in cells
+            ]
+            map_manager.add_objects(map_name, new_objects)
+
+        elif subcommand == 'clear':
+            if len(args) < 6:
+                print("Usage: object clear <map> <x0> <y0> <x1> <y1> [layer=N]")
+                return
+
+            map_name = args[1]
+            kwargs = self._parse_kwargs(args[6:])
+            game_map = map_manager.get_map(map_name)
+            if not game_map:
+                print(f"Error: Map '{map_name}' not found.")
+                return
+
+            try:
+                x0, y0, x1, y1 = (int(v) for v in args[2:6])
+                layer = int(kwargs['layer']) if 'layer' in kwargs else None
+            except ValueError:
+                print("Error: Coordinates and layer must be integers.")
+                return
+
+            doomed = [
+                obj.id for obj in game_map.objects_in_rect(x0, y0, x1, y1)
+                if layer is None or obj.layer == layer
+            ]
+            map_manager.remove_objects(map_name, doomed)
+
         elif subcommand == 'move':
-            if len(args) != 5:
-                print("Usage: object move <object_id> <map_name> <x> <y>")
+            if len(args) not in (5, 6):
+                print("Usage: object move <object_id> <map_name> <x> <y> [force=true]")
                 return
 
             object_id, map_name, x_str, y_str = args[1], args[2], args[3], args[4]
+            force = self._parse_kwargs(args[5:]).get('force', 'false').lower() in ['true', 't', '1', 'yes']
 
             game_map = map_manager.get_map(map_name)
             if not game_map:
@@ -531,6 +765,9 @@ class CommandHandler:
             if not can_move:
                 print("Error: You do not have permission to move this object.")
                 return
+            if force and current_user.role != UserRole.GM:
+                print("Error: Only the GM can force a move.")
+                return
 
             try:
                 x, y = int(x_str), int(y_str)
@@ -538,7 +775,12 @@ class CommandHandler:
                 print("Error: X and Y coordinates must be integers.")
                 return
 
-            map_manager.move_object(map_name, object_id, x, y)
+            try:
+                # Tokens may not end up inside walls, blocking objects or each other
+                check = isinstance(obj_to_move, Token) and not force
+                map_manager.move_object(map_name, object_id, x, y, check_occupancy=check)
+            except ValueError as e:
+                print(f"Error: {e}")
 
         elif subcommand == 'remove':
             if len(args) != 3:
@@ -624,7 +866,7 @@ class CommandHandler:
         """Handles drawing commands. Usage: draw path <map> <x1,y1> <x2,y2>... [opts]"""
         if not args or args[0].lower() != 'path':
             print("Usage: draw path <map_name> <x1,y1> <x2,y2>... [key=value...]")
-            print("Options: layer=N, stroke_color=#hex, stroke_width=N, opacity=0.N")
+            print("Options: layer=N, stroke_color=#hex, stroke_width=N, opacity=0.N, simplify=N")
             return
 
         if len(args) < 3:
@@ -643,6 +885,12 @@ class CommandHandler:
         point_args = args[2:first_opt_idx] if first_opt_idx != -1 else args[2:]
         optional_args_list = args[first_opt_idx:] if first_opt_idx != -1 else []
         optional_args = self._parse_drawable_kwargs(optional_args_list)
+        if 'simplify' in optional_args:
+            try:
+                optional_args['simplify_tolerance'] = float(optional_args.pop('simplify'))
+            except ValueError:
+                print("Error: simplify must be a number of cells (e.g. simplify=0.5).")
+                return
 
         if not point_args:
             print("Error: At least one point (e.g., 10,20) is required for a path.")
@@ -675,14 +923,53 @@ class CommandHandler:
 
         new_path = Path(x=anchor_x, y=anchor_y, points=points, **optional_args)
         map_manager.add_object_to_map(map_name, new_path)
-        print(f"Placed path with {len(points)} points on map '{map_name}'. ID: {new_path.id}")
+        print(f"Placed path with {len(new_path.points)} points on map '{map_name}'. ID: {new_path.id}")
 
     def do_group(self, args):
-        """Handles group commands. Usage: group create <map> <id1> <id2>..."""
-        if not args or args[0].lower() != 'create':
-            print("Usage: group create <map_name> <object_id1> <object_id2>...")
+        """Handles group commands. Usage: group <create|add|remove|bounds> <map> ..."""
+        usage = "Usage: group <create|add|remove|bounds> <map_name> ..."
+        if not args:
+            print(usage)
             return
 
+        subcommand = args[0].lower()
+        if subcommand == 'create':
+            self._group_create(args)
+            return
+        if subcommand not in ('add', 'remove', 'bounds') or len(args) < 3:
+            print(usage)
+            return
+
+        map_name, group_id = args[1], args[2]
+        game_map = self.engine.get_map_manager().get_map(map_name)
+        if not game_map:
+            print(f"Error: Map '{map_name}' not found.")
+            return
+
+        try:
+            if subcommand == 'bounds':
+                x0, y0, x1, y1 = game_map.group_bounds(group_id)
+                print(f"Group {group_id} covers ({x0}, {y0}) to ({x1}, {y1}).")
+                return
+
+            member_ids = args[3:]
+            if not member_ids:
+                print(f"Usage: group {subcommand} <map_name> <group_id> <object_id1>...")
+                return
+            if subcommand == 'add':
+                missing = [m for m in member_ids if game_map.get_object(m) is None]
+                if missing:
+                    print(f"Error: Objects not found on map: {', '.join(missing)}")
+                    return
+                game_map.add_to_group(group_id, member_ids)
+                print(f"Added {len(member_ids)} members to group {group_id}.")
+            else:
+                game_map.remove_from_group(group_id, member_ids)
+                print(f"Removed {len(member_ids)} members from group {group_id}.")
+        except ValueError as e:
+            print(f"Error: {e}")
+
+    def _group_create(self, args):
         if len(args) < 3:
             print("Usage: group create <map_name> <object_id1> <object_id2>...")
             return
@@ -717,5 +1004,211 @@ class CommandHandler:
         anchor_y = total_y // len(valid_ids)
 
         new_group = Group(x=anchor_x, y=anchor_y, layer=0, display_char='G', object_ids=valid_ids)
-        map_manager.add_object_to_map(map_name, new_group)
+        try:
+            map_manager.add_object_to_map(map_name, new_group)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
         print(f"Created group with {len(valid_ids)} members on map '{map_name}'. ID: {new_group.id}")
+
+    def _parse_terrain_kwargs(self, args_list):
+        """Helper to parse the optional terrain properties shared by the terrain subcommands."""
+        kwargs = self._parse_kwargs(args_list)
+        props = {}
+        if 'cost' in kwargs:
+            props['cost'] = int(kwargs['cost'])
+        for key in ('blocks_movement', 'blocks_light'):
+            if key in kwargs:
+                props[key] = kwargs[key].lower() in ['true', 't', '1', 'yes']
+        return props
+
+    @gm_only
+    def do_terrain(self, args):
+        """Handles terrain commands. Usage: terrain <rect|fill|flood|path> <map> [...]"""
+        if len(args) < 2:
+            print("Usage: terrain <subcommand> <map_name> [args...]")
+            print("Available subcommands: rect, fill, flood, path")
+            return
+
+        subcommand, map_name = args[0].lower(), args[1]
+        game_map = self.engine.get_map_manager().get_map(map_name)
+        if not game_map:
+            print(f"Error: Map '{map_name}' not found.")
+            return
+        terrain = game_map.terrain
+
+        try:
+            if subcommand == 'rect':
+                if len(args) < 6:
+                    print("Usage: terrain rect <map_name> <x0> <y0> <x1> <y1> [cost=N] [blocks_movement=T/F] [blocks_light=T/F]")
+                    return
+                x0, y0, x1, y1 = (int(v) for v in args[2:6])
+                count = terrain.fill_rect(x0, y0, x1, y1, **self._parse_terrain_kwargs(args[6:]))
+                print(f"Updated terrain on {count} cells of map '{map_name}'.")
+
+            elif subcommand == 'fill':
+                terrain.fill(**self._parse_terrain_kwargs(args[2:]))
+                print(f"Updated terrain on all {terrain.width * terrain.height} cells of map '{map_name}'.")
+
+            elif subcommand == 'flood':
+                if len(args) < 4:
+                    print("Usage: terrain flood <map_name> <x> <y> [cost=N] [blocks_movement=T/F] [blocks_light=T/F]")
+                    return
+                x, y = int(args[2]), int(args[3])
+                count = terrain.flood_fill(x, y, **self._parse_terrain_kwargs(args[4:]))
+                print(f"Updated terrain on {count} connected cells of map '{map_name}'.")
+
+            elif subcommand == 'path':
+                if len(args) != 6:
+                    print("Usage: terrain path <map_name> <x0> <y0> <x1> <y1>")
+                    return
+                x0, y0, x1, y1 = (int(v) for v in args[2:6])
+                result = find_path(game_map, (x0, y0), (x1, y1))
+                if result is None:
+                    print(f"No path from ({x0}, {y0}) to ({x1}, {y1}) on map '{map_name}'.")
+                    return
+                path, cost = result
+                steps = " ".join(f"{px},{py}" for px, py in path)
+                print(f"Path cost {cost} ({len(path) - 1} steps): {steps}")
+
+            else:
+                print(f"Unknown terrain command: '{subcommand}'")
+        except ValueError as e:
+            print(f"Error: {e}")
+
+    def do_aoe(self, args):
+        """Lists the tokens inside an area template. Usage: aoe <shape> <map> <x> <y> <size> [dir=deg]"""
+        if len(args) < 5:
+            print("Usage: aoe <sphere|cone|line|cube> <map_name> <x> <y> <size> [dir=degrees]")
+            print("Direction is in degrees clockwise from east (0=east, 90=south).")
+            return
+
+        shape_str, map_name, x_str, y_str, size_str = args[:5]
+        kwargs = self._parse_kwargs(args[5:])
+
+        try:
+            shape = TemplateShape[shape_str.upper()]
+        except KeyError:
+            print(f"Error: Invalid template shape '{shape_str}'. Valid shapes are: sphere, cone, line, cube.")
+            return
+
+        game_map = self.engine.get_map_manager().get_map(map_name)
+        if not game_map:
+            print(f"Error: Map '{map_name}' not found.")
+            return
+
+        try:
+            x, y, size = int(x_str), int(y_str), int(size_str)
+            direction = float(kwargs.get('dir', 0))
+        except ValueError:
+            print("Error: x, y, size and direction must be numbers.")
+            return
+
+        cells = template_cells(game_map, shape, (x, y), size, direction)
+        tokens = tokens_in_template(game_map, shape, (x, y), size, direction)
+        print(f"{shape.name.capitalize()} of size {size} from ({x}, {y}) covers {len(cells)} cells and {len(tokens)} tokens.")
+
+        em = self.engine.get_entity_manager()
+        for token in tokens:
+            entity = em.get_entity(token.entity_id)
+            name = entity.attributes.get('name', 'Unknown') if entity else 'Unknown'
+            print(f"  - {name} at ({token.x}, {token.y}), ID: {token.id}")
+
+    def do_range(self, args):
+        """Lists the tokens within a distance of a token. Usage: range <map> <token_id> <distance> [rule=...]"""
+        if len(args) < 3:
+            print("Usage: range <map_name> <token_id> <distance> [rule=chebyshev|alternating|euclidean]")
+            return
+
+        map_name, token_id, distance_str = args[:3]
+        kwargs = self._parse_kwargs(args[3:])
+        try:
+            rule = DistanceRule[kwargs.get('rule', 'chebyshev').upper()]
+        except KeyError:
+            print("Error: Invalid rule. Valid rules are: chebyshev, alternating, euclidean.")
+            return
+
+        game_map = self.engine.get_map_manager().get_map(map_name)
+        if not game_map:
+            print(f"Error: Map '{map_name}' not found.")
+            return
+
+        try:
+            max_distance = float(distance_str)
+        except ValueError:
+            print("Error: Distance must be a number.")
+            return
+
+        distances = game_map.token_distances(rule)
+        if token_id not in distances.ids:
+            print(f"Error: Token '{token_id}' not found on map '{map_name}'.")
+            return
+
+        in_range = distances.within(token_id, max_distance)
+        print(f"{len(in_range)} tokens within {distance_str} cells of {token_id}:")
+        em = self.engine.get_entity_manager()
+        for other_id in in_range:
+            token = game_map.get_object(other_id)
+            entity = em.get_entity(token.entity_id)
+            name = entity.attributes.get('name', 'Unknown') if entity else 'Unknown'
+            print(f"  - {name} at distance {distances.distance(token_id, other_id):g}, ID: {other_id}")
+
+    @gm_only
+    def do_trigger(self, args):
+        """Handles trigger commands. Usage: trigger <add|aura|remove|list> <map> ..."""
+        usage = "Usage: trigger <add|aura|remove|list> <map_name> ..."
+        if len(args) < 2:
+            print(usage)
+            return
+
+        subcommand, map_name = args[0].lower(), args[1]
+        game_map = self.engine.get_map_manager().get_map(map_name)
+        if not game_map:
+            print(f"Error: Map '{map_name}' not found.")
+            return
+
+        try:
+            if subcommand == 'list':
+                if not game_map.triggers:
+                    print(f"Map '{map_name}' has no triggers.")
+                for trigger in game_map.triggers:
+                    if trigger.attached_to is not None:
+                        area = f"aura of radius {trigger.radius} around {trigger.attached_to}"
+                    elif trigger.radius is not None:
+                        area = f"radius {trigger.radius} around ({trigger.x}, {trigger.y})"
+                    else:
+                        area = f"{trigger.width}x{trigger.height} at ({trigger.x}, {trigger.y})"
+                    label = f"'{trigger.name}' " if trigger.name else ""
+                    print(f"  - {label}{area}, enter: {trigger.on_enter or '-'}, leave: {trigger.on_leave or '-'}, ID: {trigger.id}")
+
+            elif subcommand == 'remove':
+                if len(args) < 3:
+                    print("Usage: trigger remove <map_name> <trigger_id>")
+                    return
+                game_map.remove_trigger(args[2])
+                print(f"Removed trigger {args[2]} from map '{map_name}'.")
+
+            elif subcommand in ('add', 'aura'):
+                if subcommand == 'add':
+                    if len(args) < 6:
+                        print("Usage: trigger add <map_name> <x> <y> <width> <height> [enter=...] [leave=...] [name=...]")
+                        return
+                    x, y, width, height = (int(v) for v in args[2:6])
+                    trigger = Trigger(x=x, y=y, width=width, height=height)
+                    kwargs = self._parse_kwargs(args[6:])
+                else:
+                    if len(args) < 4:
+                        print("Usage: trigger aura <map_name> <object_id> <radius> [enter=...] [leave=...] [name=...]")
+                        return
+                    trigger = Trigger(x=0, y=0, radius=int(args[3]), attached_to=args[2])
+                    kwargs = self._parse_kwargs(args[4:])
+                trigger.on_enter = kwargs.get('enter', "")
+                trigger.on_leave = kwargs.get('leave', "")
+                trigger.name = kwargs.get('name', "")
+                game_map.add_trigger(trigger)
+                print(f"Added trigger to map '{map_name}'. ID: {trigger.id}")
+
+            else:
+                print(f"Unknown trigger command: '{subcommand}'")
+        except ValueError as e:
+            print(f"Error: {e}")
@@ -1,8 +1,18 @@
 import re
 import random
 
+from .recorded import RecordedSource
+
 class DiceRoller:
-    """Parses and rolls dice expressions."""
+    """
+    Parses and rolls dice expressions.
+
+    Every die is rolled through `source`, which the command journal uses to
+    record rolls and to replay them when recovering a session.
+    """
+
+    def __init__(self):
+        self.source = RecordedSource(lambda sides: random.randint(1, sides))
 
     def roll(self, expression, entity=None, entity_manager=None):
         """
@@ -45,7 +55,7 @@ class DiceRoller:
                 is_dice_roll = True
                 num_dice = int(dice_match.group(1))
                 num_sides = int(dice_match.group(2))
-                rolls = [random.randint(1, num_sides) for _ in range(num_dice)]
+                rolls = [self.source.next(num_sides) for _ in range(num_dice)]
                 value = sum(rolls)
                 all_rolls.extend(rolls)
 
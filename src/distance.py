@@ -0,0 +1,115 @@
+from enum import Enum, auto
+
+import numpy as np
+
+from .map import GridType
+from .token import Token
+
+
+class DistanceRule(Enum):
+    """How diagonal steps are counted on square grids. Hex grids always count hex steps."""
+    CHEBYSHEV = auto()    # Every diagonal step costs 1
+    ALTERNATING = auto()  # Diagonals cost 1, 2, 1, 2, ... (the 5e variant rule)
+    EUCLIDEAN = auto()    # Straight-line distance between cells
+
+
+class DistanceMatrix:
+    """
+    Pairwise distances, in cells, between the tokens of a map.
+
+    `matrix[i, j]` is the distance between `ids[i]` and `ids[j]`. On square
+    maps it is measured between the nearest cells of the two footprints, so
+    large creatures are in reach of everything adjacent to any of their
+    cells. The matrix is shared through the map's cache and is read-only.
+    """
+
+    def __init__(self, ids, matrix):
+        self.ids = ids
+        self.matrix = matrix
+        self.matrix.flags.writeable = False
+        self._index = {token_id: i for i, token_id in enumerate(ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def index_of(self, token_id):
+        """Returns the row of a token. Raises KeyError if it is not in the matrix."""
+        return self._index[token_id]
+
+    def distance(self, a, b):
+        """Returns the distance between two tokens, given by ID."""
+        return self.matrix[self._index[a], self._index[b]].item()
+
+    def within(self, token_id, max_distance):
+        """Returns the IDs of the other tokens at most max_distance away, nearest first."""
+        row = self.matrix[self._index[token_id]]
+        in_range = np.flatnonzero(row <= max_distance)
+        in_range = in_range[np.argsort(row[in_range], kind='stable')]
+        return [self.ids[i] for i in in_range if self.ids[i] != token_id]
+
+
+def _footprint_gaps(start, size):
+    """Returns the per-axis gap between every pair of footprints; overlapping spans have a gap of 0."""
+    end = start + size - 1
+    return np.maximum(0, np.maximum(start[:, None] - end[None, :], start[None, :] - end[:, None]))
+
+
+def distance_matrix(game_map, rule=DistanceRule.CHEBYSHEV):
+    """
+    Computes the distance between every pair of tokens on a map in one pass.
+
+    Args:
+        game_map (Map): The map whose tokens are measured.
+        rule (DistanceRule): How to count diagonals on square maps. Ignored
+            on hex maps, which use the distance between the tokens' anchor
+            hexes in cube coordinates.
+
+    Returns:
+        DistanceMatrix: Integer distances, or floats for the Euclidean rule.
+    """
+    tokens = [obj for obj in game_map.objects if isinstance(obj, Token)]
+    ids = [token.id for token in tokens]
+    x = np.fromiter((t.x for t in tokens), dtype=np.int64, count=len(tokens))
+    y = np.fromiter((t.y for t in tokens), dtype=np.int64, count=len(tokens))
+
+    if game_map.grid_type == GridType.HEX:
+        # Same even-row offset conversion as hex.roffset_to_cube
+        q = x - (y + (y & 1)) // 2
+        r = y
+        dq = np.abs(q[:, None] - q[None, :])
+        dr = np.abs(r[:, None] - r[None, :])
+        ds = np.abs((q + r)[:, None] - (q + r)[None, :])
+        return DistanceMatrix(ids, ((dq + dr + ds) // 2).astype(np.int32))
+
+    size = np.fromiter((max(t.size or 1, 1) for t in tokens), dtype=np.int64, count=len(tokens))
+    dx = _footprint_gaps(x, size)
+    dy = _footprint_gaps(y, size)
+    if rule == DistanceRule.EUCLIDEAN:
+        return DistanceMatrix(ids, np.hypot(dx, dy))
+
+    longer = np.maximum(dx, dy)
+    if rule == DistanceRule.ALTERNATING:
+        # Every second diagonal step costs an extra cell
+        longer = longer + np.minimum(dx, dy) // 2
+    elif rule != DistanceRule.CHEBYSHEV:
+        raise ValueError(f"Unknown distance rule: {rule}")
+    return DistanceMatrix(ids, longer.astype(np.int32))
+
+
+class DistanceCache:
+    """Keeps one map's distance matrices until the map's version changes."""
+
+    def __init__(self):
+        self._version = None
+        self._matrices = {}
+
+    def get(self, game_map, rule=DistanceRule.CHEBYSHEV):
+        if game_map.version != self._version:
+            self._matrices.clear()
+            self._version = game_map.version
+        if game_map.grid_type == GridType.HEX:
+            rule = DistanceRule.CHEBYSHEV  # Every rule gives the same hex distances
+        matrix = self._matrices.get(rule)
+        if matrix is None:
+            matrix = self._matrices[rule] = distance_matrix(game_map, rule)
+        return matrix
@@ -1,4 +1,6 @@
+import io
 import re
+from contextlib import nullcontext, redirect_stdout
 from .entity import EntityManager
 from .dice import DiceRoller
 from .module_loader import ModuleLoader
@@ -6,8 +8,29 @@ from .action_manager import ActionManager
 from .initiative import InitiativeTracker
 from .persistence import PersistenceManager
 from .map_manager import MapManager
-from .user import UserManager, User, UserRole
+from .user import UserManager, User
 from .cli.command_handler import CommandHandler
+from .trigger import ACTION_PREFIX
+from .journal import CommandJournal
+from .autosave import AutosaveService
+from .ids import id_source
+from .output import capture_output, command_failed
+
+# Commands, or (command, subcommands), that never change the game state and are not journaled.
+# save and load are handled separately: a load (or history restore) replaces the state and starts a new snapshot.
+READ_ONLY_COMMANDS = {
+    'help': None, 'status': None, 'players': None, 'aoe': None, 'range': None,
+    'save': None, 'load': None, 'exit': None, 'autosave': None, 'history': None,
+    'map': {'list', 'view'}, 'terrain': {'path'}, 'group': {'bounds'}, 'trigger': {'list'},
+}
+
+
+def changes_state(command, args):
+    """Returns True if a parsed command may change the game state."""
+    if command not in READ_ONLY_COMMANDS:
+        return True
+    subcommands = READ_ONLY_COMMANDS[command]
+    return subcommands is not None and (not args or args[0].lower() not in subcommands)
 
 class Engine:
     """The main VTT engine."""
@@ -20,14 +43,181 @@ class Engine:
         self.initiative_tracker = InitiativeTracker()
         self.persistence_manager = PersistenceManager()
         self.map_manager = MapManager()
+        self.map_manager.trigger_handler = self._on_trigger
         self.user_manager = UserManager()
         self.command_handler = CommandHandler(self)
         self.active_module = None
         self.current_user = None
+        self.journal = None
+        self._journaled_users = None  # The connected users as of the last journal entry
+        self.snapshot_interval = 200
+        self._command_depth = 0
+        self.autosave = None
 
     def get_command_handler(self):
         return self.command_handler
 
+    def execute_command(self, command_string, user=None):
+        """
+        Runs a command line, as `user` if given, and journals it if it may
+        have changed the game state; such commands also count towards the
+        next autosave. Commands run by other commands (such as trigger
+        reactions) are part of the outer command's entry. A journaled
+        command's output is checked for failures, which the entry records.
+
+        Returns:
+            bool: True if the command asks to exit.
+        """
+        command, args = self.command_handler.parser.parse(command_string)
+        if not command:
+            return False
+
+        previous_user = self.current_user
+        if user is not None:
+            self.current_user = user
+        changed = self._command_depth == 0 and changes_state(command, args)
+        journaled = changed and self.journal is not None
+        if journaled:
+            self.dice_roller.source.start_recording()
+            id_source.start_recording()
+
+        self._command_depth += 1
+        output = io.StringIO()
+        try:
+            with capture_output(output, echo=True) if journaled else nullcontext():
+                return self.command_handler.handle_command(command, args)
+        finally:
+            self._command_depth -= 1
+            if journaled:
+                self._journal_command(command_string, command_failed(output.getvalue()) is None)
+            self.current_user = previous_user
+            if changed and self.autosave is not None:
+                self.autosave.record_change()
+
+    def _journal_command(self, command_string, ok):
+        rolls = self.dice_roller.source.stop_recording()
+        ids = id_source.stop_recording()
+        user = self.current_user
+        # Commands such as assign refer to other users, so replay needs everyone who was connected
+        users = [connected.to_dict() for connected in self.user_manager.list_users()]
+        if users == self._journaled_users:
+            users = None
+        else:
+            self._journaled_users = users
+        self.journal.append(command_string, user.to_dict() if user else None, rolls, ids, ok, users)
+        if self.journal.entries_since_snapshot >= self.snapshot_interval:
+            self.snapshot()
+
+    def open_journal(self, directory, batch_size=16, max_delay=1.0, snapshot_interval=200):
+        """
+        Recovers the session kept in a journal directory, if there is one, and
+        journals every state-changing command from then on.
+
+        The latest snapshot is loaded and the journal entries after it are
+        replayed with the dice, IDs and connected users they had originally;
+        entries that fail although they had succeeded are reported. A fresh
+        snapshot is then written, so the journal starts out empty.
+
+        Returns:
+            int: The number of journal entries replayed.
+        """
+        self.close_journal()
+        journal = CommandJournal(directory, batch_size, max_delay)
+        game_state, seq = journal.load_snapshot()
+        entries = journal.read_entries(seq)
+        if game_state is not None:
+            with redirect_stdout(io.StringIO()):
+                self.load_game_from_dict(game_state)
+        failed = 0
+        # The users recorded in the journal stand in for the connected ones while it is replayed
+        connected = self.user_manager
+        try:
+            for entry in entries:
+                failed += not self._replay_entry(entry)
+        finally:
+            self.user_manager = connected
+        if game_state is not None or entries:
+            failures = f" ({failed} failed)" if failed else ""
+            print(f"Recovered session from {directory}: replayed {len(entries)} commands after the last snapshot{failures}.")
+
+        self.journal = journal
+        self.snapshot_interval = snapshot_interval
+        self.snapshot()
+        return len(entries)
+
+    def _replay_entry(self, entry):
+        """
+        Replays one journal entry. Returns False, after a warning, if it
+        failed although it had succeeded when it was journaled.
+        """
+        if 'users' in entry:
+            self.user_manager = UserManager()
+            with capture_output(io.StringIO()):
+                for user_data in entry['users']:
+                    self.user_manager.add_user(User.from_dict(user_data))
+        previous_user = self.current_user
+        self.current_user = User.from_dict(entry['user']) if entry.get('user') else None
+        self.dice_roller.source.replay(entry['rolls'])
+        id_source.replay(entry['ids'])
+        output = io.StringIO()
+        try:
+            with capture_output(output):
+                self.command_handler.parse_and_handle(entry['command'])
+            error = command_failed(output.getvalue())
+        except Exception as e:
+            error = str(e)
+        finally:
+            self.dice_roller.source.stop_replay()
+            id_source.stop_replay()
+            self.current_user = previous_user
+        if error is None or not entry.get('ok', True):
+            return True
+        print(f"Warning: Replaying journal entry {entry['seq']} ('{entry['command']}') failed: {error}")
+        return False
+
+    def snapshot(self):
+        """Writes the full game state to the journal directory and empties the journal."""
+        if self.journal is None:
+            return
+        self.journal.write_snapshot(self.persistence_manager.gather_game_state(self))
+        # The first entry after a snapshot records the connected users again
+        self._journaled_users = None
+
+    def tick_journal(self):
+        """
+        Writes journal entries that have waited longer than the journal's
+        max_delay. Call it regularly, so entries of a burst followed by idle
+        time do not wait for the next command; it may run on another thread.
+        """
+        return self.journal is not None and self.journal.tick()
+
+    def close_journal(self):
+        """Writes any journal entries still waiting and stops journaling."""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def start_autosave(self, filepath, interval=300.0, change_threshold=50):
+        """
+        Starts saving the game to `filepath` in the background, every
+        `change_threshold` state-changing commands and, through `tick_autosave`,
+        every `interval` seconds. While it runs, `save_game` also writes in
+        the background. See AutosaveService.
+        """
+        self.stop_autosave()
+        self.autosave = AutosaveService(self, filepath, interval, change_threshold)
+        return self.autosave
+
+    def tick_autosave(self):
+        """Saves if the autosave interval has passed. Call it regularly from the engine's thread."""
+        return self.autosave is not None and self.autosave.tick()
+
+    def stop_autosave(self):
+        """Writes any save still waiting and stops the autosave service."""
+        if self.autosave is not None:
+            self.autosave.stop()
+            self.autosave = None
+
     def load_system_module(self, module_id):
         """Loads a system module and sets it as the active module."""
         self.active_module = self.module_loader.load_module(module_id)
@@ -150,20 +340,67 @@ class Engine:
 
             print(f"{actor.attributes.get('name', actor.id)} deals {damage_amount} damage to {damage_target.attributes.get('name', damage_target.id)}. New HP: {new_hp}")
 
+    def _on_trigger(self, map_name, trigger, event, token_id):
+        """
+        Runs a trigger's reaction for a token entering or leaving it: either a
+        registered action performed by the token's entity, or a command line.
+        """
+        reaction = trigger.reaction(event)
+        if not reaction:
+            return
+        token = self.map_manager.get_map(map_name).get_object(token_id)
+        entity_id = getattr(token, 'entity_id', None)
+        label = trigger.name or trigger.id
+        print(f"Trigger '{label}' fired: {token_id} {'entered' if event == 'enter' else 'left'} it on map '{map_name}'.")
+
+        if reaction.startswith(ACTION_PREFIX):
+            actor = self.entity_manager.get_entity(entity_id) if entity_id else None
+            if actor is None:
+                print(f"Warning: Trigger '{label}' has no entity to perform its action.")
+                return
+            self.execute_action(reaction[len(ACTION_PREFIX):], actor=actor)
+        else:
+            self.command_handler.parse_and_handle(reaction.format(
+                token=token_id, entity=entity_id or "", map=map_name, trigger=trigger.id
+            ))
+
     def get_persistence_manager(self):
         return self.persistence_manager
 
     def save_game(self, filepath):
-        """Gathers the game state and saves it to a file."""
-        game_state = self.persistence_manager.gather_game_state(self)
-        return self.persistence_manager.save_game(game_state, filepath)
+        """
+        Gathers the game state and saves it to a file. While autosave runs,
+        JSON and binary saves are written by its worker thread and this
+        returns as soon as the state has been gathered.
+        """
+        if self.autosave is not None and not self.persistence_manager.is_database(filepath):
+            self.autosave.save_now(filepath)
+            print(f"Saving game to {filepath} in the background.")
+            return True
+        return self.persistence_manager.save_engine(self, filepath)
 
     def load_game(self, filepath):
         """Loads the game state from a file and restores the engine."""
         game_state = self.persistence_manager.load_game(filepath)
         if game_state is None:
             return False
-        return self.persistence_manager.restore_game_state(self, game_state)
+        restored = self.persistence_manager.restore_game_state(self, game_state)
+        # The journal only holds changes on top of its snapshot, so start over from the loaded state
+        self.snapshot()
+        return restored
+
+    def save_history(self, directory, label=""):
+        """Adds the game state to the save history kept in a directory. Returns the snapshot's ID."""
+        return self.persistence_manager.save_history(self, directory, label)
+
+    def restore_history(self, directory, snapshot_id=None):
+        """Restores the engine from a snapshot in a save history, the latest if no ID is given."""
+        game_state = self.persistence_manager.load_history(directory, snapshot_id)
+        if game_state is None:
+            return False
+        restored = self.persistence_manager.restore_game_state(self, game_state)
+        self.snapshot()
+        return restored
 
     def load_game_from_dict(self, game_state):
         """Loads the game state from a dictionary and restores the engine."""
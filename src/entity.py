@@ -1,12 +1,74 @@
-import uuid
+from .ids import new_id
+from .fragments import CachedFragment
 
-class Entity:
-    """A generic entity in the VTT."""
+
+class AttributeDict(dict):
+    """An entity's attributes. Changing them drops the entity's cached fragment."""
+
+    def __init__(self, entity, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._entity = entity
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._entity.invalidate_fragment()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._entity.invalidate_fragment()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._entity.invalidate_fragment()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._entity.invalidate_fragment()
+        return super().setdefault(key, default)
+
+    def pop(self, *args):
+        self._entity.invalidate_fragment()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._entity.invalidate_fragment()
+        return super().popitem()
+
+    def clear(self):
+        super().clear()
+        self._entity.invalidate_fragment()
+
+
+class Entity(CachedFragment):
+    """
+    A generic entity in the VTT. Its attributes are kept in an AttributeDict,
+    so its cached serialized form (see CachedFragment) follows their changes.
+    Every change is also reported to the EntityManager holding the entity.
+    """
     def __init__(self, entity_type, attributes=None):
-        self.id = str(uuid.uuid4())
+        self.id = new_id()
         self.entity_type = entity_type
         self.attributes = attributes if attributes is not None else {}
 
+    def __setattr__(self, name, value):
+        if name == 'attributes':
+            value = AttributeDict(self, value)
+        super().__setattr__(name, value)
+        self._report_change()
+
+    def invalidate_fragment(self):
+        super().invalidate_fragment()
+        self._report_change()
+
+    def _report_change(self):
+        manager = self.__dict__.get('_manager')
+        if manager is not None:
+            manager._entity_changed(self.id)
+
     def __repr__(self):
         return f"Entity(id={self.id}, type={self.entity_type}, attributes={self.attributes})"
 
@@ -15,7 +77,7 @@ class Entity:
         return {
             'id': self.id,
             'entity_type': self.entity_type,
-            'attributes': self.attributes
+            'attributes': dict(self.attributes)
         }
 
     @classmethod
@@ -26,14 +88,29 @@ class Entity:
         return entity
 
 class EntityManager:
-    """Manages all entities in the game session."""
+    """
+    Manages all entities in the game session.
+
+    If `change_handler` is set, it is called with an entity's ID whenever
+    that entity is added or changed, and with None when all entities are
+    cleared.
+    """
     def __init__(self):
         self._entities = {}
+        self.change_handler = None
+
+    def _add(self, entity):
+        self._entities[entity.id] = entity
+        entity._manager = self  # Reports the entity as added
+
+    def _entity_changed(self, entity_id):
+        if self.change_handler is not None:
+            self.change_handler(entity_id)
 
     def create_entity(self, entity_type, attributes=None):
         """Creates a new entity and adds it to the manager."""
         entity = Entity(entity_type, attributes)
-        self._entities[entity.id] = entity
+        self._add(entity)
         return entity
 
     def get_entity(self, entity_id):
@@ -93,19 +170,25 @@ class EntityManager:
     def to_dict(self):
         """Returns a serializable dictionary representation of the manager's state."""
         return {
-            'entities': [entity.to_dict() for entity in self._entities.values()]
+            'entities': [entity.to_fragment() for entity in self._entities.values()]
         }
 
     def load_from_dict(self, data):
         """Restores the manager's state from a dictionary."""
         self.clear_entities()
-        for entity_data in data.get('entities', []):
-            entity = Entity.from_dict(entity_data)
-            self._entities[entity.id] = entity
+        self.add_from_dicts(data.get('entities', []))
+
+    def add_from_dicts(self, entities_data):
+        """Adds entities from their dictionaries, replacing any with the same ID."""
+        for entity_data in entities_data:
+            self._add(Entity.from_dict(entity_data))
 
     def clear_entities(self):
         """Clears all entities from the manager."""
+        for entity in self._entities.values():
+            entity._manager = None
         self._entities.clear()
+        self._entity_changed(None)
 
     def find_entity_by_name(self, name):
         """Finds the first entity with a matching 'name' attribute."""
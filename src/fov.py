@@ -22,10 +22,7 @@ class ShadowLine:
     def add(self, shadow):
         """Adds a new shadow to the line, merging with existing shadows."""
         index = 0
-        for index, s in enumerate(self._shadows):
-            if s.start >= shadow.start:
-                break
-        else:
+        while index < len(self._shadows) and self._shadows[index].start < shadow.start:
             index += 1
 
         # Overlap with the previous shadow
@@ -43,7 +40,7 @@ class ShadowLine:
         if overlapping_next:
             if overlapping_previous:
                 # Overlaps both, merge previous and next, and discard new
-                overlapping_previous.end = overlapping_next.end
+                self._shadows[index - 1] = Shadow(overlapping_previous.start, overlapping_next.end)
                 self._shadows.pop(index)
             else:
                 # Overlaps next, merge with it
@@ -76,18 +73,23 @@ def calculate_fov(map_data, origin_x, origin_y, radius):
     visible_tiles = set()
     visible_tiles.add((origin_x, origin_y))
 
-    # Pre-calculate positions of blocking objects for faster lookups
-    walls = {
-        (obj.x, obj.y) for obj in map_data.objects if obj.blocks_light
-    }
+    # Pre-calculate the cells covered by blocking objects within range, using
+    # the map's spatial index. Opaque terrain cells are read straight from the
+    # map's terrain layer.
+    walls = set()
+    nearby = map_data.objects_in_rect(origin_x - radius, origin_y - radius, origin_x + radius, origin_y + radius)
+    for obj in nearby:
+        if obj.blocks_light:
+            walls.update(map_data.footprint(obj.id))
+    terrain = map_data.terrain
 
     for octant in range(8):
-        _refresh_octant(map_data, octant, origin_x, origin_y, radius, visible_tiles, walls)
+        _refresh_octant(map_data, octant, origin_x, origin_y, radius, visible_tiles, walls, terrain)
 
     return visible_tiles
 
 
-def _refresh_octant(map_data, octant, origin_x, origin_y, radius, visible_tiles, walls):
+def _refresh_octant(map_data, octant, origin_x, origin_y, radius, visible_tiles, walls, terrain):
     line = ShadowLine()
     full_shadow = False
 
@@ -108,7 +110,7 @@ def _refresh_octant(map_data, octant, origin_x, origin_y, radius, visible_tiles,
             is_visible = not line.is_in_shadow(projection)
             if is_visible:
                 visible_tiles.add((abs_x, abs_y))
-                if (abs_x, abs_y) in walls:
+                if (abs_x, abs_y) in walls or terrain.blocks_light(abs_x, abs_y):
                     line.add(projection)
                     full_shadow = line.is_full_shadow
 
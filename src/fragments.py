@@ -0,0 +1,88 @@
+import json
+
+_dumps = json.JSONEncoder(separators=(',', ':')).encode
+
+
+class Fragment(dict):
+    """
+    The serialized dictionary of one entity or map object, which also keeps
+    its JSON encoding once that has been asked for.
+
+    Objects cache their fragment until they change, and a changed object gets
+    a new fragment rather than an updated one, so the same fragment may be
+    part of many game states at once. Fragments must not be modified.
+    """
+    __slots__ = ('_json',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._json = None
+
+    @property
+    def json(self):
+        """The compact JSON encoding of this fragment."""
+        if self._json is None:
+            self._json = _dumps(self)
+        return self._json
+
+
+class CachedFragment:
+    """
+    Mixin for classes with a to_dict method: `to_fragment` returns to_dict()
+    as a Fragment, reused until an attribute of the object is set.
+    Changes made in place, to a list or dict attribute, must be followed by
+    a call to `invalidate_fragment`.
+    """
+
+    def __setattr__(self, name, value):
+        self.__dict__.pop('_fragment', None)
+        super().__setattr__(name, value)
+
+    def invalidate_fragment(self):
+        self.__dict__.pop('_fragment', None)
+
+    def to_fragment(self):
+        fragment = self.__dict__.get('_fragment')
+        if fragment is None:
+            fragment = self.__dict__['_fragment'] = Fragment(self.to_dict())
+        return fragment
+
+
+def encode(value):
+    """
+    Encodes a value as compact JSON. Fragments anywhere inside it are written
+    from their cached encoding, so a game state whose objects have not
+    changed since it was last encoded is mostly joined together from strings.
+    """
+    parts = []
+    _encode_into(value, parts)
+    return ''.join(parts)
+
+
+def _encode_into(value, parts):
+    if isinstance(value, Fragment):
+        parts.append(value.json)
+    elif isinstance(value, dict):
+        parts.append('{')
+        first = True
+        for key, item in value.items():
+            if not first:
+                parts.append(',')
+            first = False
+            parts.append(_dumps(key if isinstance(key, str) else _dumps(key)))
+            parts.append(':')
+            _encode_into(item, parts)
+        parts.append('}')
+    elif isinstance(value, (list, tuple)):
+        if value and all(type(item) is Fragment for item in value):
+            # The common case of a map's objects or the entity list
+            parts.extend(('[', ','.join([item.json for item in value]), ']'))
+            return
+        parts.append('[')
+        for index, item in enumerate(value):
+            if index:
+                parts.append(',')
+            _encode_into(item, parts)
+        parts.append(']')
+    else:
+        parts.append(_dumps(value))
@@ -11,7 +11,7 @@ class Group(MapObject):
         """Returns a serializable dictionary representation, including the list of object IDs."""
         data = super().to_dict()
         data.update({
-            'object_ids': self.object_ids
+            'object_ids': list(self.object_ids)
         })
         # Override object_type to be specific
         data['object_type'] = self.__class__.__name__
@@ -24,3 +24,56 @@ class Group(MapObject):
         obj = super().from_dict(data)
         obj.object_ids = data.get('object_ids', [])
         return obj
+
+
+def group_subtree(group, get_object):
+    """
+    Returns every object below a group, nested groups included, parents
+    before their members. The group itself is not included.
+
+    Args:
+        group (Group): The group to walk.
+        get_object (callable): Resolves an object ID to an object, or None.
+
+    Raises:
+        ValueError: If a member cannot be found or the groups form a cycle.
+    """
+    members = []
+    seen = {group.id}
+    stack = [group]
+    while stack:
+        current = stack.pop()
+        for member_id in current.object_ids:
+            if member_id in seen:
+                raise ValueError(f"Group '{group.id}' contains object '{member_id}' more than once or in a cycle.")
+            seen.add(member_id)
+            member = get_object(member_id)
+            if member is None:
+                raise ValueError(f"Member object with ID '{member_id}' of group '{current.id}' not found.")
+            members.append(member)
+            if isinstance(member, Group):
+                stack.append(member)
+    return members
+
+
+def check_group_members(group_id, member_ids, parents):
+    """
+    Raises ValueError if the members cannot join a group without forming a
+    cycle or ending up in two groups at once.
+
+    Args:
+        group_id (str): The group being added to.
+        member_ids (list): The IDs joining the group.
+        parents (Mapping): Member ID -> ID of the group currently holding it.
+    """
+    ancestors = {group_id}
+    parent = parents.get(group_id)
+    while parent is not None and parent not in ancestors:
+        ancestors.add(parent)
+        parent = parents.get(parent)
+    for member_id in member_ids:
+        if member_id in ancestors:
+            raise ValueError(f"Adding '{member_id}' to group '{group_id}' would create a cycle.")
+        owner = parents.get(member_id)
+        if owner is not None and owner != group_id:
+            raise ValueError(f"Object '{member_id}' already belongs to group '{owner}'.")
@@ -28,11 +28,7 @@ class MapView(View):
                     if grid_pos:
                         active_map = self.map_manager.get_active_map()
                         if active_map:
-                            found_obj = None
-                            for obj in reversed(active_map.objects):
-                                if (obj.x, obj.y) == grid_pos:
-                                    found_obj = obj
-                                    break
+                            found_obj = active_map.top_object_at(*grid_pos)
                             self.selected_object = found_obj
                             self.dragged_object = found_obj
                             if self.selected_object:
@@ -97,8 +93,8 @@ class MapView(View):
             end_pos = (self.map_offset[0] + game_map.width * self.cell_size, self.map_offset[1] + y * self.cell_size)
             pygame.draw.line(screen, self.grid_color, start_pos, end_pos)
 
-        # Draw objects
-        for obj in game_map.objects:
+        # Draw objects bottom to top so higher layers end up on top
+        for obj in game_map.iter_draw_order():
             pixel_x = self.map_offset[0] + obj.x * self.cell_size + self.cell_size // 2
             pixel_y = self.map_offset[1] + obj.y * self.cell_size + self.cell_size // 2
 
@@ -115,8 +111,8 @@ class MapView(View):
                 points = self._get_hex_points(pixel_x, pixel_y)
                 pygame.draw.polygon(screen, self.grid_color, points, 1)
 
-        # Draw objects
-        for obj in game_map.objects:
+        # Draw objects bottom to top so higher layers end up on top
+        for obj in game_map.iter_draw_order():
             pixel_x, pixel_y = self._offset_to_pixel(obj.x, obj.y)
             text_surface = self.font.render(obj.display_char, True, (255, 255, 255))
             text_rect = text_surface.get_rect(center=(pixel_x, pixel_y))
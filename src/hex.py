@@ -70,3 +70,8 @@ def roffset_to_cube(coord: OffsetCoord) -> Hex:
     r = coord.row
     s = -q - r
     return Hex(q, r, s)
+
+def roffset_neighbors(coord: OffsetCoord):
+    """Returns the six neighboring offset coordinates of an offset coordinate."""
+    center = roffset_to_cube(coord)
+    return [roffset_from_cube(hex_neighbor(center, d)) for d in range(6)]
@@ -0,0 +1,12 @@
+import uuid
+
+from .recorded import RecordedSource
+
+# Every persistent game object gets its ID from here, so the journal can
+# record the IDs a command created and hand out the same ones on replay.
+id_source = RecordedSource(lambda: str(uuid.uuid4()))
+
+
+def new_id():
+    """Returns a new unique ID string."""
+    return id_source.next()
@@ -50,7 +50,7 @@ class InitiativeTracker:
     def to_dict(self):
         """Returns a serializable dictionary representation of the tracker's state."""
         return {
-            'combatants': self.combatants
+            'combatants': dict(self.combatants)
         }
 
     def load_from_dict(self, data):
@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+import time
+
+from .fragments import encode
+
+JOURNAL_FILE = "journal.jsonl"
+SNAPSHOT_FILE = "snapshot.json"
+
+
+class CommandJournal:
+    """
+    A write-ahead log of the commands that changed the game, kept next to a
+    snapshot of the full game state.
+
+    Each entry records one command together with the dice it rolled and the
+    IDs it created, so replaying it on top of the snapshot gives the same
+    state it gave the first time. Entries are numbered and appended to a JSON
+    lines file in batches: once `batch_size` are waiting or the oldest has
+    waited `max_delay` seconds, they are written and synced to disk. The
+    delay is only checked when an entry is added or `tick` is called, so the
+    owner calls `tick` regularly; it may do so from another thread. A crash
+    can therefore lose at most the last unflushed batch.
+
+    Writing a snapshot empties the journal. The snapshot remembers the last
+    entry it includes, so entries left behind by a crash between writing the
+    snapshot and emptying the journal are skipped on recovery.
+    """
+
+    def __init__(self, directory, batch_size=16, max_delay=1.0):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.journal_path = os.path.join(directory, JOURNAL_FILE)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        os.makedirs(directory, exist_ok=True)
+
+        self._pending = []
+        self._oldest_pending = None
+        self._lock = threading.Lock()
+        self.entries_since_snapshot = 0
+        _, self.seq = self.load_snapshot()
+        for entry in self.read_entries(self.seq):
+            self.seq = entry['seq']
+            self.entries_since_snapshot += 1
+
+    def append(self, command, user=None, rolls=(), ids=(), ok=True, users=None):
+        """
+        Adds a command to the journal. It is written with the next batch.
+
+        Args:
+            command (str): The command line as it was executed.
+            user (dict, optional): The id, username and role of the user who ran it.
+            rolls (list): Every die rolled while it ran, in order.
+            ids (list): Every ID created while it ran, in order.
+            ok (bool): False if the command reported a failure.
+            users (list, optional): The users connected when it ran, as dicts
+                like `user`, if they changed since the previous entry.
+        """
+        with self._lock:
+            self.seq += 1
+            entry = {
+                'seq': self.seq,
+                'command': command,
+                'user': user,
+                'rolls': list(rolls),
+                'ids': list(ids),
+                'ok': ok
+            }
+            if users is not None:
+                entry['users'] = users
+            self._pending.append(entry)
+            self.entries_since_snapshot += 1
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+            if len(self._pending) >= self.batch_size or self._overdue():
+                self._flush()
+
+    def _overdue(self):
+        return self._oldest_pending is not None and time.monotonic() - self._oldest_pending >= self.max_delay
+
+    def tick(self):
+        """
+        Writes the waiting entries if the oldest has waited `max_delay` seconds.
+
+        Returns:
+            bool: True if entries were written.
+        """
+        with self._lock:
+            if not self._overdue():
+                return False
+            self._flush()
+            return True
+
+    @property
+    def pending(self):
+        """The number of entries waiting to be written."""
+        return len(self._pending)
+
+    def flush(self):
+        """Writes the waiting entries and syncs them to disk."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        lines = "".join(json.dumps(entry, separators=(',', ':')) + "\n" for entry in self._pending)
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending.clear()
+        self._oldest_pending = None
+
+    def read_entries(self, after_seq=0):
+        """
+        Returns the journaled entries numbered above after_seq, in order.
+        A line cut short by a crash ends the journal.
+        """
+        entries = []
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        print(f"Warning: Journal {self.journal_path} ends with an incomplete entry. Ignoring it.")
+                        break
+                    if entry['seq'] > after_seq:
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def write_snapshot(self, game_state):
+        """
+        Saves the full game state, which already includes every journaled
+        command, and empties the journal.
+        """
+        with self._lock:
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(encode({'seq': self.seq, 'state': game_state}))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+
+            # Entries still waiting are covered by the snapshot
+            self._pending.clear()
+            self._oldest_pending = None
+            with open(self.journal_path, 'w', encoding='utf-8'):
+                pass
+            self.entries_since_snapshot = 0
+
+    def load_snapshot(self):
+        """Returns (game_state, seq) of the latest snapshot, or (None, 0) if there is none."""
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None, 0
+        return data['state'], data['seq']
+
+    def close(self):
+        """Writes any waiting entries."""
+        self.flush()
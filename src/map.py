@@ -1,55 +1,688 @@
+from collections import ChainMap
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Optional
 from enum import Enum, auto
 from .map_object import MapObject
 from .token import Token
 from .shape import Shape
-from .group import Group
+from .group import Group, group_subtree, check_group_members
 from .path import Path
+from .terrain import TerrainLayer
+from .object_store import ObjectStore
+from .spatial_hash import SpatialHash
+from .occupancy import occupies, find_move_conflicts
+from .trigger import Trigger, ENTER, LEAVE
+from .hex import OffsetCoord, roffset_to_cube, hex_distance
+from .map_events import (
+    MapEventSource, ObjectMove, ObjectsAdded, ObjectsRemoved, ObjectsMoved, PropertyChanged, TerrainChanged,
+    TriggersChanged, TriggerFired
+)
 
 class GridType(Enum):
     SQUARE = auto()
     HEX = auto()
 
 @dataclass
-class Map:
-    """Represents a game map holding objects, with a specific grid type."""
+class Map(MapEventSource):
+    """
+    Represents a game map holding objects, with a specific grid type.
+
+    Objects are kept in an ObjectStore, so they iterate in insertion order
+    while lookups, additions and removals by ID are O(1). A spatial hash of
+    object footprints answers cell, rectangle and radius queries; it is kept
+    in sync as long as objects are added, moved and removed through the map.
+
+    Groups may contain other groups. The map keeps a parent index from each
+    member to the group holding it, rejects memberships that would form a
+    cycle or put an object in two groups, and caches each group's bounding box.
+
+    A second, smaller spatial index holds only the objects that occupy their
+    cells for movement (tokens and movement-blocking objects), so a move can
+    be checked for collisions by looking at the cells it would cover.
+
+    Each map carries a version counter and emits a typed event (see
+    map_events) for every change made through its methods or its terrain.
+
+    Triggers (see trigger.Trigger) are kept in their own spatial index over
+    the cells they cover. When a token is added or moved, only the triggers
+    overlapping its old or new footprint are checked, and a TriggerFired
+    event is sent for each one it entered or left.
+
+    A locked map (for example a template with live instances) rejects every
+    change with ValueError.
+    """
     name: str
     width: int
     height: int
-    objects: List[MapObject] = field(default_factory=list)
+    # Any iterable of objects may be passed; the map keeps them in its own ObjectStore
+    objects: ObjectStore = field(default_factory=ObjectStore)
     grid_type: GridType = GridType.SQUARE
     background_asset_path: Optional[str] = None
+    terrain: Optional[TerrainLayer] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._locks = set()
+        self.objects = ObjectStore(self.objects)
+        self._spatial = SpatialHash()
+        self._occupancy = SpatialHash()
+        self._group_parent = {}  # member_id -> ID of the group holding it
+        self._group_bounds = {}  # group_id -> cached (x0, y0, x1, y1)
+        self._triggers = {}  # trigger_id -> Trigger
+        self._trigger_index = SpatialHash()
+        self._trigger_occupants = {}  # trigger_id -> IDs of the tokens inside it
+        self._auras = {}  # object_id -> IDs of the triggers attached to it
+        self._distances = None  # DistanceCache, created on first use
+        for obj in self.objects:
+            if isinstance(obj, Group):
+                check_group_members(obj.id, obj.object_ids, self._group_parent)
+            self._index(obj)
+        if self.terrain is None:
+            self.terrain = TerrainLayer(self.width, self.height, hex_layout=self.grid_type == GridType.HEX)
+        self._init_events()
+        self.terrain.on_change = self._terrain_changed
+
+    def _terrain_changed(self, region):
+        self._emit(TerrainChanged, region=region)
+
+    def lock(self, owner: str):
+        """Makes the map and its terrain read-only until every owner has unlocked it."""
+        self._locks.add(owner)
+        self.terrain.read_only = True
+
+    def unlock(self, owner: str):
+        """Releases one owner's lock."""
+        self._locks.discard(owner)
+        self.terrain.read_only = bool(self._locks)
+
+    @property
+    def locked_by(self):
+        """The sorted owners currently holding a lock on the map."""
+        return sorted(self._locks)
+
+    def _check_writable(self):
+        if self._locks:
+            raise ValueError(f"Map '{self.name}' is locked by {', '.join(self.locked_by)} and cannot be changed.")
+
+    def _mutable_object(self, object_id):
+        """
+        Returns the object with the given ID ready to be changed in place, or None.
+        Every in-place change to an object goes through here.
+        """
+        self._check_writable()
+        return self.objects.get(object_id)
+
+    def _index(self, obj):
+        self._spatial.insert(obj)
+        if occupies(obj):
+            self._occupancy.insert(obj)
+        if isinstance(obj, Group):
+            for member_id in obj.object_ids:
+                self._group_parent[member_id] = obj.id
+        self._invalidate_bounds(obj.id)
+
+    def _unindex(self, obj, keep_membership=False):
+        # A token that disappears leaves its triggers silently
+        for trigger in self._trigger_index.in_cells(self._spatial.footprint(obj.id)):
+            self._trigger_occupants[trigger.id].discard(obj.id)
+        for trigger_id in list(self._auras.get(obj.id, ())):
+            self._drop_trigger(trigger_id)
+        self._spatial.remove(obj.id)
+        self._occupancy.remove(obj.id)
+        self._invalidate_bounds(obj.id)
+        if isinstance(obj, Group):
+            for member_id in obj.object_ids:
+                if self._group_parent.get(member_id) == obj.id:
+                    del self._group_parent[member_id]
+        parent_id = self._group_parent.pop(obj.id, None)
+        if parent_id is None or keep_membership:
+            return
+        # Leave no dangling ID behind in the group that held the object
+        parent = self._mutable_object(parent_id)
+        if parent is not None and obj.id in parent.object_ids:
+            before = list(parent.object_ids)
+            parent.object_ids = [member_id for member_id in before if member_id != obj.id]
+            self._emit(PropertyChanged, object_id=parent_id, name='object_ids',
+                       before=before, after=list(parent.object_ids))
+
+    def _reindex(self, obj):
+        """Updates the spatial indexes after an object's position, size or blocking changed."""
+        self._spatial.update(obj)
+        if occupies(obj):
+            self._occupancy.update(obj)
+        else:
+            self._occupancy.remove(obj.id)
+
+    def _invalidate_bounds(self, object_id):
+        """Drops the cached bounding box of an object (if it is a group) and of every group above it."""
+        self._group_bounds.pop(object_id, None)
+        self._invalidate_ancestors(object_id)
+
+    def _invalidate_ancestors(self, object_id):
+        seen = set()
+        group_id = self._group_parent.get(object_id)
+        while group_id is not None and group_id not in seen:
+            seen.add(group_id)
+            self._group_bounds.pop(group_id, None)
+            group_id = self._group_parent.get(group_id)
 
     def add_object(self, obj: MapObject):
-        """Adds an object to the map."""
-        if not any(o.id == obj.id for o in self.objects):
-            self.objects.append(obj)
+        """
+        Adds an object to the map. Objects whose ID is already present are ignored.
+        Raises ValueError if the object is a group whose members would form a cycle.
+        """
+        if obj.id in self.objects:
+            return
+        self._check_writable()
+        if isinstance(obj, Group):
+            check_group_members(obj.id, obj.object_ids, self._group_parent)
+        self.objects.add(obj)
+        self._index(obj)
+        self._emit(ObjectsAdded, objects=(obj,))
+        self._update_triggers(obj, ())
 
     def remove_object(self, object_id: str):
         """Removes an object from the map by its ID. Raises ValueError if not found."""
-        initial_count = len(self.objects)
-        self.objects = [o for o in self.objects if o.id != object_id]
-        if len(self.objects) == initial_count:
+        self._check_writable()
+        obj = self.objects.remove(object_id)
+        if obj is None:
             raise ValueError(f"Object with ID '{object_id}' not found on map '{self.name}'.")
+        self._unindex(obj)
+        self._emit(ObjectsRemoved, objects=(obj,))
+
+    def release_object(self, object_id: str):
+        """
+        Removes and returns an object without touching group memberships, so it
+        can be handed over to another map that continues to track its group.
+        Returns None if not found.
+        """
+        self._check_writable()
+        obj = self.objects.remove(object_id)
+        if obj is not None:
+            self._unindex(obj, keep_membership=True)
+            self._emit(ObjectsRemoved, objects=(obj,))
+        return obj
+
+    def add_objects(self, objs):
+        """
+        Adds many objects in one batch. Objects whose ID is already present are skipped.
+        Groups are checked before anything is added, so a batch that would form a
+        cycle raises ValueError and leaves the map unchanged.
+
+        Returns:
+            list: The objects that were added.
+        """
+        self._check_writable()
+        new_objs = []
+        seen = set()
+        parents = ChainMap({}, self._group_parent)
+        for obj in objs:
+            if obj.id in self.objects or obj.id in seen:
+                continue
+            seen.add(obj.id)
+            if isinstance(obj, Group):
+                check_group_members(obj.id, obj.object_ids, parents)
+                parents.maps[0].update(dict.fromkeys(obj.object_ids, obj.id))
+            new_objs.append(obj)
+
+        for obj in new_objs:
+            self.objects.add(obj)
+            self._index(obj)
+        if new_objs:
+            self._emit(ObjectsAdded, objects=tuple(new_objs))
+        for obj in new_objs:
+            self._update_triggers(obj, ())
+        return new_objs
+
+    def remove_objects(self, object_ids):
+        """
+        Removes many objects by ID in one batch. Unknown IDs are skipped.
+
+        Returns:
+            list: The objects that were removed.
+        """
+        self._check_writable()
+        removed = []
+        for object_id in object_ids:
+            obj = self.objects.remove(object_id)
+            if obj is not None:
+                self._unindex(obj)
+                removed.append(obj)
+        if removed:
+            self._emit(ObjectsRemoved, objects=tuple(removed))
+        return removed
+
+    def _replace(self, obj):
+        """Puts an object in place of the one with the same ID, keeping its draw position and group."""
+        old = self.objects.get(obj.id)
+        self.objects.replace(obj)
+        if obj.layer != old.layer:
+            self.objects.set_layer(obj.id, obj.layer)
+        self._reindex(obj)
+        if isinstance(old, Group):
+            for member_id in old.object_ids:
+                if self._group_parent.get(member_id) == obj.id:
+                    del self._group_parent[member_id]
+        if isinstance(obj, Group):
+            for member_id in obj.object_ids:
+                self._group_parent[member_id] = obj.id
+        self._invalidate_bounds(obj.id)
+
+    def replace_objects(self, objs):
+        """
+        Brings objects up to date from their copies made elsewhere, such as on
+        a server: each object takes the place of the one with the same ID, or
+        is added if there is none. Replaced objects are reported as removed
+        and added again.
+
+        Returns:
+            list: The objects that were added rather than replaced.
+        """
+        self._check_writable()
+        replaced, old_objs, old_cells, new_objs = [], [], {}, []
+        for obj in objs:
+            old = self.objects.get(obj.id)
+            if old is None:
+                new_objs.append(obj)
+                continue
+            old_cells[obj.id] = self._spatial.footprint(obj.id)
+            self._replace(obj)
+            replaced.append(obj)
+            old_objs.append(old)
+        if replaced:
+            self._emit(ObjectsRemoved, objects=tuple(old_objs))
+            self._emit(ObjectsAdded, objects=tuple(replaced))
+        for obj in replaced:
+            self._update_triggers(obj, old_cells[obj.id])
+        return self.add_objects(new_objs)
 
     def get_object(self, object_id: str):
         """Retrieves an object from the map by its ID."""
-        for obj in self.objects:
-            if obj.id == object_id:
-                return obj
-        return None
+        return self.objects.get(object_id)
+
+    def move_object(self, object_id: str, new_x: int, new_y: int):
+        """Moves an object to new coordinates. Raises ValueError if not found."""
+        obj = self._mutable_object(object_id)
+        if obj is None:
+            raise ValueError(f"Object with ID '{object_id}' not found on map '{self.name}'.")
+        before = (obj.x, obj.y)
+        old_cells = self._spatial.footprint(object_id)
+        obj.x = new_x
+        obj.y = new_y
+        self._reindex(obj)
+        self._invalidate_bounds(object_id)
+        self._emit(ObjectsMoved, moves=(ObjectMove(object_id, before, (new_x, new_y)),))
+        self._update_triggers(obj, old_cells)
+        return obj
+
+    def _get_group(self, group_id):
+        group = self.objects.get(group_id)
+        if not isinstance(group, Group):
+            raise ValueError(f"Group with ID '{group_id}' not found on map '{self.name}'.")
+        return group
+
+    def move_group(self, group_id: str, new_x: int, new_y: int):
+        """
+        Moves a group's anchor to new coordinates and translates every object
+        below it, nested groups included, by the same offset.
+
+        The whole subtree is resolved before anything moves, so a missing
+        member or a cycle raises ValueError and leaves the map unchanged.
+
+        Returns:
+            list: The moved objects, the group first.
+        """
+        group = self._get_group(group_id)
+        subtree = [group] + group_subtree(group, self.objects.get)
+        moved = [self._mutable_object(obj.id) for obj in subtree]
+        dx = new_x - group.x
+        dy = new_y - group.y
+        moves = []
+        old_cells = {}
+        for obj in moved:
+            moves.append(ObjectMove(obj.id, (obj.x, obj.y), (obj.x + dx, obj.y + dy)))
+            old_cells[obj.id] = self._spatial.footprint(obj.id)
+            obj.x += dx
+            obj.y += dy
+            self._reindex(obj)
+
+        # Boxes cached inside the subtree move with it; only the groups above need recomputing
+        for obj in moved:
+            bounds = self._group_bounds.get(obj.id)
+            if bounds is not None:
+                x0, y0, x1, y1 = bounds
+                self._group_bounds[obj.id] = (x0 + dx, y0 + dy, x1 + dx, y1 + dy)
+        self._invalidate_ancestors(group_id)
+        self._emit(ObjectsMoved, moves=tuple(moves))
+        for obj in moved:
+            self._update_triggers(obj, old_cells[obj.id])
+        return moved
+
+    def add_to_group(self, group_id: str, member_ids):
+        """Adds objects to a group. Raises ValueError if that would form a cycle."""
+        group = self._get_group(group_id)
+        member_ids = [m for m in member_ids if m not in group.object_ids]
+        check_group_members(group_id, member_ids, self._group_parent)
+        if not member_ids:
+            return
+        group = self._mutable_object(group_id)
+        before = list(group.object_ids)
+        group.object_ids = before + member_ids
+        for member_id in member_ids:
+            self._group_parent[member_id] = group_id
+        self._invalidate_bounds(group_id)
+        self._emit(PropertyChanged, object_id=group_id, name='object_ids', before=before, after=list(group.object_ids))
+
+    def remove_from_group(self, group_id: str, member_ids):
+        """Removes objects from a group, leaving them on the map."""
+        self._get_group(group_id)
+        group = self._mutable_object(group_id)
+        before = list(group.object_ids)
+        removed = set(member_ids).intersection(before)
+        if not removed:
+            return
+        group.object_ids = [member_id for member_id in before if member_id not in removed]
+        for member_id in removed:
+            if self._group_parent.get(member_id) == group_id:
+                del self._group_parent[member_id]
+        self._invalidate_bounds(group_id)
+        self._emit(PropertyChanged, object_id=group_id, name='object_ids', before=before, after=list(group.object_ids))
+
+    def parent_group(self, object_id: str):
+        """Returns the ID of the group directly holding an object, or None."""
+        return self._group_parent.get(object_id)
+
+    def group_members(self, group_id: str):
+        """Returns every object below a group, nested groups included."""
+        return group_subtree(self._get_group(group_id), self.objects.get)
+
+    def group_bounds(self, group_id: str):
+        """
+        Returns the inclusive bounding box (x0, y0, x1, y1) of a group's members'
+        footprints, nested groups included. An empty group covers its own anchor.
+        The box is cached until something inside the group moves or changes membership.
+        """
+        bounds = self._group_bounds.get(group_id)
+        if bounds is not None:
+            return bounds
+
+        group = self._get_group(group_id)
+        boxes = []
+        for member_id in group.object_ids:
+            member = self.objects.get(member_id)
+            if isinstance(member, Group):
+                boxes.append(self.group_bounds(member_id))
+            elif member is not None:
+                boxes.append((member.x, member.y, member.x + member.size - 1, member.y + member.size - 1))
+        if not boxes:
+            boxes.append((group.x, group.y, group.x + group.size - 1, group.y + group.size - 1))
+
+        bounds = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                  max(b[2] for b in boxes), max(b[3] for b in boxes))
+        self._group_bounds[group_id] = bounds
+        return bounds
+
+    def occupants_at(self, x: int, y: int):
+        """Returns the tokens and movement-blocking objects covering a cell."""
+        return self._occupancy.at_cell(x, y)
+
+    def check_move(self, object_id: str, new_x: int, new_y: int):
+        """
+        Checks whether an object's footprint fits at new coordinates: inside the
+        map, on passable terrain and clear of other tokens and blocking objects.
+        Only the cells the footprint would cover are looked at.
+
+        Returns:
+            list: The MoveConflicts found; empty if the move is clear.
+        """
+        obj = self.objects.get(object_id)
+        if obj is None:
+            raise ValueError(f"Object with ID '{object_id}' not found on map '{self.name}'.")
+        return find_move_conflicts(self, obj, new_x, new_y, self._occupancy.at_cell)
+
+    def token_distances(self, rule=None):
+        """
+        Returns a DistanceMatrix of every token to every other token, computed
+        in one vectorized pass and cached until the map next changes.
+
+        Args:
+            rule (DistanceRule, optional): How diagonals count on square maps.
+                Defaults to Chebyshev. Hex maps always count hex steps.
+        """
+        from .distance import DistanceCache, DistanceRule  # distance imports this module
+        if self._distances is None:
+            self._distances = DistanceCache()
+        return self._distances.get(self, rule or DistanceRule.CHEBYSHEV)
+
+    def set_object_layer(self, object_id: str, layer: int):
+        """Moves an object to another layer, above the objects already on it."""
+        obj = self._mutable_object(object_id)
+        if obj is None:
+            raise ValueError(f"Object with ID '{object_id}' not found on map '{self.name}'.")
+        before = obj.layer
+        self.objects.set_layer(object_id, layer)
+        self._emit(PropertyChanged, object_id=object_id, name='layer', before=before, after=layer)
+
+    def set_object_property(self, object_id: str, name: str, value):
+        """
+        Changes one attribute of an object and emits a PropertyChanged event.
+        A layer is changed through set_object_layer. Positions and group
+        members have their own methods, which keep the map's indexes in sync;
+        they are rejected here.
+        Raises ValueError if the object or attribute does not exist.
+        """
+        if name == 'layer':
+            self.set_object_layer(object_id, value)
+            return
+        obj = self._mutable_object(object_id)
+        if obj is None:
+            raise ValueError(f"Object with ID '{object_id}' not found on map '{self.name}'.")
+        if name in ('id', 'x', 'y', 'object_ids'):
+            raise ValueError(f"Property '{name}' cannot be set directly; use the map's dedicated method.")
+        if not hasattr(obj, name):
+            raise ValueError(f"Object '{object_id}' has no property '{name}'.")
+
+        before = getattr(obj, name)
+        old_cells = self._spatial.footprint(object_id)
+        setattr(obj, name, value)
+        if name in ('size', 'blocks_movement'):
+            self._reindex(obj)
+            self._invalidate_bounds(object_id)
+        self._emit(PropertyChanged, object_id=object_id, name=name, before=before, after=value)
+        if name == 'size':
+            self._update_triggers(obj, old_cells)
+
+    @property
+    def triggers(self):
+        """The map's triggers, in the order they were added."""
+        return list(self._triggers.values())
+
+    def get_trigger(self, trigger_id: str):
+        """Retrieves a trigger by its ID."""
+        return self._triggers.get(trigger_id)
+
+    def add_trigger(self, trigger: Trigger):
+        """
+        Adds a trigger to the map. Tokens already inside its area count as
+        occupants without firing it. Raises ValueError if the trigger is an
+        aura whose object is not on the map, or its ID is already in use.
+        """
+        self._check_writable()
+        if trigger.id in self._triggers:
+            raise ValueError(f"Trigger with ID '{trigger.id}' already exists on map '{self.name}'.")
+        if trigger.attached_to is not None and trigger.attached_to not in self.objects:
+            raise ValueError(f"Object with ID '{trigger.attached_to}' not found on map '{self.name}'.")
+        self._triggers[trigger.id] = trigger
+        if trigger.attached_to is not None:
+            self._auras.setdefault(trigger.attached_to, []).append(trigger.id)
+        cells = self._trigger_cells(trigger)
+        self._trigger_index.insert(trigger, cells)
+        self._trigger_occupants[trigger.id] = {
+            token.id for token in self._spatial.in_cells(cells) if self._is_occupant(trigger, token)
+        }
+        self._emit(TriggersChanged, added=(trigger,), removed=())
+        return trigger
+
+    def remove_trigger(self, trigger_id: str):
+        """Removes a trigger without firing it. Raises ValueError if not found."""
+        self._check_writable()
+        if trigger_id not in self._triggers:
+            raise ValueError(f"Trigger with ID '{trigger_id}' not found on map '{self.name}'.")
+        trigger = self._drop_trigger(trigger_id)
+        self._emit(TriggersChanged, added=(), removed=(trigger,))
+        return trigger
+
+    def _drop_trigger(self, trigger_id):
+        trigger = self._triggers.pop(trigger_id)
+        self._trigger_index.remove(trigger_id)
+        del self._trigger_occupants[trigger_id]
+        if trigger.attached_to is not None:
+            auras = self._auras[trigger.attached_to]
+            auras.remove(trigger_id)
+            if not auras:
+                del self._auras[trigger.attached_to]
+        return trigger
+
+    def trigger_occupants(self, trigger_id: str):
+        """Returns the IDs of the tokens currently inside a trigger's area."""
+        return set(self._trigger_occupants.get(trigger_id, ()))
+
+    def _trigger_cells(self, trigger):
+        """Returns the cells of the map a trigger currently covers."""
+        x, y = trigger.x, trigger.y
+        if trigger.attached_to is not None:
+            anchor = self.objects.get(trigger.attached_to)
+            x += anchor.x
+            y += anchor.y
+        if trigger.radius is not None:
+            in_range = self._radius_filter(x, y, trigger.radius)
+            x0, y0, x1, y1 = x - trigger.radius, y - trigger.radius, x + trigger.radius, y + trigger.radius
+        else:
+            in_range = None
+            x0, y0, x1, y1 = x, y, x + trigger.width - 1, y + trigger.height - 1
+        return [
+            (cx, cy)
+            for cy in range(max(y0, 0), min(y1, self.height - 1) + 1)
+            for cx in range(max(x0, 0), min(x1, self.width - 1) + 1)
+            if in_range is None or in_range(cx, cy)
+        ]
+
+    def _is_occupant(self, trigger, obj):
+        """Tokens overlapping a trigger's area are inside it; an aura ignores the token carrying it."""
+        if not isinstance(obj, Token) or obj.id == trigger.attached_to:
+            return False
+        return any(
+            t.id == trigger.id
+            for cell in self._spatial.footprint(obj.id)
+            for t in self._trigger_index.at_cell(*cell)
+        )
+
+    def _settle(self, trigger, token):
+        """Fires a trigger if a token's presence inside its area changed."""
+        occupants = self._trigger_occupants.get(trigger.id)
+        if occupants is None:
+            return  # Removed by a reaction to an earlier event
+        inside = token.id in self.objects and self._is_occupant(trigger, token)
+        if inside == (token.id in occupants):
+            return
+        if inside:
+            occupants.add(token.id)
+        else:
+            occupants.discard(token.id)
+        self._notify(TriggerFired, trigger_id=trigger.id, event=ENTER if inside else LEAVE, object_id=token.id)
+
+    def _update_triggers(self, obj, old_cells):
+        """
+        Brings trigger occupancy up to date after an object was added, moved
+        or resized: auras it carries follow it, and a token is checked only
+        against the triggers overlapping its old or new footprint.
+        """
+        for trigger_id in list(self._auras.get(obj.id, ())):
+            trigger = self._triggers.get(trigger_id)
+            if trigger is None:
+                continue
+            before = self._trigger_index.footprint(trigger_id)
+            cells = self._trigger_cells(trigger)
+            self._trigger_index.remove(trigger_id)
+            self._trigger_index.insert(trigger, cells)
+            affected = {t.id: t for t in self._spatial.in_cells(set(before) | set(cells))}
+            for token_id in self._trigger_occupants.get(trigger_id, ()):
+                affected.setdefault(token_id, self.objects.get(token_id))
+            for token in list(affected.values()):
+                if isinstance(token, Token):
+                    self._settle(trigger, token)
+
+        if isinstance(obj, Token):
+            cells = set(old_cells) | set(self._spatial.footprint(obj.id))
+            for trigger in self._trigger_index.in_cells(cells):
+                self._settle(trigger, obj)
+
+    def iter_draw_order(self):
+        """Iterates over all objects bottom to top, without sorting."""
+        return self.objects.in_layer_order()
+
+    def top_object_at(self, x: int, y: int):
+        """Returns the topmost object covering a cell, or None."""
+        candidates = self._spatial.at_cell(x, y)
+        if not candidates:
+            return None
+        return max(candidates, key=lambda o: self.objects.order_of(o.id))
+
+    def _in_layer_order(self, objs):
+        """Sorts objects bottom to top: by layer, then by insertion order."""
+        return sorted(objs, key=lambda o: self.objects.order_of(o.id))
+
+    def objects_at(self, x: int, y: int):
+        """Returns the objects whose footprint covers a cell, in layer order (topmost last)."""
+        return self._in_layer_order(self._spatial.at_cell(x, y))
+
+    def objects_in_rect(self, x0: int, y0: int, x1: int, y1: int):
+        """Returns the objects overlapping the inclusive rectangle (x0, y0)-(x1, y1), in layer order."""
+        return self._in_layer_order(self._spatial.in_rect(x0, y0, x1, y1))
+
+    def objects_in_radius(self, x: int, y: int, radius: int):
+        """
+        Returns the objects with any footprint cell within radius of (x, y), in layer order.
+        Square maps use Euclidean distance between cells; hex maps use hex distance.
+        """
+        in_range = self._radius_filter(x, y, radius)
+        candidates = self._spatial.in_rect(x - radius, y - radius, x + radius, y + radius, in_range)
+        return self._in_layer_order(candidates)
+
+    def _radius_filter(self, x, y, radius):
+        """Returns a function telling whether a cell lies within radius of (x, y) on this map's grid."""
+        if self.grid_type == GridType.HEX:
+            center = roffset_to_cube(OffsetCoord(x, y))
+            def in_range(cx, cy):
+                return hex_distance(center, roffset_to_cube(OffsetCoord(cx, cy))) <= radius
+        else:
+            def in_range(cx, cy):
+                return (cx - x) ** 2 + (cy - y) ** 2 <= radius * radius
+        return in_range
+
+    def objects_in_cells(self, cells):
+        """Returns the objects whose footprint covers any of the given cells, in layer order."""
+        return self._in_layer_order(self._spatial.in_cells(cells))
+
+    def footprint(self, object_id: str):
+        """Returns the cells an object on this map currently covers."""
+        return self._spatial.footprint(object_id)
 
     def to_dict(self):
         """Returns a serializable dictionary representation of the map."""
-        return {
+        data = {
             'name': self.name,
             'width': self.width,
             'height': self.height,
             'grid_type': self.grid_type.name,
             'background_asset_path': self.background_asset_path,
-            'objects': [obj.to_dict() for obj in self.objects]
+            'objects': [obj.to_fragment() for obj in self.objects]
         }
+        # Untouched terrain is omitted to keep saves small and backwards compatible
+        if not self.terrain.is_default():
+            data['terrain'] = self.terrain.to_dict()
+        if self._triggers:
+            data['triggers'] = [trigger.to_dict() for trigger in self._triggers.values()]
+        return data
 
     @classmethod
     def from_dict(cls, data):
@@ -61,34 +694,50 @@ class Map:
             print(f"Warning: Unknown grid type '{grid_type_name}'. Defaulting to SQUARE.")
             grid_type = GridType.SQUARE
 
+        terrain = None
+        if 'terrain' in data:
+            terrain = TerrainLayer.from_dict(data['terrain'], hex_layout=grid_type == GridType.HEX)
+
         map_instance = cls(
             name=data['name'],
             width=data['width'],
             height=data['height'],
             grid_type=grid_type,
-            background_asset_path=data.get('background_asset_path')
+            background_asset_path=data.get('background_asset_path'),
+            terrain=terrain
         )
 
-        objects_data = data.get('objects', [])
-        for obj_data in objects_data:
-            obj_type = obj_data.get('object_type')
-
-            new_obj = None
-            if obj_type == 'Token':
-                new_obj = Token.from_dict(obj_data)
-            elif obj_type == 'Shape':
-                new_obj = Shape.from_dict(obj_data)
-            elif obj_type == 'Group':
-                new_obj = Group.from_dict(obj_data)
-            elif obj_type == 'Path':
-                new_obj = Path.from_dict(obj_data)
-            elif obj_type == 'MapObject':
-                new_obj = MapObject.from_dict(obj_data)
-            else:
-                print(f"Warning: Unknown object type '{obj_type}' found in map data. Skipping.")
-                continue
-
+        for obj_data in data.get('objects', []):
+            new_obj = object_from_dict(obj_data)
             if new_obj:
-                map_instance.objects.append(new_obj)
+                try:
+                    map_instance.add_object(new_obj)
+                except ValueError as e:
+                    print(f"Warning: {e} Skipping.")
+        map_instance._load_triggers(data.get('triggers', []))
 
         return map_instance
+
+    def _load_triggers(self, triggers_data):
+        for trigger_data in triggers_data:
+            try:
+                self.add_trigger(Trigger.from_dict(trigger_data))
+            except ValueError as e:
+                print(f"Warning: {e} Skipping.")
+
+
+def object_from_dict(obj_data):
+    """Creates a map object of the right type from a dictionary. Returns None for unknown types."""
+    obj_type = obj_data.get('object_type')
+    if obj_type == 'Token':
+        return Token.from_dict(obj_data)
+    elif obj_type == 'Shape':
+        return Shape.from_dict(obj_data)
+    elif obj_type == 'Group':
+        return Group.from_dict(obj_data)
+    elif obj_type == 'Path':
+        return Path.from_dict(obj_data)
+    elif obj_type == 'MapObject':
+        return MapObject.from_dict(obj_data)
+    print(f"Warning: Unknown object type '{obj_type}' found in map data. Skipping.")
+    return None
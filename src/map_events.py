@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from typing import NamedTuple, Optional, Tuple, Any
+
+
+class ObjectMove(NamedTuple):
+    """One object's position before and after a move."""
+    object_id: str
+    before: Tuple[int, int]
+    after: Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class MapEvent:
+    """Base class of the change events a map emits. `version` is the map's version after the change."""
+    map_name: str
+    version: int
+
+
+@dataclass(frozen=True)
+class ObjectsAdded(MapEvent):
+    objects: tuple
+
+
+@dataclass(frozen=True)
+class ObjectsRemoved(MapEvent):
+    objects: tuple
+
+
+@dataclass(frozen=True)
+class ObjectsMoved(MapEvent):
+    moves: Tuple[ObjectMove, ...]
+
+
+@dataclass(frozen=True)
+class PropertyChanged(MapEvent):
+    object_id: str
+    name: str
+    before: Any
+    after: Any
+
+
+@dataclass(frozen=True)
+class TerrainChanged(MapEvent):
+    """`region` is the inclusive (x0, y0, x1, y1) rectangle that holds every changed cell."""
+    region: Optional[Tuple[int, int, int, int]]
+
+
+@dataclass(frozen=True)
+class TriggersChanged(MapEvent):
+    """Triggers were added to or removed from the map. Auras dropped with their object are not reported."""
+    added: tuple
+    removed: tuple
+
+
+@dataclass(frozen=True)
+class TriggerFired(MapEvent):
+    """A token entered or left a trigger's area. This is a notification, not a change, so `version` is unchanged."""
+    trigger_id: str
+    event: str
+    object_id: str
+
+
+class MapEventSource:
+    """
+    Gives a map a version counter and a subscription API.
+
+    Every mutation bumps the version by one and, if anyone is subscribed,
+    delivers a single typed event describing it, so derived structures can
+    update incrementally instead of rescanning the map. Batch operations
+    emit one event for the whole batch.
+    """
+
+    def _init_events(self):
+        self.version = 0
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """
+        Calls `callback(event)` after every change to the map.
+
+        Returns:
+            callable: A function that removes the subscription.
+        """
+        self._subscribers.append(callback)
+
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+        return unsubscribe
+
+    def _emit(self, event_type, **fields):
+        self.version += 1
+        self._notify(event_type, **fields)
+
+    def _notify(self, event_type, **fields):
+        """Delivers an event without counting it as a change."""
+        if not self._subscribers:
+            return
+        event = event_type(map_name=self.name, version=self.version, **fields)
+        for callback in list(self._subscribers):
+            callback(event)
@@ -0,0 +1,108 @@
+import copy
+
+from .map import Map, GridType, object_from_dict
+from .terrain import TerrainLayer
+
+
+class MapInstance(Map):
+    """
+    A copy-on-write instance of a template map.
+
+    An instance starts out sharing every object and the terrain grid with its
+    template; only its indexes are its own. The first change to a shared
+    object replaces it with a private copy, and the first terrain change
+    copies the grid. The template is locked for as long as instances exist,
+    so the shared objects stay exactly as the template saved them.
+
+    Saves hold only the instance's overrides: the objects it owns, the IDs of
+    template objects it removed, and its terrain if it was changed.
+    """
+
+    @classmethod
+    def from_template(cls, template, name, terrain=None):
+        """Creates an instance of a template map. The caller is responsible for locking the template."""
+        instance = cls(
+            name=name,
+            width=template.width,
+            height=template.height,
+            grid_type=template.grid_type,
+            background_asset_path=template.background_asset_path,
+            terrain=terrain if terrain is not None else template.terrain.share()
+        )
+        instance.template = template
+        instance.objects = template.objects.copy()
+        instance._spatial = template._spatial.copy()
+        instance._occupancy = template._occupancy.copy()
+        instance._group_parent = dict(template._group_parent)
+        instance._group_bounds = dict(template._group_bounds)
+        instance._shared_ids = {obj.id for obj in instance.objects}
+        instance._removed_ids = set()
+        for trigger in template.triggers:
+            instance.add_trigger(copy.copy(trigger))
+        return instance
+
+    @property
+    def shared_count(self):
+        """The number of objects still shared with the template."""
+        return len(self._shared_ids)
+
+    def _mutable_object(self, object_id):
+        obj = super()._mutable_object(object_id)
+        if obj is not None and object_id in self._shared_ids:
+            obj = copy.deepcopy(obj)
+            self._replace(obj)
+        return obj
+
+    def _replace(self, obj):
+        """Puts an instance-owned object in place of the shared or owned one with the same ID."""
+        super()._replace(obj)
+        self._shared_ids.discard(obj.id)
+
+    def _index(self, obj):
+        super()._index(obj)
+        self._removed_ids.discard(obj.id)
+
+    def _unindex(self, obj, keep_membership=False):
+        super()._unindex(obj, keep_membership)
+        self._shared_ids.discard(obj.id)
+        if obj.id in self.template.objects:
+            self._removed_ids.add(obj.id)
+
+    def to_dict(self):
+        """Returns the instance's overrides and a reference to its template."""
+        data = {
+            'map_type': 'instance',
+            'name': self.name,
+            'template': self.template.name,
+            'removed': sorted(self._removed_ids),
+            'objects': [obj.to_fragment() for obj in self.objects if obj.id not in self._shared_ids]
+        }
+        if not self.terrain.is_shared:
+            data['terrain'] = self.terrain.to_dict()
+        # Triggers are small, so the instance keeps its full list rather than overrides
+        data['triggers'] = [trigger.to_dict() for trigger in self.triggers]
+        return data
+
+    @classmethod
+    def from_dict(cls, data, template):
+        """Recreates an instance from its overrides on top of an already loaded template."""
+        terrain = None
+        if 'terrain' in data:
+            terrain = TerrainLayer.from_dict(data['terrain'], hex_layout=template.grid_type == GridType.HEX)
+        instance = cls.from_template(template, data['name'], terrain)
+        instance.remove_objects(data.get('removed', []))
+
+        for obj_data in data.get('objects', []):
+            obj = object_from_dict(obj_data)
+            if obj is None:
+                continue
+            if obj.id in instance._shared_ids:
+                instance._replace(obj)
+            else:
+                instance.add_object(obj)
+
+        if 'triggers' in data:
+            for trigger in instance.triggers:
+                instance.remove_trigger(trigger.id)
+            instance._load_triggers(data['triggers'])
+        return instance
@@ -1,16 +1,60 @@
+from typing import Callable, NamedTuple, Optional
+
 from .map import Map, GridType
+from .chunked_map import ChunkedMap, DEFAULT_MEMORY_BUDGET
+from .map_instance import MapInstance
 from .map_object import MapObject
 from .group import Group
+from .occupancy import describe_conflicts
+from .map_events import TriggerFired
+
+class DeferredMap(NamedTuple):
+    """A saved map that is only decoded when it is first used."""
+    load: Callable[[], dict]
+    template: Optional[str] = None  # The template's name, for instances
+
 
 class MapManager:
-    """Manages all game maps and the objects on them."""
+    """
+    Manages all game maps and the objects on them.
+
+    When a token sets off a trigger on any managed map, `trigger_handler`
+    is called with (map_name, trigger, event, token_id), if one is set.
+    `change_handler`, if set, is called with every change event of every
+    managed map (see map_events), and with None when from_dict replaces
+    all maps.
+
+    Maps restored from a save may be deferred: they are only built from
+    their saved data the first time they are looked up.
+    """
     def __init__(self):
         self._maps = {}
+        self._deferred = {}  # name -> DeferredMap, in save order
         self.active_map_name = None
+        self.trigger_handler = None
+        self.change_handler = None
+
+    def _has_map(self, name):
+        return name in self._maps or name in self._deferred
+
+    def _register(self, game_map):
+        """Adds a map to the manager and starts listening for its changes and triggers."""
+        self._maps[game_map.name] = game_map
+        game_map.subscribe(self._on_map_event)
+
+    def _on_map_event(self, event):
+        if not isinstance(event, TriggerFired):
+            if self.change_handler is not None:
+                self.change_handler(event)
+        elif self.trigger_handler is not None:
+            game_map = self.get_map(event.map_name)
+            trigger = game_map.get_trigger(event.trigger_id) if game_map else None
+            if trigger is not None:
+                self.trigger_handler(event.map_name, trigger, event.event, event.object_id)
 
     def create_map(self, name, width, height, grid_type=GridType.SQUARE, background=None):
         """Creates a new map and adds it to the manager."""
-        if name in self._maps:
+        if self._has_map(name):
             raise ValueError(f"A map with the name '{name}' already exists.")
 
         new_map = Map(
@@ -20,16 +64,73 @@ class MapManager:
             grid_type=grid_type,
             background_asset_path=background
         )
-        self._maps[name] = new_map
+        self._register(new_map)
         self.set_active_map(name)
         print(f"Created new {grid_type.name.lower()} map '{name}' of size {width}x{height}.")
         if background:
             print(f"  with background: {background}")
         return new_map
 
+    def create_chunked_map(self, name, width, height, store_dir, chunk_size=64,
+                           grid_type=GridType.SQUARE, background=None, memory_budget=DEFAULT_MEMORY_BUDGET):
+        """Creates a new chunked map whose chunks are stored under store_dir and adds it to the manager."""
+        if self._has_map(name):
+            raise ValueError(f"A map with the name '{name}' already exists.")
+
+        new_map = ChunkedMap(
+            name=name,
+            width=width,
+            height=height,
+            store_dir=store_dir,
+            chunk_size=chunk_size,
+            grid_type=grid_type,
+            background_asset_path=background,
+            memory_budget=memory_budget
+        )
+        self._register(new_map)
+        self.set_active_map(name)
+        print(f"Created new chunked {grid_type.name.lower()} map '{name}' of size {width}x{height} "
+              f"({chunk_size}x{chunk_size} chunks stored in {store_dir}).")
+        return new_map
+
+    def create_instance(self, template_name, name):
+        """
+        Creates a copy-on-write instance of a template map and adds it to the manager.
+        The template is locked against changes until all of its instances are deleted.
+        """
+        if self._has_map(name):
+            raise ValueError(f"A map with the name '{name}' already exists.")
+        template = self.get_map(template_name)
+        if not template:
+            raise ValueError(f"Map '{template_name}' not found.")
+        if type(template) is not Map:
+            raise ValueError(f"Map '{template_name}' cannot be used as a template; only regular maps can.")
+
+        instance = MapInstance.from_template(template, name)
+        template.lock(name)
+        self._register(instance)
+        self.set_active_map(name)
+        print(f"Created instance '{name}' of template map '{template_name}'.")
+        return instance
+
+    def delete_map(self, name):
+        """Deletes a map. Templates cannot be deleted while they have instances."""
+        game_map = self.get_map(name)
+        if not game_map:
+            raise ValueError(f"Map '{name}' not found.")
+        if isinstance(game_map, Map) and game_map.locked_by:
+            raise ValueError(f"Map '{name}' is the template of {', '.join(game_map.locked_by)} and cannot be deleted.")
+
+        if isinstance(game_map, MapInstance):
+            game_map.template.unlock(name)
+        del self._maps[name]
+        if self.active_map_name == name:
+            self.active_map_name = None
+        print(f"Deleted map '{name}'.")
+
     def set_active_map(self, name: str):
         """Sets the currently active map."""
-        if name not in self._maps:
+        if not self._has_map(name):
             raise ValueError(f"Map '{name}' not found.")
         self.active_map_name = name
         print(f"Active map set to '{name}'.")
@@ -41,9 +142,19 @@ class MapManager:
         return self.get_map(self.active_map_name)
 
     def get_map(self, name):
-        """Retrieves a map by its name."""
+        """Retrieves a map by its name, building it first if it is deferred."""
+        if name in self._deferred:
+            self._materialize(name)
         return self._maps.get(name)
 
+    def get_deferred(self, name):
+        """Returns the DeferredMap of a map that has not been built yet, or None."""
+        return self._deferred.get(name)
+
+    def is_loaded(self, name):
+        """Returns True if a map has been built, False if it is deferred or unknown."""
+        return name in self._maps
+
     def add_object_to_map(self, map_name: str, obj: MapObject):
         """Adds an object to the specified map."""
         game_map = self.get_map(map_name)
@@ -60,6 +171,28 @@ class MapManager:
         game_map.remove_object(object_id)
         print(f"Removed object {object_id} from map '{map_name}'.")
 
+    def add_objects(self, map_name: str, objects):
+        """Adds many objects to the specified map in one batch. Returns the objects that were added."""
+        game_map = self.get_map(map_name)
+        if not game_map:
+            raise ValueError(f"Map '{map_name}' not found.")
+        objects = list(objects)
+        added = game_map.add_objects(objects)
+        skipped = len(objects) - len(added)
+        print(f"Added {len(added)} objects to map '{map_name}'." + (f" Skipped {skipped} duplicates." if skipped else ""))
+        return added
+
+    def remove_objects(self, map_name: str, object_ids):
+        """Removes many objects from the specified map in one batch. Returns the objects that were removed."""
+        game_map = self.get_map(map_name)
+        if not game_map:
+            raise ValueError(f"Map '{map_name}' not found.")
+        object_ids = list(object_ids)
+        removed = game_map.remove_objects(object_ids)
+        missing = len(object_ids) - len(removed)
+        print(f"Removed {len(removed)} objects from map '{map_name}'." + (f" {missing} not found." if missing else ""))
+        return removed
+
     def get_objects_on_map(self, map_name: str):
         """Retrieves all objects on a given map."""
         game_map = self.get_map(map_name)
@@ -67,8 +200,16 @@ class MapManager:
             raise ValueError(f"Map '{map_name}' not found.")
         return game_map.objects
 
-    def move_object(self, map_name: str, object_id: str, new_x: int, new_y: int):
-        """Moves an object on a specified map to new coordinates."""
+    def move_object(self, map_name: str, object_id: str, new_x: int, new_y: int, check_occupancy=False):
+        """
+        Moves an object on a specified map to new coordinates.
+
+        With check_occupancy, a non-group object only moves if its footprint
+        fits at the destination (see Map.check_move).
+
+        Returns:
+            list: The conflicts that prevented the move; empty if it moved.
+        """
         game_map = self.get_map(map_name)
         if not game_map:
             raise ValueError(f"Map '{map_name}' not found.")
@@ -77,40 +218,127 @@ class MapManager:
         if not obj_to_move:
             raise ValueError(f"Object '{object_id}' not found on map '{map_name}'.")
 
-        # Calculate the change in position
-        dx = new_x - obj_to_move.x
-        dy = new_y - obj_to_move.y
-
-        # If the object is a group, move all its members by the same delta
+        # A group carries its whole subtree along in one transactional pass
         if isinstance(obj_to_move, Group):
-            print(f"Moving group {obj_to_move.id}. Propagating move to {len(obj_to_move.object_ids)} members.")
-            for member_id in obj_to_move.object_ids:
-                member_obj = game_map.get_object(member_id)
-                if member_obj:
-                    member_obj.x += dx
-                    member_obj.y += dy
-                    print(f"  - Moved member {member_id} to ({member_obj.x}, {member_obj.y}).")
-                else:
-                    print(f"  - Warning: Member object with ID '{member_id}' not found.")
-
-        # Move the primary object (or the group object itself)
-        obj_to_move.x = new_x
-        obj_to_move.y = new_y
+            moved = game_map.move_group(object_id, new_x, new_y)
+            print(f"Moved group {object_id} to ({new_x}, {new_y}) on map '{map_name}', along with {len(moved) - 1} members.")
+            return []
+
+        if check_occupancy:
+            conflicts = game_map.check_move(object_id, new_x, new_y)
+            if conflicts:
+                print(f"Cannot move {object_id} to ({new_x}, {new_y}): blocked by {describe_conflicts(conflicts)}.")
+                return conflicts
+
+        game_map.move_object(object_id, new_x, new_y)
         print(f"Moved object {object_id} to ({new_x}, {new_y}) on map '{map_name}'.")
+        return []
 
-    def to_dict(self):
-        """Returns a serializable dictionary representation of the map manager."""
+    def to_dict(self, skip=(), inline_chunked=False):
+        """
+        Returns a serializable dictionary representation of the map manager.
+        Maps named in `skip` are left out, for stores that already hold them.
+        With `inline_chunked`, chunked maps are written out in full (see
+        map_to_dict).
+        """
+        maps = {}
+        for name in self.list_maps():
+            if name not in skip:
+                maps[name] = self.map_to_dict(name, inline_chunked)
         return {
-            'maps': {name: map_obj.to_dict() for name, map_obj in self._maps.items()}
+            'maps': maps,
+            'active_map_name': self.active_map_name
         }
 
+    def map_to_dict(self, name, inline_chunked=False):
+        """
+        Returns the saved dictionary of one map. A chunked map is saved as a
+        reference to its chunk store, which only this machine can open; with
+        `inline_chunked` it is written out as a plain map instead, for a copy
+        of the state sent elsewhere.
+        """
+        deferred = self._deferred.get(name)
+        if deferred:
+            # A map that was never used is saved as it was loaded
+            map_data = deferred.load()
+            if not (inline_chunked and map_data.get('map_type') == 'chunked'):
+                return map_data
+        game_map = self.get_map(name)
+        if inline_chunked and isinstance(game_map, ChunkedMap):
+            return game_map.to_inline_dict()
+        return game_map.to_dict()
+
     def from_dict(self, data):
-        """Restores the map manager's state from a dictionary."""
+        """
+        Restores the map manager's state from a dictionary.
+
+        Each saved map is either a dictionary, built right away, or a
+        DeferredMap, built on first use. The active map is always built.
+        """
         self._maps.clear()
-        maps_data = data.get('maps', {})
-        for name, map_data in maps_data.items():
-            self._maps[name] = Map.from_dict(map_data)
+        self._deferred.clear()
+        if self.change_handler is not None:
+            self.change_handler(None)
+        eager = []
+        for name, map_data in data.get('maps', {}).items():
+            if isinstance(map_data, DeferredMap):
+                self._deferred[name] = map_data
+            else:
+                template = map_data.get('template') if map_data.get('map_type') == 'instance' else None
+                self._deferred[name] = DeferredMap(lambda d=map_data: d, template)
+                eager.append(name)
+
+        # Templates first, so instances find them already built
+        for name in sorted(eager, key=lambda n: self._deferred[n].template is not None):
+            if name in self._deferred:
+                self._materialize(name)
+
+        active = data.get('active_map_name')
+        self.active_map_name = active if self._has_map(active) else None
+        if self.active_map_name:
+            self.get_map(self.active_map_name)
+
+    def add_saved_map(self, name, map_data):
+        """
+        Adds one map from its saved dictionary or a DeferredMap, leaving the
+        other maps as they are. It is built the first time it is looked up.
+        """
+        if self._has_map(name):
+            raise ValueError(f"A map with the name '{name}' already exists.")
+        if not isinstance(map_data, DeferredMap):
+            template = map_data.get('template') if map_data.get('map_type') == 'instance' else None
+            map_data = DeferredMap(lambda d=map_data: d, template)
+        self._deferred[name] = map_data
+        # A template that is already built is locked for the instance now, as from_dict would
+        template = self._maps.get(map_data.template) if map_data.template else None
+        if template is not None:
+            template.lock(name)
+
+    def _materialize(self, name):
+        """Builds a deferred map from its saved data."""
+        deferred = self._deferred.pop(name)
+        map_data = deferred.load()
+        if deferred.template is not None:
+            # Instances are rebuilt on top of their templates
+            template = self.get_map(deferred.template)
+            if template is None:
+                print(f"Warning: Template map '{deferred.template}' of instance '{name}' not found. Skipping.")
+                return
+            self._register(MapInstance.from_dict(map_data, template))
+            template.lock(name)
+            return
+
+        if map_data.get('map_type') == 'chunked':
+            # Only the chunk store reference is read; chunks load on first access
+            game_map = ChunkedMap.from_dict(map_data)
+        else:
+            game_map = Map.from_dict(map_data)
+        self._register(game_map)
+        # Instances that are not built yet still keep their template locked
+        for other, other_deferred in self._deferred.items():
+            if other_deferred.template == name:
+                game_map.lock(other)
 
     def list_maps(self):
-        """Returns a list of all map names."""
-        return list(self._maps.keys())
+        """Returns a list of all map names, deferred maps included."""
+        return list(self._maps.keys()) + [name for name in self._deferred if name not in self._maps]
@@ -1,10 +1,16 @@
-import uuid
 from dataclasses import dataclass, field
 from typing import Optional
+from .ids import new_id
+from .fragments import CachedFragment
 
 @dataclass
-class MapObject:
-    """A generic object that can be placed on a map."""
+class MapObject(CachedFragment):
+    """
+    A generic object that can be placed on a map.
+
+    Its serialized form is cached (see CachedFragment), so saving or sending
+    a map only serializes the objects that changed.
+    """
     x: int
     y: int
     layer: int
@@ -12,8 +18,9 @@ class MapObject:
     size: int = 1
     asset_path: Optional[str] = None
     blocks_light: bool = False
+    blocks_movement: bool = False
     light_radius: Optional[int] = None
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = field(default_factory=new_id)
 
     def to_dict(self):
         """Returns a serializable dictionary representation of the object."""
@@ -27,6 +34,7 @@ class MapObject:
             'size': self.size,
             'asset_path': self.asset_path,
             'blocks_light': self.blocks_light,
+            'blocks_movement': self.blocks_movement,
             'light_radius': self.light_radius
         }
 
@@ -41,7 +49,8 @@ class MapObject:
             size=data.get('size', 1),
             asset_path=data.get('asset_path'),
             blocks_light=data.get('blocks_light', False),
-            light_radius=data.get('light_radius')
+            blocks_movement=data.get('blocks_movement', False),
+            light_radius=data.get('light_radius'),
+            id=data['id']
         )
-        obj.id = data['id']
         return obj
@@ -18,12 +18,51 @@ class Module:
     def __repr__(self):
         return f"Module(id={self.id}, name={self.name}, version={self.version})"
 
+def _file_stamp(path):
+    """Returns (modification time, size) of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _directory_stamps(directory):
+    """Returns the relative path and stamp of every file below a directory, sorted by path."""
+    stamps = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            stamps.append((os.path.relpath(path, directory), _file_stamp(path)))
+    return tuple(sorted(stamps))
+
+
+def run_module_script(script_path):
+    """Runs a module script with node and returns the list of actions it prints."""
+    result = subprocess.run(
+        ['node', script_path],
+        capture_output=True,
+        text=True,
+        check=True,
+        encoding='utf-8'
+    )
+    return json.loads(result.stdout)
+
+
 class ModuleLoader:
-    """Loads and manages modules for the VTT engine."""
+    """
+    Loads and manages modules for the VTT engine.
+
+    Loading a module that is already loaded returns it as it is, without
+    running its scripts again, unless a file in the module's directory
+    changed since: scripts may read any of them. Files outside the module's
+    directory are not checked.
+    """
     def __init__(self, action_manager, modules_directory="modules"):
         self.modules_directory = modules_directory
         self.action_manager = action_manager
         self.loaded_modules = {}
+        self._loaded_from = {}  # module_id (directory name) -> (file stamps, Module)
 
     def load_module(self, module_id):
         """Loads a single module by its ID (directory name)."""
@@ -33,6 +72,11 @@ class ModuleLoader:
         if not os.path.exists(manifest_path):
             raise FileNotFoundError(f"Module manifest not found at {manifest_path}")
 
+        loaded = self._loaded_from.get(module_id)
+        stamps = _directory_stamps(module_path)
+        if loaded is not None and loaded[0] == stamps:
+            return loaded[1]
+
         # Load manifest
         with open(manifest_path, 'r') as f:
             manifest = json.load(f)
@@ -57,14 +101,7 @@ class ModuleLoader:
                 script_path_abs = os.path.join(module_path, script_path_rel)
                 if os.path.exists(script_path_abs):
                     try:
-                        result = subprocess.run(
-                            ['node', script_path_abs],
-                            capture_output=True,
-                            text=True,
-                            check=True,
-                            encoding='utf-8'
-                        )
-                        actions_to_register = json.loads(result.stdout)
+                        actions_to_register = run_module_script(script_path_abs)
                         for action_data in actions_to_register:
                             self.action_manager.register_action(action_data)
                     except subprocess.CalledProcessError as e:
@@ -74,6 +111,7 @@ class ModuleLoader:
 
         module = Module(manifest, rules, sheets)
         self.loaded_modules[module.id] = module
+        self._loaded_from[module_id] = (stamps, module)
         print(f"Successfully loaded module: {module.name}")
         return module
 
@@ -2,6 +2,15 @@ import asyncio
 import json
 import websockets
 import uuid
+
+from .engine import changes_state
+from .state_delta import STATE_DELTA, apply_delta
+from .state_stream import STATE_END, STREAM_MESSAGES, StateAssembler
+
+# Commands that only read the game state, but are still run by the server: they
+# concern the session or the server's files rather than the client's copy of the state
+SERVER_COMMANDS = {'players', 'save', 'load', 'autosave', 'history'}
+
 class Client:
     """Handles the client-side networking for the VTT."""
 
@@ -12,6 +21,9 @@ class Client:
         self.client_id = str(uuid.uuid4())
         self.uri = f"ws://{self.host}:{self.port}/ws/{self.client_id}"
         self._websocket = None
+        self.assembler = StateAssembler(engine)
+        self.delta_seq = 0  # The last state delta applied
+        self._held_deltas = []  # Deltas that arrived while the game state was still streaming in
 
     async def connect(self):
         """Connects to the server."""
@@ -37,9 +49,55 @@ class Client:
         if self._websocket:
             await self._websocket.send(message)
 
+    def runs_locally(self, command_string):
+        """
+        Returns True if a command line only reads the game state, so it can be
+        run on the client's copy instead of being sent to the server.
+        """
+        command, args = self.engine.get_command_handler().parser.parse(command_string)
+        return bool(command) and command not in SERVER_COMMANDS and not changes_state(command, args)
+
+    async def handle_input(self, command_string):
+        """Runs a read-only command line locally and sends any other to the server."""
+        if self.runs_locally(command_string):
+            self.engine.execute_command(command_string)
+        else:
+            await self.send_message(command_string)
+
+    def _apply_delta(self, payload):
+        """
+        Applies a state delta from the server, unless the game state already holds it.
+
+        Returns:
+            bool: True if it was applied.
+        """
+        seq = payload['seq']
+        if seq <= self.delta_seq:
+            return False
+        if seq != self.delta_seq + 1:
+            print(f"\n<-- Warning: missed {seq - self.delta_seq - 1} state updates; the game state may be out of date.")
+        apply_delta(self.engine, payload)
+        self.delta_seq = seq
+        return True
+
+    def _receive_state(self, msg_type, payload):
+        """Feeds one message of a streamed game state to the assembler and reports progress."""
+        was_ready = self.assembler.ready
+        self.assembler.feed(msg_type, payload)
+        active = self.engine.get_map_manager().active_map_name
+        if self.assembler.ready and not was_ready and active:
+            print(f"\n<-- Active map '{active}' received. Loading the rest of the game state...")
+            print("> ", end="")
+        if msg_type == STATE_END and self.assembler.complete:
+            print("\n<-- Full game state received.")
+            self.delta_seq = self.assembler.seq
+            held, self._held_deltas = self._held_deltas, []
+            for delta in held:
+                self._apply_delta(delta)
+            print("> ", end="")
+
     async def listen(self):
         """Listens for incoming messages from the server."""
-        handler = self.engine.get_command_handler()
         try:
             async for message in self._websocket:
                 try:
@@ -52,16 +110,30 @@ class Client:
                         self.engine.load_game_from_dict(payload)
                         print("> ", end="")
 
-                    elif msg_type == "command":
-                        print(f"\n<-- Received command: {payload}")
-                        handler.parse_and_handle(payload)
-                        print("> ", end="")
+                    elif msg_type in STREAM_MESSAGES:
+                        self._receive_state(msg_type, payload)
+
+                    elif msg_type == STATE_DELTA:
+                        if self.assembler.in_progress:
+                            # It changes a state newer than the part already received
+                            self._held_deltas.append(payload)
+                            continue
+                        if self._apply_delta(payload):
+                            objects = sum(len(m['changed']) + len(m['removed']) for m in payload.get('maps', {}).values())
+                            print(f"\n<-- Update {payload['seq']}: {len(payload.get('entities', []))} entities "
+                                  f"and {objects} map objects changed.\n> ", end="")
+
+                    elif msg_type == "output":
+                        print(f"\n{payload.rstrip()}\n> ", end="")
 
                     elif msg_type == "chat":
                         print(f"\n<-- Server: {payload}\n> ", end="")
 
                 except json.JSONDecodeError:
                     print(f"\n<-- Received malformed message: {message}")
+                except Exception as e:
+                    # One message that cannot be handled must not end the connection
+                    print(f"\n<-- Warning: Could not handle a message from the server: {e!r}\n> ", end="")
         except websockets.exceptions.ConnectionClosed:
             print("Connection to server lost.")
         except asyncio.CancelledError:
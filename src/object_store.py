@@ -0,0 +1,145 @@
+from bisect import insort
+from itertools import islice
+
+
+class ObjectStore:
+    """
+    An insertion-ordered collection of map objects indexed by ID.
+
+    It behaves like a read-only list of objects (len, iteration, indexing,
+    reversed) while adding, looking up and removing by ID are O(1). Objects
+    are also bucketed by layer, so they can be walked in draw order without
+    sorting. Objects should be added, removed and re-layered through the
+    owning Map so its indexes stay in sync. An object whose `layer` was
+    assigned directly is moved to its new layer's bucket, on top, the next
+    time the draw order is asked for, as set_layer would have done.
+    """
+
+    def __init__(self, objects=()):
+        self._by_id = {}
+        self._order = {}  # object_id -> insertion sequence number
+        self._next_order = 0
+        self._layers = {}       # layer -> {object_id: obj}, in insertion order
+        self._layer_keys = []   # sorted layers that currently hold objects
+        self._layer_of = {}     # object_id -> layer it is bucketed under
+        for obj in objects:
+            self.add(obj)
+
+    def add(self, obj):
+        """Adds an object. Returns False if an object with the same ID is already stored."""
+        if obj.id in self._by_id:
+            return False
+        self._by_id[obj.id] = obj
+        self._bucket(obj)
+        return True
+
+    def remove(self, object_id):
+        """Removes and returns the object with the given ID, or None if not found."""
+        obj = self._by_id.pop(object_id, None)
+        if obj is not None:
+            self._unbucket(object_id)
+        return obj
+
+    def set_layer(self, object_id, layer):
+        """
+        Moves an object to another layer. It is placed above the objects
+        already on that layer.
+        """
+        obj = self._by_id[object_id]
+        self._unbucket(object_id)
+        obj.layer = layer
+        self._bucket(obj)
+
+    def in_layer_order(self):
+        """Yields objects bottom to top: by layer, then by insertion order."""
+        for obj in [obj for object_id, obj in self._by_id.items() if obj.layer != self._layer_of[object_id]]:
+            self._rebucket(obj)
+        for layer in self._layer_keys:
+            yield from self._layers[layer].values()
+
+    def _bucket(self, obj):
+        self._order[obj.id] = self._next_order
+        self._next_order += 1
+        bucket = self._layers.get(obj.layer)
+        if bucket is None:
+            bucket = self._layers[obj.layer] = {}
+            insort(self._layer_keys, obj.layer)
+        bucket[obj.id] = obj
+        self._layer_of[obj.id] = obj.layer
+
+    def _rebucket(self, obj):
+        self._unbucket(obj.id)
+        self._bucket(obj)
+
+    def _unbucket(self, object_id):
+        del self._order[object_id]
+        layer = self._layer_of.pop(object_id)
+        bucket = self._layers[layer]
+        del bucket[object_id]
+        if not bucket:
+            del self._layers[layer]
+            self._layer_keys.remove(layer)
+
+    def replace(self, obj):
+        """Swaps in a different object under an existing ID, keeping its layer and draw position."""
+        self._by_id[obj.id] = obj
+        self._layers[self._layer_of[obj.id]][obj.id] = obj
+
+    def copy(self):
+        """Returns a new store holding the same objects in the same order, without copying them."""
+        clone = ObjectStore()
+        clone._by_id = dict(self._by_id)
+        clone._order = dict(self._order)
+        clone._next_order = self._next_order
+        clone._layers = {layer: dict(bucket) for layer, bucket in self._layers.items()}
+        clone._layer_keys = list(self._layer_keys)
+        clone._layer_of = dict(self._layer_of)
+        return clone
+
+    def get(self, object_id):
+        """Returns the object with the given ID, or None if not found."""
+        return self._by_id.get(object_id)
+
+    def order_of(self, object_id):
+        """Returns the (layer, sequence) key that defines an object's draw order."""
+        obj = self._by_id[object_id]
+        if obj.layer != self._layer_of[object_id]:
+            self._rebucket(obj)
+        return self._layer_of[object_id], self._order[object_id]
+
+    def clear(self):
+        self._by_id.clear()
+        self._order.clear()
+        self._layers.clear()
+        self._layer_keys.clear()
+        self._layer_of.clear()
+
+    def __contains__(self, object_id):
+        return object_id in self._by_id
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __reversed__(self):
+        return reversed(self._by_id.values())
+
+    def __getitem__(self, index):
+        # Positional access is O(n); it exists for list compatibility only.
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self._by_id)
+        if not 0 <= index < len(self._by_id):
+            raise IndexError("ObjectStore index out of range")
+        return next(islice(self._by_id.values(), index, None))
+
+    def __eq__(self, other):
+        if isinstance(other, ObjectStore):
+            other = list(other)
+        return list(self) == other
+
+    def __repr__(self):
+        return f"ObjectStore({list(self)!r})"
@@ -0,0 +1,68 @@
+from typing import NamedTuple, Optional, Tuple
+
+from .spatial_hash import footprint_cells
+from .token import Token
+
+# Reasons a move can be refused
+OUT_OF_BOUNDS = 'bounds'
+BLOCKED_TERRAIN = 'terrain'
+BLOCKING_OBJECT = 'object'
+OCCUPIED = 'token'
+
+
+class MoveConflict(NamedTuple):
+    """One reason a footprint cell cannot be entered."""
+    reason: str
+    cell: Tuple[int, int]
+    object_id: Optional[str] = None
+
+
+def occupies(obj):
+    """Returns True if an object takes up its cells for movement: tokens and movement-blocking objects."""
+    return isinstance(obj, Token) or obj.blocks_movement
+
+
+def find_move_conflicts(game_map, obj, new_x, new_y, occupants_at):
+    """
+    Checks every cell an object's footprint would cover at (new_x, new_y).
+
+    Args:
+        game_map: The map the object moves on.
+        obj (MapObject): The moving object. It never conflicts with itself.
+        occupants_at (callable): Returns the occupying objects of a cell (x, y).
+
+    Returns:
+        list: A MoveConflict per blocked cell and per object in the way; empty if the move is clear.
+    """
+    conflicts = []
+    terrain = game_map.terrain
+    for cell in footprint_cells(new_x, new_y, obj.size):
+        x, y = cell
+        if not (0 <= x < game_map.width and 0 <= y < game_map.height):
+            conflicts.append(MoveConflict(OUT_OF_BOUNDS, cell))
+            continue
+        if terrain.blocks_movement(x, y):
+            conflicts.append(MoveConflict(BLOCKED_TERRAIN, cell))
+        for other in occupants_at(x, y):
+            if other.id == obj.id:
+                continue
+            reason = OCCUPIED if isinstance(other, Token) else BLOCKING_OBJECT
+            conflicts.append(MoveConflict(reason, cell, other.id))
+    return conflicts
+
+
+def describe_conflicts(conflicts):
+    """Summarizes conflicts for display, one phrase per distinct obstacle."""
+    phrases = []
+    for conflict in conflicts:
+        if conflict.reason == OUT_OF_BOUNDS:
+            phrase = "off the map"
+        elif conflict.reason == BLOCKED_TERRAIN:
+            phrase = f"impassable terrain at {conflict.cell}"
+        elif conflict.reason == OCCUPIED:
+            phrase = f"token {conflict.object_id}"
+        else:
+            phrase = f"blocking object {conflict.object_id}"
+        if phrase not in phrases:
+            phrases.append(phrase)
+    return ", ".join(phrases)
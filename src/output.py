@@ -0,0 +1,79 @@
+import sys
+import threading
+from contextlib import contextmanager
+
+# Lines commands print when they fail; command handlers report errors by printing rather than raising
+FAILURE_PREFIXES = ('Error', 'Usage:', 'Unknown command', 'Failed', 'Cannot')
+
+
+def command_failed(output):
+    """Returns the first line of a command's output that reports a failure, or None."""
+    for line in output.splitlines():
+        if line.strip().startswith(FAILURE_PREFIXES):
+            return line.strip()
+    return None
+
+
+class ThreadOutput:
+    """
+    Stands in for sys.stdout while output is captured (see capture_output).
+    Each thread's writes go to the streams that thread is capturing into, or
+    to the real stdout if it captures nothing, so output printed by other
+    threads, such as a background save, never ends up in a capture.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    @property
+    def targets(self):
+        return getattr(self._local, 'targets', None)
+
+    @targets.setter
+    def targets(self, targets):
+        self._local.targets = targets
+
+    def write(self, text):
+        targets = self.targets
+        if targets is None:
+            return self.stream.write(text)
+        for target in targets:
+            target.write(text)
+        return len(text)
+
+    def flush(self):
+        for target in self.targets or (self.stream,):
+            target.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+_install_lock = threading.Lock()
+_installed = 0
+
+
+@contextmanager
+def capture_output(stream, echo=False):
+    """
+    Sends what the current thread prints to `stream` while the block runs,
+    and also to where it went before if `echo` is set. Other threads print
+    as they did. Captures can be nested.
+    """
+    global _installed
+    with _install_lock:
+        if not isinstance(sys.stdout, ThreadOutput):
+            sys.stdout = ThreadOutput(sys.stdout)
+        _installed += 1
+        proxy = sys.stdout
+    previous = proxy.targets
+    proxy.targets = [stream] + ((previous or [proxy.stream]) if echo else [])
+    try:
+        yield stream
+    finally:
+        proxy.targets = previous
+        with _install_lock:
+            _installed -= 1
+            if not _installed and sys.stdout is proxy:
+                sys.stdout = proxy.stream
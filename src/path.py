@@ -1,17 +1,175 @@
-from dataclasses import dataclass, field
-from typing import List, Tuple
+import base64
+from array import array
+from dataclasses import dataclass, field, InitVar
+from typing import Optional
 from .drawable import Drawable
 
+POINTS_ENCODING = 'delta-zigzag-varint+base64'
+
+
+class PointArray:
+    """
+    A compact sequence of (x, y) integer points backed by a flat array('i').
+
+    It iterates and indexes as (x, y) tuples and compares equal to a list of
+    point tuples, so it can stand in wherever a list of points was used.
+    """
+
+    def __init__(self, points=()):
+        self._coords = array('i')
+        for x, y in points:
+            self._coords.append(x)
+            self._coords.append(y)
+
+    @classmethod
+    def from_coords(cls, coords):
+        """Creates a point array from a flat x0, y0, x1, y1, ... sequence."""
+        points = cls()
+        points._coords = array('i', coords)
+        return points
+
+    @property
+    def coords(self):
+        """The underlying flat array of coordinates."""
+        return self._coords
+
+    def append(self, point):
+        x, y = point
+        self._coords.append(x)
+        self._coords.append(y)
+
+    def __len__(self):
+        return len(self._coords) // 2
+
+    def __iter__(self):
+        coords = self._coords
+        return ((coords[i], coords[i + 1]) for i in range(0, len(coords), 2))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PointArray index out of range")
+        return self._coords[2 * index], self._coords[2 * index + 1]
+
+    def __eq__(self, other):
+        if isinstance(other, PointArray):
+            return self._coords == other._coords
+        try:
+            return list(self) == [tuple(p) for p in other]
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return f"PointArray({list(self)!r})"
+
+
+def simplify_points(points, tolerance):
+    """
+    Reduces a polyline with the Douglas-Peucker algorithm, keeping only the
+    points that lie farther than `tolerance` from the simplified line.
+    The first and last points are always kept.
+    """
+    points = list(points)
+    if tolerance <= 0 or len(points) < 3:
+        return points
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (ax, ay), (bx, by) = points[first], points[last]
+        dx, dy = bx - ax, by - ay
+        length_sq = dx * dx + dy * dy
+
+        farthest, max_dist_sq = None, tolerance * tolerance
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if length_sq == 0:
+                dist_sq = (px - ax) ** 2 + (py - ay) ** 2
+            else:
+                # Distance to the segment, not the infinite line, so spikes past an end are kept
+                t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+                dist_sq = (px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2
+            if dist_sq > max_dist_sq:
+                farthest, max_dist_sq = i, dist_sq
+
+        if farthest is not None:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+    return [p for p, kept in zip(points, keep) if kept]
+
+
+def pack_points(points):
+    """
+    Encodes points as base64 bytes: the first point, then each point's offset
+    from the previous one, as zigzag varints. Freehand strokes move a cell or
+    two per point, so most coordinates take a single byte.
+    """
+    out = bytearray()
+    prev_x = prev_y = 0
+    for x, y in points:
+        for delta in (x - prev_x, y - prev_y):
+            value = (delta << 1) ^ (delta >> 63)  # zigzag: small negatives become small positives
+            while value >= 0x80:
+                out.append((value & 0x7F) | 0x80)
+                value >>= 7
+            out.append(value)
+        prev_x, prev_y = x, y
+    return base64.b64encode(bytes(out)).decode('ascii')
+
+
+def unpack_points(data):
+    """Decodes the output of pack_points into a PointArray."""
+    raw = base64.b64decode(data)
+    coords = array('i')
+    value = shift = 0
+    prev = [0, 0]
+    for byte in raw:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        delta = (value >> 1) ^ -(value & 1)
+        axis = len(coords) % 2
+        prev[axis] += delta
+        coords.append(prev[axis])
+        value = shift = 0
+    return PointArray.from_coords(coords)
+
+
 @dataclass
 class Path(Drawable):
-    """Represents a freehand path or line on the map."""
-    points: List[Tuple[int, int]] = field(default_factory=list)
+    """
+    Represents a freehand path or line on the map.
+
+    Points are kept in a compact PointArray. Passing `simplify_tolerance`
+    drops points that deviate less than that many cells from the line
+    (Douglas-Peucker), which keeps freehand strokes small in saves and
+    broadcasts.
+    """
+    points: PointArray = field(default_factory=PointArray)
+    simplify_tolerance: InitVar[Optional[float]] = None
+
+    def __post_init__(self, simplify_tolerance):
+        if simplify_tolerance:
+            self.points = simplify_points(self.points, simplify_tolerance)
+
+    def __setattr__(self, name, value):
+        if name == 'points' and not isinstance(value, PointArray):
+            value = PointArray(value)
+        super().__setattr__(name, value)
 
     def to_dict(self):
-        """Returns a serializable dictionary representation, including the path's points."""
+        """Returns a serializable dictionary representation, with the points delta-encoded."""
         data = super().to_dict()
         data.update({
-            'points': self.points
+            'points': {'encoding': POINTS_ENCODING, 'data': pack_points(self.points)}
         })
         # Override object_type to be specific
         data['object_type'] = self.__class__.__name__
@@ -19,8 +177,14 @@ class Path(Drawable):
 
     @classmethod
     def from_dict(cls, data):
-        """Creates a Path object from a dictionary."""
+        """Creates a Path object from a dictionary. Both packed and plain point lists are accepted."""
         obj = super().from_dict(data)
-        # The points are stored as a list of lists in JSON, so convert them back to tuples
-        obj.points = [tuple(p) for p in data.get('points', [])]
+        points = data.get('points', [])
+        if isinstance(points, dict):
+            if points.get('encoding') != POINTS_ENCODING:
+                raise ValueError(f"Unsupported path point encoding: {points.get('encoding')}")
+            obj.points = unpack_points(points['data'])
+        else:
+            # Older saves store the points as a list of [x, y] lists
+            obj.points = points
         return obj
@@ -0,0 +1,78 @@
+import heapq
+
+from .hex import OffsetCoord, roffset_to_cube, roffset_neighbors, hex_distance
+from .map import GridType
+
+# Square grids allow diagonal steps; each step costs the terrain cost of the
+# cell being entered, matching the common "diagonals count as one" rule.
+SQUARE_STEPS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def grid_neighbors(grid_type, x, y):
+    """Returns the cells adjacent to (x, y) for the given grid type."""
+    if grid_type == GridType.HEX:
+        return roffset_neighbors(OffsetCoord(x, y))
+    return [(x + dx, y + dy) for dx, dy in SQUARE_STEPS]
+
+
+def grid_distance(grid_type, a, b):
+    """Returns the step distance between two cells, ignoring terrain."""
+    if grid_type == GridType.HEX:
+        return hex_distance(roffset_to_cube(OffsetCoord(*a)), roffset_to_cube(OffsetCoord(*b)))
+    return max(abs(a[0] - b[0]), abs(a[1] - b[1]))
+
+
+def find_path(game_map, start, goal, max_cost=None):
+    """
+    Finds the cheapest route between two cells using A* over the map's terrain layer.
+
+    Args:
+        game_map (Map): The map to search.
+        start (tuple): The (x, y) starting cell.
+        goal (tuple): The (x, y) destination cell.
+        max_cost (int, optional): Give up on routes more expensive than this.
+
+    Returns:
+        tuple: (list of (x, y) cells from start to goal, total cost),
+               or None if the goal is unreachable.
+    """
+    terrain = game_map.terrain
+    grid_type = game_map.grid_type
+    start, goal = tuple(start), tuple(goal)
+
+    if not terrain.in_bounds(*start) or not terrain.in_bounds(*goal):
+        return None
+    if terrain.blocks_movement(*goal):
+        return None
+
+    # Every cell costs at least 1, so the plain step distance is admissible
+    open_heap = [(grid_distance(grid_type, start, goal), 0, start)]
+    came_from = {start: None}
+    best_cost = {start: 0}
+
+    while open_heap:
+        _, cost, current = heapq.heappop(open_heap)
+        if current == goal:
+            path = []
+            while current is not None:
+                path.append(current)
+                current = came_from[current]
+            path.reverse()
+            return path, cost
+        if cost > best_cost[current]:
+            continue
+
+        for nx, ny in grid_neighbors(grid_type, *current):
+            if not terrain.in_bounds(nx, ny) or terrain.blocks_movement(nx, ny):
+                continue
+            new_cost = cost + terrain.get_cost(nx, ny)
+            if max_cost is not None and new_cost > max_cost:
+                continue
+            neighbor = (nx, ny)
+            if new_cost < best_cost.get(neighbor, new_cost + 1):
+                best_cost[neighbor] = new_cost
+                came_from[neighbor] = current
+                priority = new_cost + grid_distance(grid_type, neighbor, goal)
+                heapq.heappush(open_heap, (priority, new_cost, neighbor))
+
+    return None
@@ -1,17 +1,41 @@
 import json
+import os
+import struct
+import zlib
+
+import sqlite3
+
+from .binary_save import BINARY_EXTENSIONS, write_binary_save, read_binary_save
+from .sqlite_store import DATABASE_EXTENSIONS, SQLiteStore
+from .snapshot_store import SnapshotStore
+from .fragments import encode
 
 class PersistenceManager:
-    """Handles saving and loading of the game state."""
+    """
+    Handles saving and loading of the game state.
+
+    The format follows the file extension: `.vttb` files use the compact
+    binary format (see binary_save), whose maps are only decoded when first
+    used; `.db`, `.sqlite` and `.sqlite3` files are SQLite databases (see
+    sqlite_store) that are updated in place; anything else is written as JSON.
+
+    A save history is kept in a directory instead (see snapshot_store), where
+    each snapshot only adds the content that changed since earlier ones.
+    """
 
     def __init__(self):
-        pass
+        self._stores = {}  # absolute path -> open SQLiteStore
+        self._histories = {}  # absolute path -> SnapshotStore
 
-    def gather_game_state(self, engine):
+    def gather_game_state(self, engine, skip_maps=(), inline_chunked=False):
         """
         Gathers the state from all engine components into a single dictionary.
 
         Args:
             engine (Engine): The main VTT engine instance.
+            skip_maps (iterable, optional): Maps to leave out.
+            inline_chunked (bool, optional): Write chunked maps out in full
+                rather than as a reference to their local chunk store.
 
         Returns:
             dict: A dictionary representing the complete game state.
@@ -19,33 +43,148 @@ class PersistenceManager:
         game_state = {
             'entity_manager': engine.get_entity_manager().to_dict(),
             'initiative_tracker': engine.get_initiative_tracker().to_dict(),
-            'map_manager': engine.get_map_manager().to_dict(),
-            'active_module_id': engine.active_module.id if engine.active_module else None
+            'map_manager': engine.get_map_manager().to_dict(skip=skip_maps, inline_chunked=inline_chunked),
+            'active_module_id': engine.active_module.id if engine.active_module else None,
+            'active_module_version': engine.active_module.version if engine.active_module else None
         }
         return game_state
 
+    @staticmethod
+    def is_binary(filepath):
+        """Returns True if a save path selects the binary format."""
+        return os.path.splitext(filepath)[1].lower() in BINARY_EXTENSIONS
+
+    @staticmethod
+    def is_database(filepath):
+        """Returns True if a save path selects the SQLite backend."""
+        return os.path.splitext(filepath)[1].lower() in DATABASE_EXTENSIONS
+
+    def store(self, filepath):
+        """Returns the SQLite store for a database path, opening it on first use."""
+        key = os.path.abspath(filepath)
+        store = self._stores.get(key)
+        if store is None:
+            store = self._stores[key] = SQLiteStore(filepath)
+        return store
+
+    def history(self, directory):
+        """Returns the snapshot store kept in a directory, creating it on first use."""
+        key = os.path.abspath(directory)
+        history = self._histories.get(key)
+        if history is None:
+            history = self._histories[key] = SnapshotStore(directory)
+        return history
+
+    def save_history(self, engine, directory, label=""):
+        """
+        Adds the engine's state to the save history in a directory.
+
+        Returns:
+            int: The new snapshot's ID, or None if it could not be saved.
+        """
+        try:
+            history = self.history(directory)
+            snapshot_id = history.save(self.gather_game_state(engine), label)
+        except (IOError, ValueError) as e:
+            print(f"Error saving snapshot to {directory}: {e}")
+            return None
+        print(f"Snapshot {snapshot_id} saved to {directory} ({history.blobs_written} new blobs written)")
+        return snapshot_id
+
+    def load_history(self, directory, snapshot_id=None):
+        """Loads a game state from the save history in a directory, the latest snapshot if no ID is given."""
+        if not os.path.isdir(directory):
+            print(f"Error: Save history not found at {directory}")
+            return None
+        try:
+            game_state = self.history(directory).load(snapshot_id)
+        except (IOError, ValueError, KeyError, zlib.error) as e:
+            print(f"Error loading snapshot from {directory}: {e}")
+            return None
+        print(f"Snapshot {snapshot_id or 'latest'} loaded from {directory}")
+        return game_state
+
+    def save_engine(self, engine, filepath):
+        """
+        Saves the engine's state to a file. A database only receives the
+        rows that changed, and maps unchanged since it last saw them are not
+        even serialized.
+        """
+        if not self.is_database(filepath):
+            return self.save_game(self.gather_game_state(engine), filepath)
+        try:
+            store = self.store(filepath)
+            map_manager = engine.get_map_manager()
+            clean = store.clean_maps(map_manager)
+            game_state = self.gather_game_state(engine, skip_maps=clean)
+            written = store.save(game_state, keep_maps=clean)
+            store.mark_saved(map_manager, map_manager.list_maps())
+            print(f"Game state saved to {filepath} ({written} rows written)")
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving game to {filepath}: {e}")
+            return False
+
+    def write_file(self, game_state, filepath):
+        """
+        Writes a game state as a JSON or binary file. The data goes to a
+        temporary file next to `filepath`, which then replaces it, so a crash
+        while writing never leaves a truncated save behind.
+
+        Returns:
+            int: The size of the written file in bytes.
+        """
+        root, extension = os.path.splitext(filepath)
+        temp_path = f"{root}.tmp{extension}"
+        try:
+            if self.is_binary(filepath):
+                write_binary_save(game_state, temp_path)
+                with open(temp_path, 'rb+') as f:
+                    os.fsync(f.fileno())
+            else:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    f.write(encode(game_state))
+                    f.flush()
+                    os.fsync(f.fileno())
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, filepath)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return size
+
     def save_game(self, game_state, filepath):
-        """Saves the given game state dictionary to a JSON file."""
+        """Saves the given game state dictionary to a file, in the format its extension selects."""
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(game_state, f, indent=4)
+            if self.is_database(filepath):
+                self.store(filepath).save(game_state)
+            else:
+                self.write_file(game_state, filepath)
             print(f"Game state saved to {filepath}")
             return True
-        except IOError as e:
+        except (IOError, sqlite3.Error) as e:
             print(f"Error saving game to {filepath}: {e}")
             return False
 
     def load_game(self, filepath):
-        """Loads a game state dictionary from a JSON file."""
+        """Loads a game state dictionary from a file, in the format its extension selects."""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                game_state = json.load(f)
+            if self.is_binary(filepath):
+                game_state = read_binary_save(filepath)
+            elif self.is_database(filepath):
+                if not os.path.exists(filepath):
+                    raise FileNotFoundError(filepath)
+                game_state = self.store(filepath).load_game_state()
+            else:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    game_state = json.load(f)
             print(f"Game state loaded from {filepath}")
             return game_state
         except FileNotFoundError:
             print(f"Error: Save file not found at {filepath}")
             return None
-        except (IOError, json.JSONDecodeError) as e:
+        except (IOError, ValueError, KeyError, struct.error, zlib.error, sqlite3.Error) as e:
             print(f"Error loading game from {filepath}: {e}")
             return None
 
@@ -54,9 +193,17 @@ class PersistenceManager:
         if not game_state:
             return False
 
-        # Restore active module
-        if game_state.get('active_module_id'):
-            engine.load_system_module(game_state['active_module_id'])
+        # Restore active module. Loading one reads its files and runs its scripts,
+        # so a module that is already active in the same version is kept.
+        module_id = game_state.get('active_module_id')
+        if module_id:
+            version = game_state.get('active_module_version')
+            active = engine.active_module
+            if active is None or active.id != module_id or (version is not None and active.version != version):
+                module = engine.load_system_module(module_id)
+                if version is not None and module.version != version:
+                    print(f"Warning: The game was saved with {module_id} {version}; "
+                          f"version {module.version} is installed.")
 
         # Restore entities
         if 'entity_manager' in game_state:
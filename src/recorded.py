@@ -0,0 +1,38 @@
+from collections import deque
+
+
+class RecordedSource:
+    """
+    A source of random values that can record what it produces and later
+    produce the same values again, so replaying a command gives exactly the
+    result it had the first time.
+    """
+
+    def __init__(self, generate):
+        self._generate = generate
+        self._recording = None
+        self._replaying = None
+
+    def next(self, *args):
+        """Returns the next value: a replayed one if any are left, otherwise a fresh one."""
+        if self._replaying:
+            return self._replaying.popleft()
+        value = self._generate(*args)
+        if self._recording is not None:
+            self._recording.append(value)
+        return value
+
+    def start_recording(self):
+        self._recording = []
+
+    def stop_recording(self):
+        """Stops recording and returns the values produced since it started."""
+        values, self._recording = self._recording or [], None
+        return values
+
+    def replay(self, values):
+        """Makes the next calls return these values, in order, before generating new ones."""
+        self._replaying = deque(values)
+
+    def stop_replay(self):
+        self._replaying = None
@@ -1,24 +1,141 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from contextlib import asynccontextmanager
 from typing import List
+import asyncio
+import io
+import itertools
 import json
 
+from .fragments import encode
+from .output import capture_output
+from .state_delta import STATE_DELTA, DeltaTracker
+from .state_stream import DEFAULT_MAX_MESSAGE_SIZE, stream_game_state
+
 # This is a simplified approach for a CLI application.
 # In a larger app, you might use dependency injection.
 engine = None
 
+# How often the event loop runs the engine's timed work: overdue journal entries and autosaves
+TICK_SECONDS = 0.25
+
+# How many outgoing messages a client may have waiting before it counts as falling behind
+DEFAULT_SEND_QUEUE_SIZE = 256
+
+# What happens to a client whose send queue is full
+RESYNC = 'resync'          # Its waiting messages are dropped and it is sent the full state instead
+DISCONNECT = 'disconnect'  # It is disconnected
+SLOW_CLIENT_POLICIES = (RESYNC, DISCONNECT)
+DEFAULT_SLOW_CLIENT_POLICY = RESYNC
+
+# The close code a slow client is disconnected with ("try again later")
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+# The close code a client is disconnected with when sending to it fails unexpectedly
+SEND_ERROR_CLOSE_CODE = 1011
+
+# The message type that carries what a command printed back to the client that sent it
+COMMAND_OUTPUT = 'output'
+
+
+class ClientConnection:
+    """
+    A connected client's websocket and the messages waiting to be sent to it.
+
+    Messages wait in a bounded queue and a writer task sends them in order,
+    so a slow client never holds up the others. A queue item is an encoded
+    message or an iterable of them, such as a state stream, which takes up
+    a single place in the queue.
+    """
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(queue_size)
+        self.sent = 0
+        self.dropped = 0
+        self.resyncs = 0
+        self.max_queued = 0
+        self.writer = asyncio.create_task(self._write())
+
+    def put(self, item) -> bool:
+        """Queues an item. Returns False, leaving the queue as it was, if it is full."""
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            return False
+        self.max_queued = max(self.max_queued, self.queue.qsize())
+        return True
+
+    def clear(self):
+        """Drops every waiting item."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.dropped += 1
+
+    async def _write(self):
+        try:
+            while True:
+                item = await self.queue.get()
+                for text in (item,) if isinstance(item, str) else item:
+                    await self.websocket.send_text(text)
+                    self.sent += 1
+        except (WebSocketDisconnect, RuntimeError):
+            # The connection is gone; the endpoint's receive loop removes the client
+            pass
+        except Exception as e:
+            print(f"Warning: Sending to a client failed: {e!r}. Closing its connection.")
+            try:
+                # The endpoint's receive loop then sees the disconnect and removes the client
+                await self.websocket.close(code=SEND_ERROR_CLOSE_CODE)
+            except (WebSocketDisconnect, RuntimeError):
+                pass
+
+    def metrics(self) -> dict:
+        return {
+            'queued': self.queue.qsize(),
+            'max_queued': self.max_queued,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'resyncs': self.resyncs
+        }
+
+
 class SessionManager:
-    def __init__(self):
-        self.active_connections: dict[str, WebSocket] = {} # client_id to websocket
+    """
+    Tracks the connected clients and sends them messages.
+
+    Every client has its own send queue (see ClientConnection), so sending
+    never waits for a client, and a broadcast is encoded once for all of
+    them. A client whose queue fills up has fallen behind. With the RESYNC
+    policy, its waiting messages are dropped and it is sent the messages
+    returned by `state_source()`, a fresh stream of the full state, instead.
+    With DISCONNECT, it is disconnected. The policy defaults to
+    DEFAULT_SLOW_CLIENT_POLICY, or to DISCONNECT without a state_source.
+    """
+    def __init__(self, queue_size: int = DEFAULT_SEND_QUEUE_SIZE, slow_client_policy: str = None,
+                 state_source=None):
+        if slow_client_policy is None:
+            slow_client_policy = DEFAULT_SLOW_CLIENT_POLICY if state_source is not None else DISCONNECT
+        if slow_client_policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"Unknown slow client policy '{slow_client_policy}'. Use one of: {', '.join(SLOW_CLIENT_POLICIES)}.")
+        if slow_client_policy == RESYNC and state_source is None:
+            raise ValueError("The resync policy needs a state_source.")
+        self.active_connections: dict[str, ClientConnection] = {} # client_id to connection
         self.gm_client_id: str = None
+        self.queue_size = queue_size
+        self.slow_client_policy = slow_client_policy
+        self.state_source = state_source
+        self.slow_disconnects = 0
 
     async def connect(self, websocket: WebSocket, client_id: str):
         await websocket.accept()
-        self.active_connections[client_id] = websocket
+        self.active_connections[client_id] = ClientConnection(websocket, self.queue_size)
         if not self.gm_client_id:
             self.gm_client_id = client_id
 
     def disconnect(self, client_id: str):
-        self.active_connections.pop(client_id, None)
+        connection = self.active_connections.pop(client_id, None)
+        if connection is not None:
+            connection.writer.cancel()
         if self.gm_client_id == client_id:
             # In a real app, you'd handle GM disconnect more gracefully.
             # For now, we'll just clear it.
@@ -27,23 +144,118 @@ class SessionManager:
     def is_gm(self, client_id: str) -> bool:
         return self.gm_client_id == client_id
 
+    def _send(self, client_id: str, item):
+        connection = self.active_connections.get(client_id)
+        if connection is None or connection.writer.done() or connection.put(item):
+            return
+        connection.dropped += 1
+        if self.slow_client_policy == DISCONNECT:
+            self.disconnect(client_id)
+            self.slow_disconnects += 1
+            # Not awaited, so the other clients are not kept waiting on this one
+            asyncio.create_task(connection.websocket.close(code=SLOW_CLIENT_CLOSE_CODE))
+            return
+        connection.clear()
+        connection.resyncs += 1
+        connection.put(self.state_source())
+
     async def send_personal_message(self, message: dict, client_id: str):
-        websocket = self.active_connections.get(client_id)
-        if websocket:
-            await websocket.send_json(message)
+        # Unchanged entities and objects are sent from their cached encoding
+        self._send(client_id, encode(message))
+
+    async def send_personal_text(self, text: str, client_id: str):
+        self._send(client_id, text)
+
+    async def send_personal_stream(self, messages, client_id: str):
+        """Queues a sequence of encoded messages, such as a state stream, to be sent back to back."""
+        self._send(client_id, messages)
 
     async def broadcast(self, message: dict, exclude_client_id: str = None):
-        for client_id, connection in self.active_connections.items():
+        await self.broadcast_text(encode(message), exclude_client_id)
+
+    async def broadcast_text(self, text: str, exclude_client_id: str = None):
+        for client_id in list(self.active_connections):
             if client_id != exclude_client_id:
-                await connection.send_json(message)
+                self._send(client_id, text)
 
-def create_app(vtt_engine):
-    """Creates the FastAPI app and sets up routes."""
+    async def broadcast_stream(self, messages, exclude_client_id: str = None):
+        """Queues the same encoded messages to every client; they are kept in memory until all have been sent."""
+        messages = list(messages)
+        for client_id in list(self.active_connections):
+            if client_id != exclude_client_id:
+                self._send(client_id, messages)
+
+    def metrics(self) -> dict:
+        """Returns the send queue figures of every client, and their totals."""
+        clients = {client_id: connection.metrics() for client_id, connection in self.active_connections.items()}
+        return {
+            'clients': clients,
+            'queued': sum(m['queued'] for m in clients.values()),
+            'max_queued': max((m['max_queued'] for m in clients.values()), default=0),
+            'dropped': sum(m['dropped'] for m in clients.values()),
+            'resyncs': sum(m['resyncs'] for m in clients.values()),
+            'slow_disconnects': self.slow_disconnects
+        }
+
+def create_app(vtt_engine, max_message_size=DEFAULT_MAX_MESSAGE_SIZE,
+               send_queue_size=DEFAULT_SEND_QUEUE_SIZE, slow_client_policy=DEFAULT_SLOW_CLIENT_POLICY):
+    """
+    Creates the FastAPI app and sets up routes. New clients receive the game
+    state as a stream of messages of at most max_message_size characters
+    (see state_stream). After every command, clients receive the changes it
+    made as a state delta (see state_delta), or the full state again if the
+    changes cannot be sent as one. What a command prints is sent back to the
+    client that sent it.
+
+    Each client may have send_queue_size messages waiting to be sent; a
+    client that falls further behind is handled by slow_client_policy (see
+    SessionManager). GET /metrics reports the send queues.
+    """
     global engine
     engine = vtt_engine
 
-    app = FastAPI()
-    manager = SessionManager()
+    @asynccontextmanager
+    async def lifespan(app):
+        # Autosave snapshots must be taken on the engine's thread, which is the event loop's
+        async def tick():
+            while True:
+                await asyncio.sleep(TICK_SECONDS)
+                engine.tick_journal()
+                engine.tick_autosave()
+
+        ticker = asyncio.create_task(tick())
+        try:
+            yield
+        finally:
+            ticker.cancel()
+
+    app = FastAPI(lifespan=lifespan)
+    transfers = itertools.count(1)
+    tracker = DeltaTracker(engine)
+
+    def current_state():
+        """
+        Gathers the state now and returns its stream. The state is gathered at
+        once, so commands run while the stream is sent do not tear it. Chunked
+        maps are sent in full, as clients cannot reach the server's chunk store.
+        """
+        game_state = engine.get_persistence_manager().gather_game_state(engine, inline_chunked=True)
+        return stream_game_state(game_state, next(transfers), max_message_size, tracker.seq)
+
+    manager = SessionManager(send_queue_size, slow_client_policy, current_state)
+
+    async def publish_changes():
+        delta = tracker.take()
+        if delta is None:
+            return
+        if not delta.get('resync'):
+            await manager.broadcast({"type": STATE_DELTA, "payload": delta})
+            return
+        await manager.broadcast_stream(current_state())
+
+    @app.get("/metrics")
+    async def metrics():
+        return manager.metrics()
 
     @app.websocket("/ws/{client_id}")
     async def websocket_endpoint(websocket: WebSocket, client_id: str):
@@ -56,23 +268,24 @@ def create_app(vtt_engine):
         user = User(f"Player-{client_id}", role)
         engine.get_user_manager().add_user(user)
 
-        # Send full state to the new client
-        game_state = engine.get_persistence_manager().gather_game_state(engine)
-        await manager.send_personal_message({"type": "full_state", "payload": game_state}, client_id)
+        # Stream the full state to the new client, active map first
+        await manager.send_personal_stream(current_state(), client_id)
         await manager.broadcast({"type": "chat", "payload": f"{user.username} ({role.name}) has joined."})
 
         try:
             while True:
                 data = await websocket.receive_text()
 
-                original_user = engine.current_user
-                engine.current_user = user
-
-                engine.get_command_handler().parse_and_handle(data)
-
-                engine.current_user = original_user
+                # Runs as the sending user and journals the command if a journal is open
+                # Only this thread's output is captured, not that of a background save
+                output = io.StringIO()
+                with capture_output(output):
+                    engine.execute_command(data, user)
 
-                await manager.broadcast({"type": "command", "payload": data})
+                # Clients apply the resulting state rather than running the command themselves
+                await publish_changes()
+                if output.getvalue():
+                    await manager.send_personal_message({"type": COMMAND_OUTPUT, "payload": output.getvalue()}, client_id)
 
         except WebSocketDisconnect:
             manager.disconnect(client_id)
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import time
+import zlib
+
+from .map_manager import DeferredMap
+
+OBJECTS_DIR = "objects"
+SNAPSHOTS_DIR = "snapshots"
+
+
+def _canonical(data):
+    return json.dumps(data, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+class SnapshotStore:
+    """
+    Keeps a history of game states in a directory, storing each distinct
+    piece of content once.
+
+    Every entity, map object and map is stored as a blob named by the SHA-256
+    hash of its content, under objects/. A map's blob holds the map without
+    its objects plus the hashes of those objects, and a snapshot, under
+    snapshots/, holds the rest of the game state plus the hashes of the entity
+    list and of every map. Saving a snapshot therefore only writes the blobs
+    for content that no earlier snapshot had: the entities and objects that
+    changed and the maps that hold them.
+
+    Blobs are never changed once written. `gc` deletes old snapshots and then
+    every blob no remaining snapshot refers to.
+
+    Chunked maps cannot be kept: their state only references a chunk store
+    that keeps changing, so restoring it would not bring back their contents
+    at the time of the snapshot.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, OBJECTS_DIR)
+        self.snapshots_dir = os.path.join(directory, SNAPSHOTS_DIR)
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        self._known = set()  # Hashes known to be stored, so they are not checked on disk again
+        self.blobs_written = 0  # By the last save
+
+    # --- Blobs ---
+
+    def _blob_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def _put(self, data):
+        """Stores one piece of content unless it is already stored, and returns its hash."""
+        text = _canonical(data)
+        digest = hashlib.sha256(text).hexdigest()
+        if digest in self._known:
+            return digest
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(zlib.compress(text))
+            os.replace(tmp_path, path)
+            self.blobs_written += 1
+        self._known.add(digest)
+        return digest
+
+    def _get(self, digest):
+        try:
+            with open(self._blob_path(digest), 'rb') as f:
+                return json.loads(zlib.decompress(f.read()).decode('utf-8'))
+        except FileNotFoundError:
+            raise ValueError(f"Snapshot store {self.directory} is missing blob {digest}.") from None
+
+    # --- Snapshots ---
+
+    def _manifest_path(self, snapshot_id):
+        return os.path.join(self.snapshots_dir, f"{snapshot_id:06d}.json")
+
+    def _snapshot_ids(self):
+        ids = []
+        for filename in os.listdir(self.snapshots_dir):
+            stem, extension = os.path.splitext(filename)
+            if extension == '.json' and stem.isdigit():
+                ids.append(int(stem))
+        return sorted(ids)
+
+    def _read_manifest(self, snapshot_id):
+        try:
+            with open(self._manifest_path(snapshot_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(f"Snapshot {snapshot_id} not found in {self.directory}.") from None
+
+    def save(self, game_state, label=""):
+        """
+        Stores a game state as a new snapshot. Raises ValueError, storing
+        nothing, if the state holds a chunked map.
+
+        Returns:
+            int: The new snapshot's ID.
+        """
+        for name, map_data in game_state.get('map_manager', {}).get('maps', {}).items():
+            if map_data.get('map_type') == 'chunked':
+                raise ValueError(f"Map '{name}' is a chunked map; chunked maps cannot be kept in a save history.")
+        self.blobs_written = 0
+        state = dict(game_state)
+
+        entity_manager = dict(state.get('entity_manager', {}))
+        entity_manager['entities'] = self._put([self._put(e) for e in entity_manager.get('entities', [])])
+        state['entity_manager'] = entity_manager
+
+        map_manager = dict(state.get('map_manager', {}))
+        maps = {}
+        for name, map_data in map_manager.get('maps', {}).items():
+            map_data = dict(map_data)
+            if 'objects' in map_data:
+                map_data['objects'] = [self._put(o) for o in map_data['objects']]
+            maps[name] = self._put(map_data)
+        map_manager['maps'] = maps
+        state['map_manager'] = map_manager
+
+        ids = self._snapshot_ids()
+        snapshot_id = ids[-1] + 1 if ids else 1
+        manifest = {'id': snapshot_id, 'created': time.time(), 'label': label, 'state': state}
+        # The manifest is written last: a save cut short leaves only unreferenced blobs behind
+        path = self._manifest_path(snapshot_id)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        return snapshot_id
+
+    def snapshots(self):
+        """Returns the id, creation time and label of every snapshot, oldest first."""
+        history = []
+        for snapshot_id in self._snapshot_ids():
+            manifest = self._read_manifest(snapshot_id)
+            history.append({'id': snapshot_id, 'created': manifest['created'], 'label': manifest['label']})
+        return history
+
+    def load(self, snapshot_id=None):
+        """
+        Returns the game state of a snapshot, the latest if no ID is given.
+        Its maps are DeferredMaps, whose objects are read when the map is first used.
+        Raises KeyError if there is no such snapshot.
+        """
+        if snapshot_id is None:
+            ids = self._snapshot_ids()
+            if not ids:
+                raise KeyError(f"Snapshot store {self.directory} is empty.")
+            snapshot_id = ids[-1]
+        state = self._read_manifest(snapshot_id)['state']
+
+        entity_manager = state['entity_manager']
+        entity_manager['entities'] = [self._get(digest) for digest in self._get(entity_manager['entities'])]
+
+        maps = {}
+        for name, digest in state['map_manager']['maps'].items():
+            map_data = self._get(digest)
+            template = map_data.get('template') if map_data.get('map_type') == 'instance' else None
+            maps[name] = DeferredMap(lambda map_data=map_data: self._resolve_map(map_data), template)
+        state['map_manager']['maps'] = maps
+        return state
+
+    def _resolve_map(self, map_data):
+        map_data = dict(map_data)
+        if 'objects' in map_data:
+            map_data['objects'] = [self._get(digest) for digest in map_data['objects']]
+        return map_data
+
+    def gc(self, keep=10):
+        """
+        Deletes all but the newest `keep` snapshots, then every blob that no
+        remaining snapshot refers to. Raises ValueError if `keep` is below 1.
+
+        Returns:
+            tuple: (snapshots deleted, blobs deleted)
+        """
+        if keep < 1:
+            raise ValueError(f"At least one snapshot must be kept, not {keep}.")
+        ids = self._snapshot_ids()
+        dropped = ids[:max(len(ids) - keep, 0)]
+        for snapshot_id in dropped:
+            os.remove(self._manifest_path(snapshot_id))
+
+        reachable = set()
+        for snapshot_id in ids[len(dropped):]:
+            state = self._read_manifest(snapshot_id)['state']
+            entities = state['entity_manager']['entities']
+            reachable.add(entities)
+            reachable.update(self._get(entities))
+            for digest in state['map_manager']['maps'].values():
+                reachable.add(digest)
+                reachable.update(self._get(digest).get('objects', ()))
+
+        removed = 0
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            for filename in os.listdir(prefix_dir):
+                # Leftover temporary files from interrupted saves go too
+                if prefix + filename not in reachable:
+                    os.remove(os.path.join(prefix_dir, filename))
+                    removed += 1
+            if not os.listdir(prefix_dir):
+                os.rmdir(prefix_dir)
+        self._known &= reachable
+        return len(dropped), removed
@@ -0,0 +1,98 @@
+from collections import defaultdict
+
+
+def footprint_cells(x, y, size):
+    """Returns the cells covered by an object of the given size anchored at (x, y)."""
+    size = max(size or 1, 1)
+    return tuple((x + dx, y + dy) for dy in range(size) for dx in range(size))
+
+
+class SpatialHash:
+    """
+    Maps grid cells to the objects whose footprint covers them.
+
+    An object anchored at (x, y) with size N covers the N x N block of cells
+    starting at its anchor. The footprint each object was indexed under is
+    remembered, so it can be re-indexed or removed after its position changed.
+    """
+
+    def __init__(self):
+        self._cells = defaultdict(dict)  # (x, y) -> {object_id: obj}
+        self._footprints = {}            # object_id -> tuple of cells
+
+    def insert(self, obj, cells=None):
+        """Indexes an object under its current footprint, or under the given cells."""
+        cells = footprint_cells(obj.x, obj.y, obj.size) if cells is None else tuple(cells)
+        self._footprints[obj.id] = cells
+        for cell in cells:
+            self._cells[cell][obj.id] = obj
+
+    def remove(self, object_id):
+        """Removes an object from the index. Unknown IDs are ignored."""
+        for cell in self._footprints.pop(object_id, ()):
+            bucket = self._cells[cell]
+            bucket.pop(object_id, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def update(self, obj):
+        """Re-indexes an object after its position or size changed."""
+        self.remove(obj.id)
+        self.insert(obj)
+
+    def copy(self):
+        """Returns an independent index over the same objects."""
+        clone = SpatialHash()
+        clone._cells.update((cell, dict(bucket)) for cell, bucket in self._cells.items())
+        clone._footprints = dict(self._footprints)
+        return clone
+
+    def clear(self):
+        self._cells.clear()
+        self._footprints.clear()
+
+    def footprint(self, object_id):
+        """Returns the cells an object is currently indexed under."""
+        return self._footprints.get(object_id, ())
+
+    def at_cell(self, x, y):
+        """Returns the objects covering a single cell."""
+        bucket = self._cells.get((x, y))
+        return list(bucket.values()) if bucket else []
+
+    def in_cells(self, cells):
+        """Returns the objects covering any of the given cells, without duplicates."""
+        found = {}
+        for cell in cells:
+            bucket = self._cells.get(cell)
+            if bucket:
+                found.update(bucket)
+        return list(found.values())
+
+    def in_rect(self, x0, y0, x1, y1, cell_filter=None):
+        """
+        Returns the objects covering any cell of the inclusive rectangle
+        (x0, y0)-(x1, y1), without duplicates.
+
+        Args:
+            cell_filter (callable, optional): Only cells for which
+                cell_filter(x, y) is true are considered.
+        """
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        area = (x1 - x0 + 1) * (y1 - y0 + 1)
+
+        found = {}
+        if area <= len(self._cells):
+            # Small window: probe each cell in it
+            for y in range(y0, y1 + 1):
+                for x in range(x0, x1 + 1):
+                    bucket = self._cells.get((x, y))
+                    if bucket and (cell_filter is None or cell_filter(x, y)):
+                        found.update(bucket)
+        else:
+            # Large window over a sparse map: walk the occupied cells instead
+            for (x, y), bucket in self._cells.items():
+                if x0 <= x <= x1 and y0 <= y <= y1 and (cell_filter is None or cell_filter(x, y)):
+                    found.update(bucket)
+        return list(found.values())
@@ -0,0 +1,300 @@
+import hashlib
+import json
+import sqlite3
+import weakref
+
+from .map_manager import DeferredMap
+
+DATABASE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entities (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    entity_type TEXT,
+    name TEXT,
+    digest TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tracker (
+    entity_id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    score INTEGER
+);
+CREATE TABLE IF NOT EXISTS maps (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    map_type TEXT,
+    template TEXT,
+    has_objects INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS map_objects (
+    map_name TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    object_type TEXT,
+    entity_id TEXT,
+    x INTEGER,
+    y INTEGER,
+    layer INTEGER,
+    digest TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (map_name, id)
+);
+CREATE INDEX IF NOT EXISTS map_objects_by_cell ON map_objects (map_name, x, y);
+CREATE INDEX IF NOT EXISTS map_objects_by_entity ON map_objects (entity_id);
+CREATE INDEX IF NOT EXISTS entities_by_name ON entities (name);
+"""
+
+
+def _encode(data):
+    return json.dumps(data, separators=(',', ':'), sort_keys=True)
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _sync_rows(conn, stored, items, upsert_sql, delete_sql, make_row):
+    """
+    Writes only the rows that changed.
+
+    Args:
+        stored (dict): key -> (position, digest) of the rows in the table.
+        items (iterable): (key, text, value) in the order they should load.
+        make_row (callable): make_row(key, position, digest, text, value) -> row for upsert_sql.
+
+    Rows keep their stored position while the saved order allows it, so
+    removing one early item does not renumber every row after it.
+
+    Returns:
+        int: The number of rows written or deleted.
+    """
+    stored = dict(stored)
+    last = -1
+    writes = []
+    for key, text, value in items:
+        digest = _digest(text)
+        old = stored.pop(key, None)
+        position = old[0] if old is not None and old[0] > last else last + 1
+        last = position
+        if old != (position, digest):
+            writes.append(make_row(key, position, digest, text, value))
+    if writes:
+        conn.executemany(upsert_sql, writes)
+    if stored:
+        conn.executemany(delete_sql, [(key,) if not isinstance(key, tuple) else key for key in stored])
+    return len(writes) + len(stored)
+
+
+class _MapLoader:
+    """Loads one map from the store; used as a DeferredMap's load function."""
+
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+
+    def __call__(self):
+        return self.store.load_map(self.name)
+
+
+class SQLiteStore:
+    """
+    Keeps a campaign in a SQLite database, one row per entity, map, map
+    object and initiative entry.
+
+    Saves only write the rows whose content changed, compared through a
+    digest stored with each row. Maps that have not changed since this store
+    last saved or loaded them (their version is the same) are not serialized
+    at all. Loading returns maps as DeferredMaps, so each one is read from
+    the database when first used, and single maps, entities or objects can
+    be queried without loading the campaign.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._saved_maps = {}  # name -> (weak reference to the Map, version it had when saved)
+        self.rows_written = 0
+
+    def close(self):
+        self.conn.close()
+
+    # --- Saving ---
+
+    def clean_maps(self, map_manager):
+        """Returns the names of the maps whose rows already match their state."""
+        clean = set()
+        for name in map_manager.list_maps():
+            if not map_manager.is_loaded(name):
+                deferred = map_manager.get_deferred(name)
+                if isinstance(deferred.load, _MapLoader) and deferred.load.store is self:
+                    clean.add(name)
+                continue
+            saved = self._saved_maps.get(name)
+            game_map = map_manager.get_map(name)
+            if saved is not None and saved[0]() is game_map and saved[1] == game_map.version:
+                clean.add(name)
+        return clean
+
+    def mark_saved(self, map_manager, names):
+        """Remembers the versions of loaded maps whose rows were just written."""
+        for name in names:
+            if map_manager.is_loaded(name):
+                game_map = map_manager.get_map(name)
+                self._saved_maps[name] = (weakref.ref(game_map), game_map.version)
+
+    def save(self, game_state, keep_maps=()):
+        """
+        Writes a game state, touching only the rows that changed. Maps in
+        keep_maps are left in the database as they are; any other map that
+        is not in the game state is deleted.
+
+        Returns:
+            int: The number of rows written or deleted.
+        """
+        written = 0
+        with self.conn:
+            meta = {key: value for key, value in game_state.items()
+                    if key not in ('entity_manager', 'initiative_tracker', 'map_manager')}
+            map_manager_state = dict(game_state.get('map_manager', {}))
+            maps = map_manager_state.pop('maps', {})
+            meta['map_manager'] = map_manager_state
+            self.conn.execute("DELETE FROM meta")
+            self.conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                                  [(key, json.dumps(value)) for key, value in meta.items()])
+
+            entities = game_state.get('entity_manager', {}).get('entities', [])
+            written += _sync_rows(
+                self.conn,
+                {row[0]: (row[1], row[2]) for row in self.conn.execute("SELECT id, position, digest FROM entities")},
+                ((e['id'], _encode(e), e) for e in entities),
+                "INSERT OR REPLACE INTO entities (id, position, entity_type, name, digest, data) VALUES (?, ?, ?, ?, ?, ?)",
+                "DELETE FROM entities WHERE id = ?",
+                lambda key, position, digest, text, e: (
+                    key, position, e.get('entity_type'), e.get('attributes', {}).get('name'), digest, text
+                )
+            )
+
+            combatants = game_state.get('initiative_tracker', {}).get('combatants', {})
+            written += _sync_rows(
+                self.conn,
+                {row[0]: (row[1], row[2]) for row in self.conn.execute("SELECT entity_id, position, digest FROM tracker")},
+                ((entity_id, json.dumps(score), score) for entity_id, score in combatants.items()),
+                "INSERT OR REPLACE INTO tracker (entity_id, position, digest, score) VALUES (?, ?, ?, ?)",
+                "DELETE FROM tracker WHERE entity_id = ?",
+                lambda key, position, digest, text, score: (key, position, digest, score)
+            )
+
+            for name in self._map_names() - set(maps) - set(keep_maps):
+                self.conn.execute("DELETE FROM maps WHERE name = ?", (name,))
+                self.conn.execute("DELETE FROM map_objects WHERE map_name = ?", (name,))
+                written += 1
+            for name, map_data in maps.items():
+                written += self._save_map(name, map_data)
+        self.rows_written += written
+        return written
+
+    def _map_names(self):
+        return {row[0] for row in self.conn.execute("SELECT name FROM maps")}
+
+    def _save_map(self, name, map_data):
+        map_data = dict(map_data)
+        objects = map_data.pop('objects', None)
+        written = 0
+        stored = self.conn.execute("SELECT position, digest FROM maps WHERE name = ?", (name,)).fetchone()
+        text = _encode(map_data)
+        digest = _digest(text)
+        if stored is None or stored[1] != digest:
+            position = stored[0] if stored else self.conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM maps").fetchone()[0]
+            template = map_data.get('template') if map_data.get('map_type') == 'instance' else None
+            self.conn.execute(
+                "INSERT OR REPLACE INTO maps (name, position, map_type, template, has_objects, digest, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, position, map_data.get('map_type', 'map'), template, objects is not None, digest, text)
+            )
+            written += 1
+
+        written += _sync_rows(
+            self.conn,
+            {(name, row[0]): (row[1], row[2]) for row in
+             self.conn.execute("SELECT id, position, digest FROM map_objects WHERE map_name = ?", (name,))},
+            (((name, o['id']), _encode(o), o) for o in objects or ()),
+            "INSERT OR REPLACE INTO map_objects (map_name, id, position, object_type, entity_id, x, y, layer, digest, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            "DELETE FROM map_objects WHERE map_name = ? AND id = ?",
+            lambda key, position, digest, text, o: (
+                key[0], key[1], position, o.get('object_type'), o.get('entity_id'),
+                o.get('x'), o.get('y'), o.get('layer'), digest, text
+            )
+        )
+        return written
+
+    # --- Loading ---
+
+    def load_game_state(self):
+        """Returns the stored game state with every map deferred until it is used."""
+        game_state = {key: json.loads(value) for key, value in self.conn.execute("SELECT key, value FROM meta")}
+        map_manager_state = dict(game_state.pop('map_manager', {}))
+        map_manager_state['maps'] = {
+            name: DeferredMap(_MapLoader(self, name), template)
+            for name, template in self.conn.execute("SELECT name, template FROM maps ORDER BY position")
+        }
+        game_state['entity_manager'] = {
+            'entities': [json.loads(row[0]) for row in self.conn.execute("SELECT data FROM entities ORDER BY position")]
+        }
+        game_state['initiative_tracker'] = {
+            'combatants': dict(self.conn.execute("SELECT entity_id, score FROM tracker ORDER BY position").fetchall())
+        }
+        game_state['map_manager'] = map_manager_state
+        return game_state
+
+    def load_map(self, name):
+        """Returns one map's saved dictionary. Raises KeyError if there is no such map."""
+        row = self.conn.execute("SELECT data, has_objects FROM maps WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(f"Map '{name}' not found in {self.path}.")
+        map_data = json.loads(row[0])
+        if row[1]:
+            map_data['objects'] = [
+                json.loads(data) for (data,) in
+                self.conn.execute("SELECT data FROM map_objects WHERE map_name = ? ORDER BY position", (name,))
+            ]
+        return map_data
+
+    def load_entity(self, entity_id):
+        """Returns one entity's saved dictionary, or None."""
+        row = self.conn.execute("SELECT data FROM entities WHERE id = ?", (entity_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # --- Queries ---
+
+    def map_names(self):
+        """Returns the stored maps' names in save order."""
+        return [row[0] for row in self.conn.execute("SELECT name FROM maps ORDER BY position")]
+
+    def count_objects(self, map_name):
+        return self.conn.execute("SELECT COUNT(*) FROM map_objects WHERE map_name = ?", (map_name,)).fetchone()[0]
+
+    def objects_in_rect(self, map_name, x0, y0, x1, y1):
+        """Returns the saved dictionaries of the objects anchored in the inclusive rectangle."""
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        return [json.loads(data) for (data,) in self.conn.execute(
+            "SELECT data FROM map_objects WHERE map_name = ? AND x BETWEEN ? AND ? AND y BETWEEN ? AND ? "
+            "ORDER BY position", (map_name, x0, x1, y0, y1)
+        )]
+
+    def tokens_of_entity(self, entity_id):
+        """Returns (map_name, token dictionary) for every stored token of an entity."""
+        return [(map_name, json.loads(data)) for map_name, data in self.conn.execute(
+            "SELECT map_name, data FROM map_objects WHERE entity_id = ? ORDER BY map_name, position", (entity_id,)
+        )]
@@ -0,0 +1,166 @@
+from .map import object_from_dict
+from .map_events import ObjectsAdded, ObjectsRemoved, ObjectsMoved, PropertyChanged, TerrainChanged, TriggersChanged
+from .trigger import Trigger
+
+STATE_DELTA = 'state_delta'
+
+
+class DeltaTracker:
+    """
+    Collects the changes made to an engine's game state, so a server can
+    send its clients what changed instead of the commands that changed it.
+
+    Entity and map changes are recorded as they happen, through the change
+    handlers of the entity and map managers. `take` turns them into a delta
+    payload, numbered by `seq`:
+
+        {'seq': 12,
+         'entities': [entity dicts],
+         'maps': {name: {'version': 40, 'changed': [object dicts], 'removed': [IDs],
+                         'triggers': [trigger dicts]}},
+         'maps_added': {name: map dict},
+         'active_map_name': 'cave',
+         'initiative': {'combatants': {...}}}
+
+    Keys without changes are left out. `version` is the map's version on the
+    server after the changes. Changes a delta does not describe (a load, a
+    deleted map, terrain edits or another module) give `{'seq': n, 'resync':
+    True}` instead: the full state must be sent again.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.seq = 0
+        engine.get_entity_manager().change_handler = self._entity_changed
+        engine.get_map_manager().change_handler = self._map_changed
+        self._start()
+
+    def _start(self):
+        """Takes what the next delta is compared against."""
+        map_manager = self.engine.get_map_manager()
+        self._entities = {}  # Changed entity IDs, in the order of their first change
+        self._objects = {}   # map name -> {object ID: None}, likewise
+        self._trigger_maps = set()  # Maps whose triggers were added or removed
+        self._resync = False
+        self._maps = map_manager.list_maps()
+        self._active_map_name = map_manager.active_map_name
+        self._initiative = self.engine.get_initiative_tracker().to_dict()
+        self._module = self._module_key()
+
+    def _module_key(self):
+        module = self.engine.active_module
+        return (module.id, module.version) if module else None
+
+    def _entity_changed(self, entity_id):
+        if entity_id is None:
+            self._resync = True
+        else:
+            self._entities[entity_id] = None
+
+    def _map_changed(self, event):
+        if event is None or isinstance(event, TerrainChanged):
+            self._resync = True
+            return
+        if isinstance(event, TriggersChanged):
+            self._trigger_maps.add(event.map_name)
+            return
+        ids = self._objects.setdefault(event.map_name, {})
+        if isinstance(event, (ObjectsAdded, ObjectsRemoved)):
+            ids.update(dict.fromkeys(obj.id for obj in event.objects))
+        elif isinstance(event, ObjectsMoved):
+            ids.update(dict.fromkeys(move.object_id for move in event.moves))
+        elif isinstance(event, PropertyChanged):
+            ids[event.object_id] = None
+
+    def take(self):
+        """
+        Returns the changes made since the last call as a delta payload, or
+        None if nothing changed.
+        """
+        map_manager = self.engine.get_map_manager()
+        maps = map_manager.list_maps()
+        resync = (self._resync or self._module_key() != self._module
+                  or any(name not in maps for name in self._maps))
+        payload = {} if resync else self._delta(maps)
+        if not resync and not payload:
+            return None
+        self.seq += 1
+        self._start()
+        return {'seq': self.seq, 'resync': True} if resync else dict(payload, seq=self.seq)
+
+    def _delta(self, maps):
+        map_manager = self.engine.get_map_manager()
+        entity_manager = self.engine.get_entity_manager()
+        payload = {}
+
+        added = [name for name in maps if name not in self._maps]
+        if added:
+            payload['maps_added'] = {name: map_manager.map_to_dict(name, inline_chunked=True) for name in added}
+
+        entities = [entity_manager.get_entity(entity_id) for entity_id in self._entities]
+        if entities:
+            payload['entities'] = [entity.to_fragment() for entity in entities if entity is not None]
+
+        changes = {}
+        for name, object_ids in self._objects.items():
+            game_map = map_manager.get_map(name)
+            if name in added or game_map is None:
+                continue
+            changed, removed = [], []
+            for object_id in object_ids:
+                obj = game_map.get_object(object_id)
+                if obj is None:
+                    removed.append(object_id)
+                else:
+                    changed.append(obj.to_fragment())
+            changes[name] = {'version': game_map.version, 'changed': changed, 'removed': removed}
+        for name in self._trigger_maps:
+            game_map = map_manager.get_map(name)
+            if name in added or game_map is None:
+                continue
+            entry = changes.setdefault(name, {'version': game_map.version, 'changed': [], 'removed': []})
+            entry['triggers'] = [trigger.to_dict() for trigger in game_map.triggers]
+        if changes:
+            payload['maps'] = changes
+
+        if map_manager.active_map_name != self._active_map_name:
+            payload['active_map_name'] = map_manager.active_map_name
+        initiative = self.engine.get_initiative_tracker().to_dict()
+        if initiative != self._initiative:
+            payload['initiative'] = initiative
+        return payload
+
+
+def apply_delta(engine, payload):
+    """
+    Applies a delta made by DeltaTracker.take to an engine holding a copy of
+    the game state, without running any game logic: changed entities and
+    objects replace their copies, and triggers set off by the replaced
+    objects do not react, as their reactions have already run on the server.
+    """
+    map_manager = engine.get_map_manager()
+    trigger_handler, map_manager.trigger_handler = map_manager.trigger_handler, None
+    try:
+        for name, map_data in payload.get('maps_added', {}).items():
+            map_manager.add_saved_map(name, map_data)
+        engine.get_entity_manager().add_from_dicts(payload.get('entities', []))
+
+        for name, changes in payload.get('maps', {}).items():
+            game_map = map_manager.get_map(name)
+            if game_map is None:
+                continue
+            game_map.remove_objects(changes['removed'])
+            objects = [object_from_dict(obj_data) for obj_data in changes['changed']]
+            game_map.replace_objects([obj for obj in objects if obj is not None])
+            if 'triggers' in changes:
+                for trigger in game_map.triggers:
+                    game_map.remove_trigger(trigger.id)
+                for trigger_data in changes['triggers']:
+                    game_map.add_trigger(Trigger.from_dict(trigger_data))
+
+        if 'active_map_name' in payload:
+            map_manager.active_map_name = payload['active_map_name']
+        if 'initiative' in payload:
+            engine.get_initiative_tracker().load_from_dict(payload['initiative'])
+    finally:
+        map_manager.trigger_handler = trigger_handler
@@ -0,0 +1,201 @@
+from .fragments import Fragment, encode
+
+STATE_BEGIN = 'state_begin'
+STATE_MAP = 'state_map'
+STATE_OBJECTS = 'state_objects'
+STATE_ENTITIES = 'state_entities'
+STATE_END = 'state_end'
+STREAM_MESSAGES = (STATE_BEGIN, STATE_MAP, STATE_OBJECTS, STATE_ENTITIES, STATE_END)
+
+DEFAULT_MAX_MESSAGE_SIZE = 256 * 1024
+
+
+def _size(item):
+    return len(item.json) if isinstance(item, Fragment) else len(encode(item))
+
+
+def _batches(items, room):
+    """Splits items into lists whose encoded size fits in `room`. An item too large on its own is sent alone."""
+    batch, used = [], 0
+    for item in items:
+        size = _size(item) + 1
+        if batch and used + size > room:
+            yield batch
+            batch, used = [], 0
+        batch.append(item)
+        used += size
+    if batch:
+        yield batch
+
+
+def _message(msg_type, payload):
+    return encode({'type': msg_type, 'payload': payload})
+
+
+def _room(msg_type, payload, key, max_message_size):
+    room = max_message_size - len(_message(msg_type, dict(payload, **{key: []})))
+    if room <= 0:
+        raise ValueError(f"max_message_size {max_message_size} is too small for a {msg_type} message.")
+    return room
+
+
+def _send_order(maps, active):
+    """The active map (after its template) first, then templates before instances."""
+    first = []
+    if active in maps:
+        template = maps[active].get('template') if maps[active].get('map_type') == 'instance' else None
+        if template in maps:
+            first.append(template)
+        first.append(active)
+    rest = [name for name in maps if name not in first]
+    rest.sort(key=lambda name: maps[name].get('map_type') == 'instance')
+    return first + rest
+
+
+def stream_game_state(game_state, transfer=0, max_message_size=DEFAULT_MAX_MESSAGE_SIZE, seq=0):
+    """
+    Yields a game state as a sequence of encoded messages, for a client to
+    load while it arrives.
+
+    The first message, `state_begin`, holds everything but the entities and
+    maps, plus the names of the maps in the order they follow. The active map
+    comes next (after its template, for an instance), then the entities,
+    then every other map. Each map is a `state_map` message with the map's
+    own fields and object count, followed by `state_objects` messages with
+    its objects. `state_end` closes the transfer. Every message carries
+    the `transfer` number. `seq` is the number of the last state delta (see
+    state_delta) whose changes the state already holds.
+
+    Entities and objects are packed so each message stays within
+    `max_message_size` characters; only a single entity, object or map
+    header larger than that on its own makes a longer message. Messages are
+    encoded one at a time as they are asked for.
+    """
+    map_manager = game_state.get('map_manager', {})
+    maps = map_manager.get('maps', {})
+    entities = game_state.get('entity_manager', {}).get('entities', [])
+    active = map_manager.get('active_map_name')
+    order = _send_order(maps, active)
+
+    meta = {key: value for key, value in game_state.items() if key not in ('entity_manager', 'map_manager')}
+    meta['map_manager'] = {key: value for key, value in map_manager.items() if key != 'maps'}
+    yield _message(STATE_BEGIN, {
+        'transfer': transfer,
+        'seq': seq,
+        'meta': meta,
+        'maps': order,
+        'entity_count': len(entities)
+    })
+
+    def map_messages(name):
+        header = dict(maps[name])
+        objects = header.pop('objects', None)
+        yield _message(STATE_MAP, {
+            'transfer': transfer,
+            'name': name,
+            'map': header,
+            'object_count': len(objects) if objects is not None else None
+        })
+        if objects:
+            payload = {'transfer': transfer, 'map': name}
+            for batch in _batches(objects, _room(STATE_OBJECTS, payload, 'objects', max_message_size)):
+                yield _message(STATE_OBJECTS, dict(payload, objects=batch))
+
+    active_count = order.index(active) + 1 if active in maps else 0
+    for name in order[:active_count]:
+        yield from map_messages(name)
+
+    payload = {'transfer': transfer}
+    for batch in _batches(entities, _room(STATE_ENTITIES, payload, 'entities', max_message_size)):
+        yield _message(STATE_ENTITIES, dict(payload, entities=batch))
+
+    for name in order[active_count:]:
+        yield from map_messages(name)
+    yield _message(STATE_END, {'transfer': transfer})
+
+
+class StateAssembler:
+    """
+    Loads a game state streamed by stream_game_state into an engine.
+
+    As soon as the active map (and its template, for an instance) has
+    arrived, the engine is restored with it and with the entities received
+    so far, and `ready` becomes True: the map can be shown while the rest is
+    still on its way. Entities are then added as they arrive and other maps
+    as each one completes, deferred until first used. `complete` becomes True
+    on `state_end`. Messages of any transfer but the latest are ignored.
+    `seq` is the number of the last state delta the transfer holds.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.transfer = None
+        self.seq = 0
+        self.ready = False
+        self.complete = False
+
+    @property
+    def in_progress(self):
+        return self.transfer is not None and not self.complete
+
+    def feed(self, msg_type, payload):
+        """Handles one streamed message."""
+        if msg_type == STATE_BEGIN:
+            self._begin(payload)
+            return
+        if not self.in_progress or payload.get('transfer') != self.transfer:
+            return
+
+        if msg_type == STATE_MAP:
+            map_data = dict(payload['map'])
+            count = payload['object_count']
+            if count is not None:
+                map_data['objects'] = []
+            self._partial[payload['name']] = (map_data, count)
+            if not count:
+                self._map_complete(payload['name'])
+        elif msg_type == STATE_OBJECTS:
+            map_data, count = self._partial[payload['map']]
+            map_data['objects'].extend(payload['objects'])
+            if len(map_data['objects']) >= count:
+                self._map_complete(payload['map'])
+        elif msg_type == STATE_ENTITIES:
+            if self.ready:
+                self.engine.get_entity_manager().add_from_dicts(payload['entities'])
+            else:
+                self._entities.extend(payload['entities'])
+        elif msg_type == STATE_END:
+            if not self.ready:
+                self._load()
+            self.complete = True
+
+    def _begin(self, payload):
+        self.transfer = payload['transfer']
+        self.seq = payload.get('seq', 0)
+        self.ready = False
+        self.complete = False
+        self._meta = payload['meta']
+        self._partial = {}
+        self._maps = {}
+        self._entities = []
+        # The maps that must arrive before the engine is loaded: the active one and its template
+        active = self._meta.get('map_manager', {}).get('active_map_name')
+        self._needed = set(payload['maps'][:payload['maps'].index(active) + 1]) if active in payload['maps'] else set()
+        if not self._needed:
+            self._load()
+
+    def _map_complete(self, name):
+        map_data, _ = self._partial.pop(name)
+        if self.ready:
+            self.engine.get_map_manager().add_saved_map(name, map_data)
+            return
+        self._maps[name] = map_data
+        if self._needed.issubset(self._maps):
+            self._load()
+
+    def _load(self):
+        game_state = dict(self._meta)
+        game_state['entity_manager'] = {'entities': self._entities}
+        game_state['map_manager'] = dict(self._meta.get('map_manager', {}), maps=self._maps)
+        self.engine.load_game_from_dict(game_state)
+        self.ready = True
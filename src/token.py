@@ -37,7 +37,8 @@ class Token(MapObject):
             size=data.get('size', 1),
             asset_path=data.get('asset_path'),
             blocks_light=data.get('blocks_light', False),
-            light_radius=data.get('light_radius')
+            blocks_movement=data.get('blocks_movement', False),
+            light_radius=data.get('light_radius'),
+            id=data['id']
         )
-        token.id = data['id']
         return token
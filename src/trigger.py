@@ -0,0 +1,72 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .ids import new_id
+
+ENTER = 'enter'
+LEAVE = 'leave'
+
+# Reactions starting with this prefix run a registered action instead of a command line
+ACTION_PREFIX = 'action:'
+
+
+@dataclass
+class Trigger:
+    """
+    An area of a map that reacts when tokens enter or leave it.
+
+    The area is a width x height rectangle with its top-left cell at (x, y),
+    or, if radius is set, every cell within radius of (x, y). An aura is a
+    trigger attached to an object: (x, y) is then an offset from that
+    object's position and the area follows it around.
+
+    Reactions are either "action:<action_id>", which runs a registered action
+    with the token's entity as the actor, or a command line. Command lines
+    may use the placeholders {token}, {entity}, {map} and {trigger}.
+    """
+    x: int
+    y: int
+    width: int = 1
+    height: int = 1
+    radius: Optional[int] = None
+    attached_to: Optional[str] = None
+    on_enter: str = ""
+    on_leave: str = ""
+    name: str = ""
+    id: str = field(default_factory=new_id)
+
+    def reaction(self, event):
+        """Returns the reaction for an ENTER or LEAVE event."""
+        return self.on_enter if event == ENTER else self.on_leave
+
+    def to_dict(self):
+        """Returns a serializable dictionary representation of the trigger."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'x': self.x,
+            'y': self.y,
+            'width': self.width,
+            'height': self.height,
+            'radius': self.radius,
+            'attached_to': self.attached_to,
+            'on_enter': self.on_enter,
+            'on_leave': self.on_leave
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Creates a Trigger from a dictionary."""
+        trigger = cls(
+            x=data['x'],
+            y=data['y'],
+            width=data.get('width', 1),
+            height=data.get('height', 1),
+            radius=data.get('radius'),
+            attached_to=data.get('attached_to'),
+            on_enter=data.get('on_enter', ""),
+            on_leave=data.get('on_leave', ""),
+            name=data.get('name', "")
+        )
+        trigger.id = data['id']
+        return trigger
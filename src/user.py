@@ -16,6 +16,15 @@ class User:
     def __repr__(self):
         return f"User(id={self.id}, username='{self.username}', role={self.role.name})"
 
+    def to_dict(self):
+        return {'id': self.id, 'username': self.username, 'role': self.role.name}
+
+    @classmethod
+    def from_dict(cls, data):
+        user = cls(data['username'], UserRole[data['role']])
+        user.id = data['id']
+        return user
+
 class UserManager:
     """Manages all users in the game session."""
     def __init__(self):
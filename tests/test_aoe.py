@@ -0,0 +1,79 @@
+import unittest
+from src.map import Map, GridType
+from src.map_object import MapObject
+from src.token import Token
+from src.aoe import TemplateShape, template_offsets, template_cells, tokens_in_template
+
+class TestAoe(unittest.TestCase):
+
+    def setUp(self):
+        self.game_map = Map(name="arena", width=20, height=20)
+
+    def test_sphere(self):
+        print("Running test: test_sphere")
+        cells = template_cells(self.game_map, TemplateShape.SPHERE, (10, 10), 1)
+        self.assertEqual(cells, {(10, 10), (9, 10), (11, 10), (10, 9), (10, 11)})
+        # Spheres ignore direction
+        self.assertEqual(cells, template_cells(self.game_map, TemplateShape.SPHERE, (10, 10), 1, direction=45))
+
+    def test_line_and_cube(self):
+        print("Running test: test_line_and_cube")
+        line = template_cells(self.game_map, TemplateShape.LINE, (5, 5), 3, direction=0)
+        self.assertEqual(line, {(6, 5), (7, 5), (8, 5)})
+        diagonal = template_cells(self.game_map, TemplateShape.LINE, (5, 5), 3, direction=45)
+        self.assertEqual(diagonal, {(6, 6), (7, 7)})
+
+        cube = template_cells(self.game_map, TemplateShape.CUBE, (5, 5), 2, direction=90)
+        self.assertEqual(cube, {(5, 6), (6, 6), (5, 7), (6, 7)})
+
+    def test_cone_widens_with_distance(self):
+        print("Running test: test_cone_widens_with_distance")
+        cells = template_cells(self.game_map, TemplateShape.CONE, (5, 5), 3, direction=0)
+        self.assertNotIn((5, 5), cells)
+        self.assertEqual({y for x, y in cells if x == 6}, {5})
+        self.assertEqual({y for x, y in cells if x == 7}, {4, 5, 6})
+        self.assertTrue(all(x > 5 for x, y in cells))
+
+    def test_cells_are_clipped_and_translated(self):
+        print("Running test: test_cells_are_clipped_and_translated")
+        corner = template_cells(self.game_map, TemplateShape.SPHERE, (0, 0), 2)
+        self.assertTrue(all(x >= 0 and y >= 0 for x, y in corner))
+
+        a = template_cells(self.game_map, TemplateShape.CONE, (5, 5), 4, direction=30)
+        b = template_cells(self.game_map, TemplateShape.CONE, (8, 9), 4, direction=30)
+        self.assertEqual({(x + 3, y + 4) for x, y in a}, b)
+
+    def test_masks_are_cached(self):
+        print("Running test: test_masks_are_cached")
+        template_offsets.cache_clear()
+        for origin in [(2, 2), (10, 10), (15, 3)]:
+            template_cells(self.game_map, TemplateShape.CONE, origin, 3, direction=90)
+        info = template_offsets.cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 2)
+
+    def test_hex_templates(self):
+        print("Running test: test_hex_templates")
+        hex_map = Map(name="hexes", width=20, height=20, grid_type=GridType.HEX)
+        sphere = template_cells(hex_map, TemplateShape.SPHERE, (10, 10), 1)
+        self.assertEqual(len(sphere), 7)
+        self.assertEqual(len(template_cells(hex_map, TemplateShape.SPHERE, (10, 10), 2)), 19)
+
+        line = template_cells(hex_map, TemplateShape.LINE, (10, 10), 3, direction=0)
+        self.assertEqual(line, {(11, 10), (12, 10), (13, 10)})
+
+    def test_tokens_in_template(self):
+        print("Running test: test_tokens_in_template")
+        inside = Token(x=7, y=5, layer=4, entity_id="e1")
+        big = Token(x=7, y=1, layer=4, entity_id="e2", size=3)   # Footprint reaches (8, 3)
+        outside = Token(x=5, y=9, layer=4, entity_id="e3")
+        rock = MapObject(x=6, y=5, layer=1)
+        for obj in (inside, big, outside, rock):
+            self.game_map.add_object(obj)
+
+        tokens = tokens_in_template(self.game_map, TemplateShape.CONE, (5, 5), 4, direction=0)
+        self.assertEqual({t.entity_id for t in tokens}, {"e1", "e2"})
+
+
+if __name__ == '__main__':
+    unittest.main()
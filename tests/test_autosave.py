@@ -0,0 +1,97 @@
+import unittest
+import io
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from src.engine import Engine
+from src.user import User, UserRole
+
+
+class TestAutosave(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "autosave.json")
+        self.gm = User("GM", UserRole.GM)
+        self.engine = Engine()
+        with redirect_stdout(io.StringIO()):
+            self.engine.load_system_module("dnd5e")
+
+    def tearDown(self):
+        self.engine.stop_autosave()
+        shutil.rmtree(self.directory)
+
+    def _run(self, *commands):
+        with redirect_stdout(io.StringIO()):
+            for command in commands:
+                self.engine.execute_command(command, self.gm)
+
+    def _saved_state(self, path):
+        with redirect_stdout(io.StringIO()):
+            return self.engine.get_persistence_manager().load_game(path)
+
+    def test_saves_after_enough_changes(self):
+        print("Running test: test_saves_after_enough_changes")
+        autosave = self.engine.start_autosave(self.path, interval=None, change_threshold=3)
+        self._run("create char Hero hp=20", "status", "create char Goblin hp=7")
+        self.assertTrue(autosave.wait(5))
+        self.assertFalse(os.path.exists(self.path))  # status changes nothing
+
+        self._run("map create dungeon 10 10")
+        snapshot = self.engine.get_persistence_manager().gather_game_state(self.engine)
+        # Changes made while the worker writes are not part of the snapshot
+        self.engine.get_entity_manager().find_entity_by_name("Hero").attributes["hp"] = 1
+        self.assertTrue(autosave.wait(5))
+
+        self.assertEqual(self._saved_state(self.path), snapshot)
+        self.assertEqual(autosave.changes, 0)
+        metrics = autosave.metrics()
+        self.assertEqual((metrics['saves'], metrics['failures'], metrics['pending']), (1, 0, 0))
+        self.assertEqual(metrics['last_bytes'], os.path.getsize(self.path))
+        self.assertEqual(os.listdir(self.directory), ["autosave.json"])
+
+    def test_interval_saves_only_after_changes(self):
+        print("Running test: test_interval_saves_only_after_changes")
+        autosave = self.engine.start_autosave(self.path, interval=0, change_threshold=None)
+        self.assertFalse(self.engine.tick_autosave())
+        self._run("create char Hero hp=20")
+        self.assertTrue(self.engine.tick_autosave())
+        self.assertFalse(self.engine.tick_autosave())
+        self.assertTrue(autosave.wait(5))
+        self.assertEqual(autosave.saves, 1)
+
+    def test_save_command_writes_in_background(self):
+        print("Running test: test_save_command_writes_in_background")
+        autosave = self.engine.start_autosave(self.path, interval=None, change_threshold=None)
+        self._run("create char Hero hp=20")
+        binary_path = os.path.join(self.directory, "manual.vttb")
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.engine.execute_command(f"save {binary_path}", self.gm)
+        self.assertIn("in the background", output.getvalue())
+
+        self.engine.stop_autosave()
+        self.assertIsNone(self.engine.autosave)
+        restored = Engine()
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(restored.load_game(binary_path))
+        self.assertIsNotNone(restored.get_entity_manager().find_entity_by_name("Hero"))
+        self.assertEqual(autosave.saves, 1)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_failed_writes_are_reported(self):
+        print("Running test: test_failed_writes_are_reported")
+        missing = os.path.join(self.directory, "missing", "autosave.json")
+        autosave = self.engine.start_autosave(missing, interval=None, change_threshold=None)
+        autosave.save_now()
+        self.assertTrue(autosave.wait(5))
+        self.assertEqual((autosave.saves, autosave.failures), (0, 1))
+        self.assertIn(missing, autosave.metrics()['last_error'])
+
+        with self.assertRaises(ValueError):
+            self.engine.start_autosave(os.path.join(self.directory, "campaign.db"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import unittest
+import os
+import shutil
+import tempfile
+from src.chunked_map import ChunkedMap
+from src.map import GridType, Map
+from src.map_manager import MapManager
+from src.map_object import MapObject
+from src.token import Token
+from src.group import Group
+from src.pathfinding import find_path
+
+class TestChunkedMap(unittest.TestCase):
+
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+        self.world = ChunkedMap("world", 1000, 1000, self.store_dir, chunk_size=10)
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir)
+
+    def test_queries_only_load_touched_chunks(self):
+        print("Running test: test_queries_only_load_touched_chunks")
+        near = MapObject(x=5, y=5, layer=1)
+        far = MapObject(x=905, y=905, layer=1)
+        self.world.add_object(near)
+        self.world.add_object(far)
+        self.world.flush()
+
+        reopened = ChunkedMap("world", 1000, 1000, self.store_dir, chunk_size=10)
+        self.assertEqual(reopened.loaded_chunks, [])
+        self.assertEqual(len(reopened.objects), 2)
+
+        self.assertEqual([o.id for o in reopened.objects_in_rect(0, 0, 50, 50)], [near.id])
+        self.assertEqual(reopened.loaded_chunks, [(0, 0)])
+
+        self.assertEqual(reopened.get_object(far.id).x, 905)
+        self.assertEqual(reopened.loaded_chunks, [(0, 0), (90, 90)])
+
+    def test_moves_across_chunks(self):
+        print("Running test: test_moves_across_chunks")
+        token = Token(x=1, y=1, layer=4, entity_id="e1")
+        self.world.add_object(token)
+        self.world.move_object(token.id, 25, 1)
+        self.assertEqual(self.world.objects_at(1, 1), [])
+        self.assertEqual(self.world.top_object_at(25, 1), token)
+        self.assertEqual(self.world.chunk_key(25, 1), (2, 0))
+
+        self.world.remove_object(token.id)
+        self.assertIsNone(self.world.get_object(token.id))
+        with self.assertRaises(ValueError):
+            self.world.remove_object(token.id)
+
+    def test_large_footprint_across_chunk_border(self):
+        print("Running test: test_large_footprint_across_chunk_border")
+        statue = MapObject(x=9, y=9, layer=1, size=3)
+        self.world.add_object(statue)
+        self.assertEqual(self.world.objects_at(11, 11), [statue])
+
+        # Within a layer, objects added later are drawn on top, whichever chunk they are in
+        rug = MapObject(x=11, y=11, layer=1)
+        self.world.add_object(rug)
+        crate = MapObject(x=25, y=10, layer=1, size=2)
+        self.world.add_object(crate)
+        self.world.move_object(crate.id, 8, 10)
+        plain = Map(name="plain", width=40, height=40)
+        plain.add_objects([MapObject.from_dict(o.to_dict()) for o in (statue, rug, crate)])
+        for world in (self.world, self._reopened()):
+            for x, y in ((11, 11), (9, 10), (9, 11)):
+                self.assertEqual([o.id for o in world.objects_at(x, y)], [o.id for o in plain.objects_at(x, y)])
+            self.assertEqual(world.top_object_at(9, 11).id, crate.id)
+            self.assertEqual([o.id for o in world.iter_draw_order()], [statue.id, rug.id, crate.id])
+
+    def test_replace_objects_from_copies(self):
+        print("Running test: test_replace_objects_from_copies")
+        rug = MapObject(x=1, y=1, layer=1)
+        crate = MapObject(x=2, y=2, layer=1)
+        self.world.add_objects([rug, crate])
+
+        # Copies as a server would send them: one moved into another chunk and up a layer, one new
+        moved = MapObject.from_dict(dict(rug.to_dict(), x=25, y=1, layer=2))
+        barrel = MapObject(x=3, y=3, layer=1)
+        self.assertEqual(self.world.replace_objects([moved, barrel]), [barrel])
+        self.assertIs(self.world.get_object(rug.id), moved)
+        self.assertEqual(self.world.objects_at(1, 1), [])
+        self.assertEqual(self.world.top_object_at(25, 1), moved)
+        self.assertEqual(len(self.world.objects), 3)
+        self.assertEqual([o.id for o in self._reopened().iter_draw_order()], [crate.id, barrel.id, rug.id])
+
+    def _reopened(self):
+        self.world.flush()
+        return ChunkedMap("world", 1000, 1000, self.store_dir, chunk_size=10)
+
+    def test_lru_eviction_writes_back_changes(self):
+        print("Running test: test_lru_eviction_writes_back_changes")
+        # Each 10x10 chunk holds 100 bytes of terrain; allow roughly two of them
+        world = ChunkedMap("tiny", 100, 100, self.store_dir, chunk_size=10, memory_budget=250)
+        for i in range(5):
+            world.terrain.set_cell(i * 10, 0, cost=5)
+        self.assertLessEqual(len(world.loaded_chunks), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.store_dir, "chunks", "0_0.json")))
+
+        # Evicted chunks come back from disk with their changes
+        self.assertEqual(world.terrain.get_cost(0, 0), 5)
+        self.assertEqual(world.terrain.get_cost(40, 0), 5)
+
+    def test_evicted_chunks_are_indexed_on_disk(self):
+        print("Running test: test_evicted_chunks_are_indexed_on_disk")
+        world = ChunkedMap("tiny", 100, 100, self.store_dir, chunk_size=10, memory_budget=250)
+        crates = [MapObject(x=i * 10, y=0, layer=1) for i in range(4)]
+        for crate in crates:
+            world.add_object(crate)
+        self.assertEqual(world.loaded_chunks, [(3, 0)])
+
+        # Without a flush, as after a crash, the evicted chunks can still be found
+        reopened = ChunkedMap("tiny", 100, 100, self.store_dir, chunk_size=10)
+        for crate in crates[:3]:
+            self.assertEqual(reopened.get_object(crate.id).x, crate.x)
+        self.assertFalse(os.path.exists(os.path.join(self.store_dir, "manifest.json.tmp")))
+
+    def test_terrain_spans_chunks(self):
+        print("Running test: test_terrain_spans_chunks")
+        count = self.world.terrain.fill_rect(5, 0, 14, 3, blocks_movement=True)
+        self.assertEqual(count, 40)
+        self.assertTrue(self.world.terrain.blocks_movement(14, 3))
+        self.assertFalse(self.world.terrain.blocks_movement(15, 3))
+
+        path, cost = find_path(self.world, (0, 0), (20, 0))
+        self.assertTrue(all(not (5 <= x <= 14 and y <= 3) for x, y in path))
+
+        # Flood filling the wall reaches across the chunk border
+        self.assertEqual(self.world.terrain.flood_fill(5, 0, cost=2, blocks_movement=False), 40)
+        self.assertEqual(self.world.terrain.get_cost(14, 3), 2)
+
+    def test_group_spanning_chunks(self):
+        print("Running test: test_group_spanning_chunks")
+        left = MapObject(x=8, y=1, layer=1)
+        right = MapObject(x=12, y=1, layer=1)
+        cart = Group(x=10, y=1, layer=0, object_ids=[left.id, right.id])
+        self.world.add_objects([left, right, cart])
+
+        self.world.move_group(cart.id, 30, 1)
+        self.assertEqual((left.x, right.x), (28, 32))
+        self.assertEqual(self.world.group_bounds(cart.id), (28, 1, 32, 1))
+
+        # Memberships survive a reopen and still prune removed members
+        self.world.flush()
+        reopened = ChunkedMap("world", 1000, 1000, self.store_dir, chunk_size=10)
+        self.assertEqual(reopened.parent_group(left.id), cart.id)
+        reopened.remove_object(right.id)
+        self.assertEqual(reopened.get_object(cart.id).object_ids, [left.id])
+
+    def test_save_and_load_through_map_manager(self):
+        print("Running test: test_save_and_load_through_map_manager")
+        manager = MapManager()
+        world = manager.create_chunked_map("hexworld", 5000, 5000, self.store_dir, chunk_size=50,
+                                           grid_type=GridType.HEX)
+        obj = MapObject(x=4000, y=4000, layer=1)
+        manager.add_object_to_map("hexworld", obj)
+        world.terrain.set_cell(10, 10, blocks_light=True)
+
+        data = manager.to_dict()
+        self.assertEqual(data['maps']['hexworld']['map_type'], 'chunked')
+        self.assertNotIn('objects', data['maps']['hexworld'])
+
+        restored = MapManager()
+        restored.from_dict(data)
+        loaded = restored.get_map("hexworld")
+        self.assertIsInstance(loaded, ChunkedMap)
+        self.assertEqual(loaded.loaded_chunks, [])
+        self.assertEqual(loaded.get_object(obj.id).y, 4000)
+        self.assertTrue(loaded.terrain.blocks_light(10, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
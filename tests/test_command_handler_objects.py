@@ -0,0 +1,84 @@
+import unittest
+import io
+from contextlib import redirect_stdout
+from src.engine import Engine
+from src.cli.command_handler import CommandHandler
+from src.user import User, UserRole
+from src.token import Token
+
+class TestCommandHandlerObjects(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = Engine()
+        self.engine.current_user = User("GM", UserRole.GM)
+        self.handler = CommandHandler(self.engine)
+        self.map_manager = self.engine.get_map_manager()
+        self.map_manager.create_map("dungeon", 20, 20)
+        self.game_map = self.map_manager.get_map("dungeon")
+
+    def test_object_fill_shapes(self):
+        print("Running test: test_object_fill_shapes")
+        self.handler.handle_command("object", ["fill", "#", "dungeon", "0", "0", "4", "3", "1", "shape=outline"])
+        self.assertEqual(len(self.game_map.objects), 14)
+        self.assertIsNone(self.game_map.top_object_at(2, 2))
+
+        self.handler.handle_command("object", ["fill", ".", "dungeon", "10", "10", "12", "11", "0"])
+        self.assertEqual(len(self.game_map.objects), 14 + 6)
+
+        self.handler.handle_command("object", ["fill", "=", "dungeon", "0", "15", "5", "18", "2", "shape=line"])
+        self.assertEqual(self.game_map.top_object_at(5, 18).display_char, "=")
+
+    def test_object_clear(self):
+        print("Running test: test_object_clear")
+        self.handler.handle_command("object", ["fill", "#", "dungeon", "0", "0", "9", "9", "1"])
+        self.handler.handle_command("object", ["fill", "T", "dungeon", "0", "0", "1", "1", "4"])
+        self.handler.handle_command("object", ["clear", "dungeon", "0", "0", "4", "4", "layer=1"])
+        self.assertEqual(len(self.game_map.objects), 100 - 25 + 4)
+        self.assertEqual(self.game_map.top_object_at(0, 0).display_char, "T")
+
+    def test_fill_requires_gm(self):
+        print("Running test: test_fill_requires_gm")
+        self.engine.current_user = User("Player", UserRole.PLAYER)
+        self.handler.handle_command("object", ["fill", "#", "dungeon", "0", "0", "9", "9", "1"])
+        self.assertEqual(len(self.game_map.objects), 0)
+
+    def test_map_view_viewport(self):
+        print("Running test: test_map_view_viewport")
+        self.handler.handle_command("object", ["fill", "#", "dungeon", "0", "0", "19", "0", "1"])
+        self.handler.handle_command("object", ["place", "@", "dungeon", "11", "2", "4"])
+        self.game_map.terrain.set_cell(12, 2, cost=3)
+
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.handler.handle_command("map", ["view", "dungeon", "10", "1", "3", "2", "list=false"])
+        lines = out.getvalue().splitlines()
+        self.assertIn("Viewport: (10, 1) to (12, 2)", lines)
+        self.assertIn("  10 11 12", lines)
+        self.assertIn("1| . . .", lines)
+        self.assertIn("2| . @ ~", lines)
+        self.assertNotIn("Objects on this map (sorted by layer):", lines)
+
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.handler.handle_command("map", ["view", "dungeon", "10", "1", "3", "2"])
+        # Only objects inside the viewport are listed
+        self.assertEqual(out.getvalue().count("  - Object:"), 1)
+
+    def test_token_move_is_blocked_by_solid_objects(self):
+        print("Running test: test_token_move_is_blocked_by_solid_objects")
+        token = Token(x=0, y=5, layer=4, entity_id="e1")
+        self.game_map.add_object(token)
+        self.handler.handle_command("object", ["fill", "#", "dungeon", "3", "0", "3", "19", "1", "solid=true"])
+
+        self.handler.handle_command("object", ["move", token.id, "dungeon", "3", "5"])
+        self.assertEqual((token.x, token.y), (0, 5))
+        self.handler.handle_command("object", ["move", token.id, "dungeon", "2", "5"])
+        self.assertEqual((token.x, token.y), (2, 5))
+
+        # The GM can force a token through
+        self.handler.handle_command("object", ["move", token.id, "dungeon", "3", "5", "force=true"])
+        self.assertEqual((token.x, token.y), (3, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
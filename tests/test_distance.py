@@ -0,0 +1,74 @@
+import unittest
+from src.distance import DistanceRule, distance_matrix
+from src.hex import OffsetCoord, roffset_to_cube, hex_distance
+from src.map import Map, GridType
+from src.map_object import MapObject
+from src.token import Token
+
+
+class TestDistanceMatrix(unittest.TestCase):
+
+    def setUp(self):
+        self.game_map = Map(name="arena", width=30, height=30)
+        self.a = Token(x=0, y=0, layer=4, entity_id="a")
+        self.b = Token(x=3, y=5, layer=4, entity_id="b")
+        self.ogre = Token(x=10, y=10, layer=4, entity_id="ogre", size=2)
+        self.c = Token(x=12, y=11, layer=4, entity_id="c")
+        self.game_map.add_objects([self.a, self.b, self.ogre, self.c, MapObject(x=1, y=1, layer=1)])
+
+    def test_square_rules(self):
+        print("Running test: test_square_rules")
+        chebyshev = self.game_map.token_distances()
+        self.assertEqual(chebyshev.ids, [self.a.id, self.b.id, self.ogre.id, self.c.id])
+        self.assertEqual(chebyshev.distance(self.a.id, self.b.id), 5)
+        self.assertEqual(chebyshev.distance(self.b.id, self.a.id), 5)
+        self.assertEqual(chebyshev.distance(self.a.id, self.a.id), 0)
+
+        # 5 steps, 3 of them diagonal: the second diagonal costs double
+        alternating = self.game_map.token_distances(DistanceRule.ALTERNATING)
+        self.assertEqual(alternating.distance(self.a.id, self.b.id), 6)
+        euclidean = self.game_map.token_distances(DistanceRule.EUCLIDEAN)
+        self.assertAlmostEqual(euclidean.distance(self.a.id, self.b.id), 34 ** 0.5)
+
+    def test_large_tokens_measure_from_nearest_cell(self):
+        print("Running test: test_large_tokens_measure_from_nearest_cell")
+        distances = self.game_map.token_distances()
+        # The ogre covers (10, 10)-(11, 11), so (12, 11) is adjacent
+        self.assertEqual(distances.distance(self.ogre.id, self.c.id), 1)
+        self.assertEqual(distances.distance(self.a.id, self.ogre.id), 10)
+        self.assertEqual(distances.within(self.ogre.id, 1), [self.c.id])
+        self.assertEqual(distances.within(self.c.id, 10), [self.ogre.id, self.b.id])
+
+    def test_cached_until_map_changes(self):
+        print("Running test: test_cached_until_map_changes")
+        first = self.game_map.token_distances()
+        self.assertIs(self.game_map.token_distances(), first)
+        with self.assertRaises(ValueError):
+            first.matrix[0, 1] = 99
+
+        self.game_map.move_object(self.b.id, 0, 1)
+        second = self.game_map.token_distances()
+        self.assertIsNot(second, first)
+        self.assertEqual(second.distance(self.a.id, self.b.id), 1)
+
+    def test_hex_distances_match_hex_module(self):
+        print("Running test: test_hex_distances_match_hex_module")
+        game_map = Map(name="hexes", width=12, height=12, grid_type=GridType.HEX)
+        tokens = [Token(x=x, y=y, layer=4, entity_id=f"t{x}{y}") for x, y in [(0, 0), (5, 3), (2, 7), (11, 11), (4, 4)]]
+        game_map.add_objects(tokens)
+
+        distances = game_map.token_distances(DistanceRule.EUCLIDEAN)
+        for t1 in tokens:
+            for t2 in tokens:
+                expected = hex_distance(roffset_to_cube(OffsetCoord(t1.x, t1.y)), roffset_to_cube(OffsetCoord(t2.x, t2.y)))
+                self.assertEqual(distances.distance(t1.id, t2.id), expected)
+
+    def test_empty_map(self):
+        print("Running test: test_empty_map")
+        distances = distance_matrix(Map(name="empty", width=5, height=5))
+        self.assertEqual(len(distances), 0)
+        self.assertEqual(distances.matrix.shape, (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
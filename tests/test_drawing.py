@@ -1,7 +1,7 @@
 import unittest
 from src.map import Map
 from src.shape import Shape, ShapeType
-from src.path import Path
+from src.path import Path, PointArray, simplify_points
 from src.group import Group
 from src.map_manager import MapManager
 
@@ -50,6 +50,31 @@ class TestDrawing(unittest.TestCase):
         self.assertEqual(new_path.points, points)
         self.assertEqual(new_path.stroke_width, 3)
 
+    def test_path_points_are_packed(self):
+        """Tests the compact storage and delta encoding of path points."""
+        print("Running test: test_path_points_are_packed")
+        points = [(x, (x * 7) % 5 - 2) for x in range(-50, 500)]
+        path = Path(x=0, y=0, layer=1, points=points)
+        self.assertIsInstance(path.points, PointArray)
+        self.assertEqual(path.points[-1], (499, 1))
+
+        data = path.to_dict()
+        self.assertIsInstance(data['points'], dict)
+        self.assertEqual(Path.from_dict(data).points, points)
+
+        # Saves from before packing still load
+        data['points'] = [list(p) for p in points[:3]]
+        self.assertEqual(Path.from_dict(data).points, points[:3])
+
+    def test_path_simplification(self):
+        """Tests Douglas-Peucker simplification when a path is created."""
+        print("Running test: test_path_simplification")
+        wobbly = [(x, 10 + (x % 2)) for x in range(0, 41)] + [(40, 30)]
+        path = Path(x=0, y=10, layer=1, points=wobbly, simplify_tolerance=1.5)
+        self.assertEqual(path.points, [(0, 10), (40, 10), (40, 30)])
+        # A tolerance below the wobble keeps it
+        self.assertEqual(len(simplify_points(wobbly, 0.4)), len(wobbly))
+
     def test_group_serialization(self):
         """Tests that a Group object can be serialized and deserialized correctly."""
         print("Running test: test_group_serialization")
@@ -0,0 +1,77 @@
+import unittest
+import copy
+import io
+import json
+from contextlib import redirect_stdout
+from src.engine import Engine
+from src.fragments import Fragment, encode
+from src.group import Group
+from src.map_object import MapObject
+from src.path import Path
+
+
+class TestFragments(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = Engine()
+        self.hero = self.engine.get_entity_manager().create_entity("character", {"name": "Hero", "hp": 20})
+        with redirect_stdout(io.StringIO()):
+            self.map = self.engine.get_map_manager().create_map("town", 20, 20)
+        self.wall = MapObject(x=1, y=1, layer=1)
+        self.door = MapObject(x=2, y=1, layer=1)
+        self.group = Group(x=0, y=0, layer=1, object_ids=[self.wall.id])
+        self.path = Path(x=0, y=0, layer=2, points=[(0, 0), (3, 4)])
+        self.map.add_objects([self.wall, self.door, self.group, self.path])
+
+    def test_fragments_are_reused_until_changed(self):
+        print("Running test: test_fragments_are_reused_until_changed")
+        fragment = self.wall.to_fragment()
+        self.assertIsInstance(fragment, Fragment)
+        self.assertEqual(fragment, self.wall.to_dict())
+        self.assertIs(self.wall.to_fragment(), fragment)
+
+        self.map.move_object(self.wall.id, 5, 5)
+        moved = self.wall.to_fragment()
+        self.assertIsNot(moved, fragment)
+        self.assertEqual((fragment['x'], moved['x']), (1, 5))
+
+        for change in (lambda: self.map.add_to_group(self.group.id, [self.door.id]),
+                       lambda: self.map.remove_from_group(self.group.id, [self.wall.id]),
+                       lambda: setattr(self.path, 'points', [(1, 1)])):
+            before = {o.id: o.to_fragment() for o in (self.group, self.path)}
+            change()
+            after = {o.id: o.to_fragment() for o in (self.group, self.path)}
+            self.assertNotEqual(before, after)
+            for obj in (self.group, self.path):
+                self.assertEqual(obj.to_fragment(), obj.to_dict())
+
+    def test_entity_fragments_follow_attribute_changes(self):
+        print("Running test: test_entity_fragments_follow_attribute_changes")
+        em = self.engine.get_entity_manager()
+        fragment = self.hero.to_fragment()
+        self.assertIs(self.hero.to_fragment(), fragment)
+
+        em.update_attribute(self.hero.id, "hp", 12)
+        self.assertEqual(self.hero.to_fragment()['attributes']['hp'], 12)
+        self.hero.attributes.update(ac=15)
+        self.assertEqual(self.hero.to_fragment()['attributes']['ac'], 15)
+        del self.hero.attributes['ac']
+        self.assertNotIn('ac', self.hero.to_fragment()['attributes'])
+        # The first fragment still describes the entity as it was
+        self.assertEqual(fragment['attributes'], {"name": "Hero", "hp": 20})
+
+    def test_encode_matches_json(self):
+        print("Running test: test_encode_matches_json")
+        state = self.engine.get_persistence_manager().gather_game_state(self.engine)
+        state['extra'] = {1: [True, None, 1.5, "é"]}
+        self.assertEqual(encode(state), json.dumps(state, separators=(',', ':')))
+        self.assertEqual(json.loads(encode(state)), json.loads(json.dumps(state)))
+
+        # A copied object, as map instances make, keeps a valid fragment
+        clone = copy.deepcopy(self.wall)
+        self.assertEqual(clone.to_fragment(), self.wall.to_fragment())
+        self.assertEqual(clone.to_fragment().json, self.wall.to_fragment().json)
+
+
+if __name__ == '__main__':
+    unittest.main()
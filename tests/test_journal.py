@@ -0,0 +1,154 @@
+import unittest
+import io
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+from src.engine import Engine
+from src.journal import CommandJournal
+from src.user import User, UserRole
+
+SESSION = [
+    "create char Hero str=16 hp=20",
+    "create char Goblin hp=7",
+    "map create dungeon 10 10",
+    "token place Hero dungeon 1 1",
+    "token place Goblin dungeon 4 4",
+    "add Hero",
+    "add Goblin",
+    "init",
+    "attack Goblin with Hero",
+    "status",
+]
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.gm = User("GM", UserRole.GM)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _start(self, **journal_options):
+        engine = Engine()
+        with redirect_stdout(io.StringIO()):
+            engine.load_system_module("dnd5e")
+            engine.open_journal(self.directory, **journal_options)
+        return engine
+
+    def _run(self, engine, commands):
+        with redirect_stdout(io.StringIO()):
+            for command in commands:
+                engine.execute_command(command, self.gm)
+
+    def _state(self, engine):
+        return engine.get_persistence_manager().gather_game_state(engine)
+
+    def test_recovery_replays_rolls_and_ids(self):
+        print("Running test: test_recovery_replays_rolls_and_ids")
+        crashed = self._start(batch_size=1)
+        self._run(crashed, SESSION)
+        # Read-only commands are not journaled
+        self.assertEqual(len(crashed.journal.read_entries()), len(SESSION) - 1)
+
+        recovered = Engine()
+        with redirect_stdout(io.StringIO()):
+            replayed = recovered.open_journal(self.directory)
+        self.assertEqual(replayed, len(SESSION) - 1)
+        self.assertEqual(self._state(recovered), self._state(crashed))
+        # Recovery folds the journal into a new snapshot
+        self.assertEqual(recovered.journal.read_entries(), [])
+
+    def test_entries_are_written_in_batches(self):
+        print("Running test: test_entries_are_written_in_batches")
+        engine = self._start(batch_size=3, max_delay=60)
+        self._run(engine, SESSION[:2])
+        self.assertEqual(engine.journal.pending, 2)
+        self.assertEqual(engine.journal.read_entries(), [])
+        self._run(engine, SESSION[2:3])
+        self.assertEqual(engine.journal.pending, 0)
+        self.assertEqual([e['command'] for e in engine.journal.read_entries()], SESSION[:3])
+        self.assertEqual(engine.journal.read_entries()[0]['user']['role'], 'GM')
+
+    def test_idle_entries_are_written_after_max_delay(self):
+        print("Running test: test_idle_entries_are_written_after_max_delay")
+        engine = self._start(batch_size=16, max_delay=0.05)
+        self._run(engine, SESSION[:2])
+        self.assertFalse(engine.tick_journal())
+        self.assertEqual(engine.journal.pending, 2)
+
+        # No further command comes; the tick alone writes the burst once it is overdue
+        time.sleep(0.06)
+        self.assertTrue(engine.tick_journal())
+        self.assertEqual(engine.journal.pending, 0)
+        self.assertEqual([e['command'] for e in CommandJournal(self.directory).read_entries()], SESSION[:2])
+        self.assertFalse(engine.tick_journal())
+
+    def test_replay_reports_commands_that_fail_again(self):
+        print("Running test: test_replay_reports_commands_that_fail_again")
+        crashed = self._start(batch_size=1)
+        alice = User("Alice")
+        with redirect_stdout(io.StringIO()):
+            crashed.get_user_manager().add_user(alice)
+        self._run(crashed, ["create char Hero hp=20", "map create dungeon 10 10",
+                            "token place Hero dungeon 1 1 owner=Alice", "attack Nobody with Hero"])
+        with redirect_stdout(io.StringIO()):
+            crashed.get_user_manager().remove_user(alice.id)
+        # An entry that succeeded when it was journaled but cannot be replayed
+        crashed.journal.append("object move missing dungeon 2 2", self.gm.to_dict())
+        entries = crashed.journal.read_entries()
+        self.assertEqual([e['ok'] for e in entries], [True, True, True, False, True])
+        self.assertEqual([u['username'] for u in entries[0]['users']], ["Alice"])
+        self.assertNotIn('users', entries[1])
+
+        recovered = Engine()
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(recovered.open_journal(self.directory), 5)
+        # Alice had left, but the token is still hers; the attack failed the first time too
+        token = recovered.get_map_manager().get_map("dungeon").objects_at(1, 1)[0]
+        self.assertEqual(token.owner_id, alice.id)
+        self.assertEqual(recovered.get_user_manager().list_users(), [])
+        self.assertNotIn("attack", output.getvalue())
+        self.assertIn("Warning: Replaying journal entry 5 ('object move missing dungeon 2 2') failed: "
+                      "Error: Object with ID 'missing' not found on map 'dungeon'.", output.getvalue())
+        self.assertIn("replayed 5 commands after the last snapshot (1 failed).", output.getvalue())
+
+    def test_periodic_snapshot_truncates_journal(self):
+        print("Running test: test_periodic_snapshot_truncates_journal")
+        engine = self._start(batch_size=1, snapshot_interval=4)
+        self._run(engine, SESSION[:6])
+        self.assertEqual([e['command'] for e in engine.journal.read_entries()], SESSION[4:6])
+
+        state, seq = engine.journal.load_snapshot()
+        self.assertEqual(seq, 4)
+        self.assertEqual(len(state['entity_manager']['entities']), 2)
+
+        recovered = Engine()
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(recovered.open_journal(self.directory), 2)
+        self.assertEqual(self._state(recovered), self._state(engine))
+
+    def test_torn_and_stale_entries_are_skipped(self):
+        print("Running test: test_torn_and_stale_entries_are_skipped")
+        journal = CommandJournal(self.directory, batch_size=1)
+        journal.append("create char Hero hp=20")
+        journal.write_snapshot({})
+        # A crash after the snapshot but before the journal was emptied leaves old entries behind
+        with open(journal.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"seq": 1, "command": "create char Stale", "user": null, "rolls": [], "ids": []}\n')
+        journal.append("create char Goblin hp=7")
+        with open(journal.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"seq": 3, "comm')
+
+        with redirect_stdout(io.StringIO()):
+            reopened = CommandJournal(self.directory)
+            entries = reopened.read_entries(after_seq=1)
+        self.assertEqual(reopened.seq, 2)
+        self.assertEqual([e['command'] for e in entries], ["create char Goblin hp=7"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,246 @@
+import unittest
+from src.map import Map, GridType
+from src.map_object import MapObject
+from src.token import Token
+from src.group import Group
+from src.occupancy import MoveConflict
+
+class TestMap(unittest.TestCase):
+
+    def setUp(self):
+        self.game_map = Map(name="test_map", width=20, height=20)
+
+    def test_objects_keep_insertion_order(self):
+        print("Running test: test_objects_keep_insertion_order")
+        objs = [MapObject(x=i, y=0, layer=1) for i in range(5)]
+        for obj in objs:
+            self.game_map.add_object(obj)
+
+        self.assertEqual(len(self.game_map.objects), 5)
+        self.assertEqual(list(self.game_map.objects), objs)
+        self.assertEqual(self.game_map.objects[0], objs[0])
+        self.assertEqual(self.game_map.objects[-1], objs[-1])
+        self.assertEqual(list(reversed(self.game_map.objects)), objs[::-1])
+
+    def test_add_get_remove_by_id(self):
+        print("Running test: test_add_get_remove_by_id")
+        obj = MapObject(x=1, y=2, layer=1)
+        self.game_map.add_object(obj)
+        # Adding the same ID twice is ignored
+        self.game_map.add_object(obj)
+        self.assertEqual(len(self.game_map.objects), 1)
+        self.assertIs(self.game_map.get_object(obj.id), obj)
+
+        self.game_map.remove_object(obj.id)
+        self.assertIsNone(self.game_map.get_object(obj.id))
+        with self.assertRaises(ValueError):
+            self.game_map.remove_object(obj.id)
+
+    def test_move_object(self):
+        print("Running test: test_move_object")
+        token = Token(x=1, y=1, layer=4, entity_id="e1")
+        self.game_map.add_object(token)
+        self.game_map.move_object(token.id, 5, 6)
+        self.assertEqual((token.x, token.y), (5, 6))
+        with self.assertRaises(ValueError):
+            self.game_map.move_object("missing", 0, 0)
+
+    def test_constructor_objects_are_indexed(self):
+        print("Running test: test_constructor_objects_are_indexed")
+        obj = MapObject(x=0, y=0, layer=0)
+        game_map = Map(name="m", width=5, height=5, objects=[obj])
+        self.assertIs(game_map.get_object(obj.id), obj)
+        self.assertEqual(Map.from_dict(game_map.to_dict()).get_object(obj.id).id, obj.id)
+
+    def test_objects_at_honors_footprint_and_layer(self):
+        print("Running test: test_objects_at_honors_footprint_and_layer")
+        floor = MapObject(x=2, y=2, layer=0, size=3)
+        token = Token(x=3, y=3, layer=4, entity_id="e1")
+        rug = MapObject(x=3, y=3, layer=1)
+        for obj in (token, floor, rug):
+            self.game_map.add_object(obj)
+
+        # Bottom to top, regardless of insertion order
+        self.assertEqual(self.game_map.objects_at(3, 3), [floor, rug, token])
+        self.assertEqual(self.game_map.objects_at(4, 4), [floor])
+        self.assertEqual(self.game_map.objects_at(5, 5), [])
+
+    def test_index_follows_moves_and_removals(self):
+        print("Running test: test_index_follows_moves_and_removals")
+        obj = MapObject(x=1, y=1, layer=1, size=2)
+        self.game_map.add_object(obj)
+        self.game_map.move_object(obj.id, 10, 10)
+        self.assertEqual(self.game_map.objects_at(1, 1), [])
+        self.assertEqual(self.game_map.objects_at(11, 11), [obj])
+
+        self.game_map.remove_object(obj.id)
+        self.assertEqual(self.game_map.objects_at(10, 10), [])
+
+    def test_rect_and_radius_queries(self):
+        print("Running test: test_rect_and_radius_queries")
+        near = MapObject(x=5, y=5, layer=2)
+        diagonal = MapObject(x=7, y=7, layer=1)
+        far = MapObject(x=15, y=5, layer=1)
+        for obj in (near, diagonal, far):
+            self.game_map.add_object(obj)
+
+        self.assertEqual(self.game_map.objects_in_rect(0, 0, 10, 10), [diagonal, near])
+        self.assertEqual(self.game_map.objects_in_rect(16, 0, 19, 19), [])
+        # (7, 7) is about 2.8 cells away from (5, 5)
+        self.assertEqual(self.game_map.objects_in_radius(5, 5, 2), [near])
+        self.assertEqual(self.game_map.objects_in_radius(5, 5, 3), [diagonal, near])
+
+    def test_hex_radius_query(self):
+        print("Running test: test_hex_radius_query")
+        game_map = Map(name="hexes", width=10, height=10, grid_type=GridType.HEX)
+        obj = MapObject(x=4, y=0, layer=1)
+        game_map.add_object(obj)
+        self.assertEqual(game_map.objects_in_radius(0, 0, 3), [])
+        self.assertEqual(game_map.objects_in_radius(0, 0, 4), [obj])
+
+    def test_draw_order_is_maintained_incrementally(self):
+        print("Running test: test_draw_order_is_maintained_incrementally")
+        token = Token(x=0, y=0, layer=4, entity_id="e1")
+        wall = MapObject(x=0, y=0, layer=1)
+        floor = MapObject(x=0, y=0, layer=0)
+        door = MapObject(x=1, y=0, layer=1)
+        for obj in (token, wall, floor, door):
+            self.game_map.add_object(obj)
+
+        self.assertEqual(list(self.game_map.iter_draw_order()), [floor, wall, door, token])
+        self.assertIs(self.game_map.top_object_at(0, 0), token)
+        self.assertIsNone(self.game_map.top_object_at(5, 5))
+
+        # Re-layering places the object above everything already on its new layer
+        self.game_map.set_object_layer(floor.id, 1)
+        self.assertEqual(floor.layer, 1)
+        self.assertEqual(list(self.game_map.iter_draw_order()), [wall, door, floor, token])
+
+        self.game_map.remove_object(token.id)
+        self.assertIs(self.game_map.top_object_at(0, 0), floor)
+        self.assertEqual(list(self.game_map.iter_draw_order()), [wall, door, floor])
+
+    def test_layer_changes_after_insertion_keep_draw_order(self):
+        print("Running test: test_layer_changes_after_insertion_keep_draw_order")
+        rug = MapObject(x=0, y=0, layer=1)
+        wall = MapObject(x=0, y=0, layer=2)
+        door = MapObject(x=0, y=0, layer=3)
+        self.game_map.add_objects([rug, wall, door])
+
+        # Through the map's generic property setter
+        self.game_map.set_object_property(rug.id, 'layer', 3)
+        self.assertEqual(list(self.game_map.iter_draw_order()), [wall, door, rug])
+
+        # Assigned directly on the object, bypassing the map
+        wall.layer = 5
+        self.assertIs(self.game_map.top_object_at(0, 0), wall)
+        self.assertEqual(self.game_map.objects_at(0, 0), [door, rug, wall])
+        door.layer = 0
+        self.assertEqual(list(self.game_map.iter_draw_order()), [door, rug, wall])
+
+    def test_bulk_add_and_remove(self):
+        print("Running test: test_bulk_add_and_remove")
+        walls = [MapObject(x=x, y=0, layer=1, display_char='#') for x in range(10)]
+        added = self.game_map.add_objects(walls + walls[:2])
+        self.assertEqual(added, walls)
+        self.assertEqual(len(self.game_map.objects), 10)
+        self.assertEqual(self.game_map.objects_at(9, 0), [walls[9]])
+
+        removed = self.game_map.remove_objects([w.id for w in walls[:5]] + ["missing"])
+        self.assertEqual(removed, walls[:5])
+        self.assertEqual(self.game_map.objects_at(0, 0), [])
+        self.assertEqual(list(self.game_map.iter_draw_order()), walls[5:])
+
+    def _formation(self):
+        soldiers = [Token(x=2 + i, y=3, layer=4, entity_id=f"s{i}") for i in range(3)]
+        squad = Group(x=2, y=3, layer=0, object_ids=[s.id for s in soldiers])
+        banner = MapObject(x=1, y=1, layer=1, size=2)
+        army = Group(x=1, y=1, layer=0, object_ids=[squad.id, banner.id])
+        self.game_map.add_objects(soldiers + [squad, banner, army])
+        return soldiers, squad, banner, army
+
+    def test_nested_group_move_and_bounds(self):
+        print("Running test: test_nested_group_move_and_bounds")
+        soldiers, squad, banner, army = self._formation()
+        self.assertEqual(self.game_map.parent_group(soldiers[0].id), squad.id)
+        self.assertEqual(self.game_map.parent_group(squad.id), army.id)
+        self.assertEqual(self.game_map.group_bounds(army.id), (1, 1, 4, 3))
+
+        moved = self.game_map.move_group(army.id, 6, 11)
+        self.assertEqual(len(moved), 6)
+        self.assertEqual([(s.x, s.y) for s in soldiers], [(7, 13), (8, 13), (9, 13)])
+        self.assertEqual((banner.x, banner.y), (6, 11))
+        self.assertEqual(self.game_map.objects_at(9, 13), [soldiers[2]])
+        self.assertEqual(self.game_map.group_bounds(army.id), (6, 11, 9, 13))
+        self.assertEqual(self.game_map.group_bounds(squad.id), (7, 13, 9, 13))
+
+        # Moving one member refreshes the cached boxes of every group above it
+        self.game_map.move_object(soldiers[2].id, 15, 15)
+        self.assertEqual(self.game_map.group_bounds(army.id), (6, 11, 15, 15))
+
+    def test_group_cycles_are_rejected(self):
+        print("Running test: test_group_cycles_are_rejected")
+        soldiers, squad, banner, army = self._formation()
+        with self.assertRaises(ValueError):
+            self.game_map.add_to_group(squad.id, [army.id])
+        with self.assertRaises(ValueError):
+            self.game_map.add_to_group(squad.id, [squad.id])
+        # An object belongs to one group at most
+        with self.assertRaises(ValueError):
+            self.game_map.add_object(Group(x=0, y=0, layer=0, object_ids=[banner.id]))
+
+        loop_a = Group(x=0, y=0, layer=0, id="a", object_ids=["b"])
+        loop_b = Group(x=0, y=0, layer=0, id="b", object_ids=["a"])
+        with self.assertRaises(ValueError):
+            self.game_map.add_objects([loop_a, loop_b])
+        self.assertNotIn("a", self.game_map.objects)
+
+    def test_group_move_is_all_or_nothing(self):
+        print("Running test: test_group_move_is_all_or_nothing")
+        soldiers, squad, banner, army = self._formation()
+        squad.object_ids.append("deserter")
+        with self.assertRaises(ValueError):
+            self.game_map.move_group(army.id, 10, 10)
+        self.assertEqual((banner.x, banner.y), (1, 1))
+        self.assertEqual([(s.x, s.y) for s in soldiers], [(2, 3), (3, 3), (4, 3)])
+
+    def test_removing_a_member_leaves_no_dangling_id(self):
+        print("Running test: test_removing_a_member_leaves_no_dangling_id")
+        soldiers, squad, banner, army = self._formation()
+        self.game_map.remove_object(soldiers[0].id)
+        self.assertEqual(squad.object_ids, [soldiers[1].id, soldiers[2].id])
+        self.assertEqual(self.game_map.group_bounds(squad.id), (3, 3, 4, 3))
+
+        # Removing a group leaves its members on the map, ungrouped
+        self.game_map.remove_object(squad.id)
+        self.assertEqual(army.object_ids, [banner.id])
+        self.assertIsNone(self.game_map.parent_group(soldiers[1].id))
+        self.game_map.move_group(army.id, 0, 0)
+        self.assertEqual((soldiers[1].x, soldiers[1].y), (3, 3))
+
+    def test_check_move_reports_conflicts(self):
+        print("Running test: test_check_move_reports_conflicts")
+        ogre = Token(x=2, y=2, layer=4, entity_id="ogre", size=2)
+        goblin = Token(x=6, y=2, layer=4, entity_id="goblin")
+        pillar = MapObject(x=2, y=6, layer=1, blocks_movement=True)
+        rug = MapObject(x=6, y=6, layer=1, size=3)
+        self.game_map.add_objects([ogre, goblin, pillar, rug])
+        self.game_map.terrain.set_cell(10, 3, blocks_movement=True)
+
+        # Rugs do not block, and a token never collides with itself
+        self.assertEqual(self.game_map.check_move(ogre.id, 6, 6), [])
+        self.assertEqual(self.game_map.check_move(ogre.id, 3, 2), [])
+        self.assertEqual(self.game_map.check_move(ogre.id, 5, 1), [MoveConflict('token', (6, 2), goblin.id)])
+        self.assertEqual(self.game_map.check_move(ogre.id, 1, 5), [MoveConflict('object', (2, 6), pillar.id)])
+        self.assertEqual(self.game_map.check_move(ogre.id, 9, 2), [MoveConflict('terrain', (10, 3))])
+        self.assertEqual([c.reason for c in self.game_map.check_move(ogre.id, 19, 0)], ['bounds', 'bounds'])
+
+        # The index follows moves and blocking changes
+        self.game_map.move_object(goblin.id, 15, 15)
+        self.assertEqual(self.game_map.check_move(ogre.id, 5, 1), [])
+        self.game_map.set_object_property(pillar.id, 'blocks_movement', False)
+        self.assertEqual(self.game_map.occupants_at(2, 6), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import shutil
+import tempfile
+from src.map import Map
+from src.map_object import MapObject
+from src.token import Token
+from src.group import Group
+from src.chunked_map import ChunkedMap
+from src.map_events import (
+    ObjectMove, ObjectsAdded, ObjectsRemoved, ObjectsMoved, PropertyChanged, TerrainChanged
+)
+
+class TestMapEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.game_map = Map(name="events", width=20, height=20)
+        self.events = []
+        self.unsubscribe = self.game_map.subscribe(self.events.append)
+
+    def test_object_events_and_version(self):
+        print("Running test: test_object_events_and_version")
+        token = Token(x=1, y=1, layer=4, entity_id="e1")
+        self.game_map.add_object(token)
+        self.game_map.move_object(token.id, 3, 4)
+        self.game_map.set_object_layer(token.id, 2)
+        self.game_map.remove_object(token.id)
+
+        self.assertEqual([type(e) for e in self.events],
+                         [ObjectsAdded, ObjectsMoved, PropertyChanged, ObjectsRemoved])
+        self.assertEqual(self.events[1].moves, (ObjectMove(token.id, (1, 1), (3, 4)),))
+        self.assertEqual((self.events[2].name, self.events[2].before, self.events[2].after), ('layer', 4, 2))
+        self.assertEqual([e.version for e in self.events], [1, 2, 3, 4])
+        self.assertEqual(self.game_map.version, 4)
+
+    def test_batches_emit_one_event(self):
+        print("Running test: test_batches_emit_one_event")
+        soldiers = [Token(x=i, y=0, layer=4, entity_id=f"s{i}") for i in range(30)]
+        squad = Group(x=0, y=0, layer=0, object_ids=[s.id for s in soldiers])
+        self.game_map.add_objects(soldiers + [squad])
+        self.game_map.move_group(squad.id, 0, 5)
+        self.game_map.remove_objects([s.id for s in soldiers[:10]])
+
+        added, moved = self.events[0], self.events[1]
+        self.assertEqual(len(added.objects), 31)
+        self.assertEqual(len(moved.moves), 31)
+        self.assertEqual(moved.moves[-1].after, (29, 5))
+        # Each removed member also drops out of the squad before the batch is reported
+        self.assertEqual(sum(isinstance(e, PropertyChanged) for e in self.events), 10)
+        self.assertIsInstance(self.events[-1], ObjectsRemoved)
+        self.assertEqual(len(self.events[-1].objects), 10)
+
+    def test_set_object_property(self):
+        print("Running test: test_set_object_property")
+        statue = MapObject(x=2, y=2, layer=1)
+        self.game_map.add_object(statue)
+        self.game_map.set_object_property(statue.id, 'size', 2)
+        self.assertEqual(self.game_map.objects_at(3, 3), [statue])
+        self.assertEqual(self.events[-1], PropertyChanged("events", 2, statue.id, 'size', 1, 2))
+
+        with self.assertRaises(ValueError):
+            self.game_map.set_object_property(statue.id, 'x', 5)
+        with self.assertRaises(ValueError):
+            self.game_map.set_object_property(statue.id, 'no_such_thing', 5)
+
+    def test_terrain_events_and_unsubscribe(self):
+        print("Running test: test_terrain_events_and_unsubscribe")
+        self.game_map.terrain.fill_rect(-5, 2, 4, 3, cost=3)
+        self.assertEqual(self.events[-1].region, (0, 2, 4, 3))
+        self.assertIsInstance(self.events[-1], TerrainChanged)
+
+        self.unsubscribe()
+        self.game_map.terrain.set_cell(0, 0, blocks_light=True)
+        self.assertEqual(len(self.events), 1)
+        self.assertEqual(self.game_map.version, 2)
+
+    def test_chunked_map_events(self):
+        print("Running test: test_chunked_map_events")
+        store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store_dir)
+        world = ChunkedMap("world", 100, 100, store_dir, chunk_size=10)
+        events = []
+        world.subscribe(events.append)
+
+        obj = MapObject(x=5, y=5, layer=1)
+        world.add_object(obj)
+        world.move_object(obj.id, 25, 5)
+        world.terrain.fill_rect(8, 0, 12, 0, cost=2)
+
+        self.assertEqual([type(e) for e in events], [ObjectsAdded, ObjectsMoved, TerrainChanged])
+        self.assertEqual(events[1].moves[0].before, (5, 5))
+        self.assertEqual(events[2].region, (8, 0, 12, 0))
+        self.assertEqual(world.version, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from src.map_manager import MapManager
+from src.map_instance import MapInstance
+from src.map_object import MapObject
+from src.token import Token
+from src.group import Group
+
+class TestMapInstance(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = MapManager()
+        self.template = self.manager.create_map("crypt", 30, 30)
+        self.statue = MapObject(x=5, y=5, layer=1, display_char='S')
+        self.door = MapObject(x=9, y=2, layer=1, display_char='D')
+        self.manager.add_objects("crypt", [self.statue, self.door])
+        self.template.terrain.fill_rect(0, 0, 29, 0, blocks_movement=True)
+        self.instance = self.manager.create_instance("crypt", "crypt_tuesday")
+
+    def test_instance_shares_until_changed(self):
+        print("Running test: test_instance_shares_until_changed")
+        self.assertIsInstance(self.instance, MapInstance)
+        self.assertIs(self.instance.get_object(self.statue.id), self.statue)
+        self.assertEqual(self.instance.shared_count, 2)
+
+        self.instance.move_object(self.statue.id, 6, 6)
+        moved = self.instance.get_object(self.statue.id)
+        self.assertIsNot(moved, self.statue)
+        self.assertEqual((self.statue.x, self.statue.y), (5, 5))
+        self.assertEqual(self.instance.objects_at(6, 6), [moved])
+        self.assertEqual(self.template.objects_at(5, 5), [self.statue])
+        self.assertEqual(self.instance.shared_count, 1)
+
+        self.instance.remove_object(self.door.id)
+        self.assertIs(self.template.get_object(self.door.id), self.door)
+
+        # Terrain is shared until the instance changes it
+        self.assertTrue(self.instance.terrain.is_shared)
+        self.instance.terrain.set_cell(3, 0, blocks_movement=False)
+        self.assertFalse(self.instance.terrain.blocks_movement(3, 0))
+        self.assertTrue(self.template.terrain.blocks_movement(3, 0))
+
+    def test_template_is_locked_while_instances_exist(self):
+        print("Running test: test_template_is_locked_while_instances_exist")
+        with self.assertRaises(ValueError):
+            self.template.move_object(self.statue.id, 1, 1)
+        with self.assertRaises(ValueError):
+            self.template.add_object(MapObject(x=0, y=0, layer=0))
+        with self.assertRaises(ValueError):
+            self.template.terrain.set_cell(0, 0, cost=3)
+        with self.assertRaises(ValueError):
+            self.manager.delete_map("crypt")
+
+        self.manager.delete_map("crypt_tuesday")
+        self.template.move_object(self.statue.id, 1, 1)
+        self.assertEqual((self.statue.x, self.statue.y), (1, 1))
+
+    def test_group_moves_copy_the_whole_subtree(self):
+        print("Running test: test_group_moves_copy_the_whole_subtree")
+        self.manager.delete_map("crypt_tuesday")
+        altar = Group(x=5, y=5, layer=0, object_ids=[self.statue.id, self.door.id])
+        self.template.add_object(altar)
+        instance = self.manager.create_instance("crypt", "crypt_friday")
+
+        instance.move_group(altar.id, 10, 10)
+        self.assertEqual((self.statue.x, self.door.x), (5, 9))
+        self.assertEqual(instance.get_object(self.door.id).x, 14)
+        self.assertEqual(instance.shared_count, 0)
+
+    def test_save_stores_only_overrides(self):
+        print("Running test: test_save_stores_only_overrides")
+        self.instance.move_object(self.statue.id, 6, 6)
+        self.instance.remove_object(self.door.id)
+        goblin = Token(x=2, y=2, layer=4, entity_id="g1")
+        self.instance.add_object(goblin)
+
+        data = self.manager.to_dict()
+        saved = data['maps']['crypt_tuesday']
+        self.assertEqual(saved['template'], "crypt")
+        self.assertEqual(saved['removed'], [self.door.id])
+        self.assertEqual({o['id'] for o in saved['objects']}, {self.statue.id, goblin.id})
+        self.assertNotIn('terrain', saved)
+
+        restored = MapManager()
+        restored.from_dict(data)
+        instance = restored.get_map("crypt_tuesday")
+        template = restored.get_map("crypt")
+        self.assertEqual(instance.get_object(self.statue.id).x, 6)
+        self.assertIsNone(instance.get_object(self.door.id))
+        self.assertEqual(instance.get_object(goblin.id).entity_id, "g1")
+        self.assertEqual(template.get_object(self.statue.id).x, 5)
+        self.assertTrue(instance.terrain.blocks_movement(3, 0))
+        self.assertEqual(template.locked_by, ["crypt_tuesday"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,10 @@
 import unittest
+import io
 import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from unittest.mock import patch
 from src.module_loader import ModuleLoader
 from src.action_manager import ActionManager
 
@@ -43,6 +48,35 @@ class TestModuleLoader(unittest.TestCase):
         self.assertIsNotNone(retrieved_module)
         self.assertEqual(retrieved_module.id, "dnd5e")
 
+    def test_reload_reuses_unchanged_module(self):
+        print("Running test: test_reload_reuses_unchanged_module")
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        shutil.copytree(os.path.join("modules", "dnd5e"), os.path.join(directory, "dnd5e"))
+        loader = ModuleLoader(ActionManager(), modules_directory=directory)
+        with redirect_stdout(io.StringIO()):
+            module = loader.load_module("dnd5e")
+
+        with patch('src.module_loader.subprocess.run') as run:
+            with redirect_stdout(io.StringIO()):
+                self.assertIs(loader.load_module("dnd5e"), module)
+            run.assert_not_called()
+
+        # Editing a file loads the module again
+        rules_path = os.path.join(directory, "dnd5e", "rules.json")
+        with open(rules_path, 'a') as f:
+            f.write("\n")
+        with redirect_stdout(io.StringIO()):
+            reloaded = loader.load_module("dnd5e")
+        self.assertIsNot(reloaded, module)
+
+        # So does any other file a script might read, such as one it requires
+        with open(os.path.join(directory, "dnd5e", "scripts", "helpers.js"), 'w') as f:
+            f.write("module.exports = {};\n")
+        with redirect_stdout(io.StringIO()):
+            self.assertIsNot(loader.load_module("dnd5e"), reloaded)
+        self.assertIsNotNone(loader.action_manager.get_action("initiative"))
+
 if __name__ == '__main__':
     # We need to run tests from the root directory for paths to work
     # This can be run with `python3 -m unittest tests/test_module_loader.py`
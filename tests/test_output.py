@@ -0,0 +1,37 @@
+import unittest
+import io
+import sys
+import threading
+from contextlib import redirect_stdout
+from src.output import capture_output, command_failed
+
+
+class TestOutput(unittest.TestCase):
+
+    def test_capture_leaves_other_threads_alone(self):
+        print("Running test: test_capture_leaves_other_threads_alone")
+        console = io.StringIO()
+        command = io.StringIO()
+        with redirect_stdout(console):
+            with capture_output(command):
+                print("Moved object")
+                # A background save printing meanwhile
+                worker = threading.Thread(target=print, args=("Autosaved",))
+                worker.start()
+                worker.join()
+                with capture_output(io.StringIO()) as inner, capture_output(io.StringIO(), echo=True) as echoed:
+                    print("Nested")
+            self.assertIs(sys.stdout, console)
+        self.assertEqual(command.getvalue(), "Moved object\n")
+        self.assertEqual(console.getvalue(), "Autosaved\n")
+        self.assertEqual((inner.getvalue(), echoed.getvalue()), ("Nested\n", "Nested\n"))
+
+    def test_command_failed(self):
+        print("Running test: test_command_failed")
+        self.assertIsNone(command_failed("Moved object 1 to (2, 3) on map 'town'.\n"))
+        self.assertEqual(command_failed("Warning: slow\n  Error: Map 'x' not found.\n"), "Error: Map 'x' not found.")
+        self.assertEqual(command_failed("Usage: map view <map_name>"), "Usage: map view <map_name>")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,13 @@
 import unittest
+import io
 import os
+import tempfile
+from contextlib import redirect_stdout
+from unittest.mock import patch
 from src.engine import Engine
 from src.persistence import PersistenceManager
+from src.map_object import MapObject
+from src.token import Token
 
 class TestPersistence(unittest.TestCase):
 
@@ -63,5 +69,82 @@ class TestPersistence(unittest.TestCase):
         # 5. Clean up the save file
         os.remove(save_filepath)
 
+    def test_restore_keeps_active_module(self):
+        print("Running test: test_restore_keeps_active_module")
+        game_state = self.persistence_manager.gather_game_state(self.engine)
+        self.assertEqual(game_state['active_module_version'], "0.1.0")
+
+        with patch.object(self.engine, 'load_system_module', wraps=self.engine.load_system_module) as load:
+            with redirect_stdout(io.StringIO()):
+                self.persistence_manager.restore_game_state(self.engine, game_state)
+                load.assert_not_called()
+
+                # A different version is loaded, and the mismatch reported
+                game_state['active_module_version'] = "0.0.9"
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    self.persistence_manager.restore_game_state(self.engine, game_state)
+            load.assert_called_once_with("dnd5e")
+        self.assertIn("saved with dnd5e 0.0.9", output.getvalue())
+
+    def _campaign(self):
+        """Adds three maps, one of them an instance of another, and returns the save path."""
+        mm = self.engine.get_map_manager()
+        with redirect_stdout(io.StringIO()):
+            for name in ("town", "dungeon", "forest"):
+                game_map = mm.create_map(name, 30, 30)
+                game_map.add_objects([MapObject(x=i, y=i, layer=1) for i in range(20)])
+            mm.get_map("dungeon").add_object(Token(x=3, y=4, layer=4, entity_id=self.player.id))
+            mm.create_instance("dungeon", "dungeon_b")
+            mm.set_active_map("forest")
+        handle, path = tempfile.mkstemp(suffix=".vttb")
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_binary_save_round_trip(self):
+        print("Running test: test_binary_save_round_trip")
+        path = self._campaign()
+        original_state = self.persistence_manager.gather_game_state(self.engine)
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(self.persistence_manager.save_game(original_state, path))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(4), b'VTTB')
+
+        restored = Engine()
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(restored.load_game(path))
+        self.assertEqual(self.persistence_manager.gather_game_state(restored), original_state)
+
+    def test_binary_load_decodes_only_the_active_map(self):
+        print("Running test: test_binary_load_decodes_only_the_active_map")
+        path = self._campaign()
+        with redirect_stdout(io.StringIO()):
+            self.engine.save_game(path)
+            restored = Engine()
+            restored.load_game(path)
+
+        mm = restored.get_map_manager()
+        self.assertEqual(sorted(mm.list_maps()), ["dungeon", "dungeon_b", "forest", "town"])
+        self.assertEqual(mm.active_map_name, "forest")
+        self.assertEqual([n for n in mm.list_maps() if mm.is_loaded(n)], ["forest"])
+        self.assertEqual(restored.get_entity_manager().get_entity(self.player.id).attributes["hp"], 20)
+
+        # Building an instance builds its template, which stays locked
+        instance = mm.get_map("dungeon_b")
+        self.assertTrue(mm.is_loaded("dungeon"))
+        self.assertEqual(mm.get_map("dungeon").locked_by, ["dungeon_b"])
+        self.assertEqual(len(instance.objects), 21)
+        self.assertFalse(mm.is_loaded("town"))
+
+    def test_binary_load_rejects_other_files(self):
+        print("Running test: test_binary_load_rejects_other_files")
+        handle, path = tempfile.mkstemp(suffix=".vttb")
+        with os.fdopen(handle, 'wb') as f:
+            f.write(b'{"not": "binary"}')
+        self.addCleanup(os.remove, path)
+        with redirect_stdout(io.StringIO()):
+            self.assertIsNone(self.persistence_manager.load_game(path))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import asyncio
+import io
+from contextlib import redirect_stdout
+from src.server import DISCONNECT, RESYNC, SEND_ERROR_CLOSE_CODE, SLOW_CLIENT_CLOSE_CODE, SessionManager
+
+
+class GatedWebSocket:
+    """A websocket whose sends wait until its gate is opened, like a client on a slow link."""
+
+    def __init__(self, open_gate=True):
+        self.gate = asyncio.Event()
+        if open_gate:
+            self.gate.set()
+        self.received = []
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await self.gate.wait()
+        self.received.append(text)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+class FailingWebSocket(GatedWebSocket):
+    """A websocket whose sends raise the given error."""
+
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+
+    async def send_text(self, text):
+        raise self.error
+
+
+async def settle():
+    """Lets the writer tasks run until they are idle."""
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+class TestSessionManager(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.fast = GatedWebSocket()
+        self.slow = GatedWebSocket(open_gate=False)
+
+    async def _connect(self, manager):
+        await manager.connect(self.fast, "fast")
+        await manager.connect(self.slow, "slow")
+
+    async def test_a_slow_client_does_not_hold_up_the_others(self):
+        print("Running test: test_a_slow_client_does_not_hold_up_the_others")
+        manager = SessionManager(queue_size=8)
+        await self._connect(manager)
+        for i in range(5):
+            await manager.broadcast({"type": "chat", "payload": i})
+            await settle()
+        self.assertEqual(len(self.fast.received), 5)
+        self.assertEqual(self.slow.received, [])
+        self.assertEqual(self.fast.received[0], '{"type":"chat","payload":0}')
+
+        metrics = manager.metrics()
+        self.assertEqual(metrics['clients']['fast']['sent'], 5)
+        # The slow client's writer holds the first message while the rest wait
+        self.assertEqual(metrics['clients']['slow']['queued'], 4)
+        self.assertEqual(metrics['queued'], 4)
+
+        self.slow.gate.set()
+        await settle()
+        self.assertEqual(self.slow.received, self.fast.received)
+        self.assertEqual(manager.metrics()['queued'], 0)
+
+    async def test_a_client_that_falls_behind_gets_the_full_state(self):
+        print("Running test: test_a_client_that_falls_behind_gets_the_full_state")
+        manager = SessionManager(queue_size=3, slow_client_policy=RESYNC,
+                                 state_source=lambda: iter(["state 1", "state 2"]))
+        await self._connect(manager)
+        for i in range(5):
+            await manager.broadcast_text(f"delta {i}")
+            await settle()
+        self.slow.gate.set()
+        await settle()
+
+        self.assertEqual(self.fast.received, [f"delta {i}" for i in range(5)])
+        # The first delta was already being sent; the three waiting and the one
+        # that did not fit were replaced by the state
+        self.assertEqual(self.slow.received, ["delta 0", "state 1", "state 2"])
+        metrics = manager.metrics()['clients']['slow']
+        self.assertEqual((metrics['dropped'], metrics['resyncs'], metrics['max_queued']), (4, 1, 3))
+
+    async def test_a_client_that_falls_behind_can_be_disconnected(self):
+        print("Running test: test_a_client_that_falls_behind_can_be_disconnected")
+        manager = SessionManager(queue_size=2, slow_client_policy=DISCONNECT)
+        await self._connect(manager)
+        for i in range(4):
+            await manager.broadcast_text(f"delta {i}")
+            await settle()
+        self.assertEqual(list(manager.active_connections), ["fast"])
+        self.assertEqual(self.slow.close_code, SLOW_CLIENT_CLOSE_CODE)
+        self.assertEqual(manager.metrics()['slow_disconnects'], 1)
+        self.assertEqual(len(self.fast.received), 4)
+
+        with self.assertRaises(ValueError):
+            SessionManager(slow_client_policy=RESYNC)
+        # Clients are resynced by default, when there is a state to resync them with
+        self.assertEqual(SessionManager().slow_client_policy, DISCONNECT)
+        self.assertEqual(SessionManager(state_source=lambda: iter([])).slow_client_policy, RESYNC)
+
+    async def test_a_failed_send_closes_the_connection(self):
+        print("Running test: test_a_failed_send_closes_the_connection")
+        manager = SessionManager()
+        closed = FailingWebSocket(RuntimeError("Cannot call send once a close message has been sent."))
+        broken = FailingWebSocket(ValueError("Not JSON serializable"))
+        await manager.connect(closed, "closed")
+        await manager.connect(broken, "broken")
+        with redirect_stdout(io.StringIO()) as output:
+            await manager.broadcast_text("delta 0")
+            await settle()
+
+        # A connection that is already gone is left to the endpoint; any other error closes it
+        self.assertIsNone(closed.close_code)
+        self.assertEqual(broken.close_code, SEND_ERROR_CLOSE_CODE)
+        self.assertIn("Not JSON serializable", output.getvalue())
+        self.assertTrue(all(c.writer.done() for c in manager.active_connections.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
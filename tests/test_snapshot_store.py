@@ -0,0 +1,130 @@
+import unittest
+import io
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from src.engine import Engine
+from src.map_object import MapObject
+from src.snapshot_store import SnapshotStore
+from src.token import Token
+
+
+class TestSnapshotStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.engine = Engine()
+        em = self.engine.get_entity_manager()
+        self.hero = em.create_entity("character", {"name": "Hero", "hp": 20})
+        self.goblin = em.create_entity("npc", {"name": "Goblin", "hp": 7})
+        mm = self.engine.get_map_manager()
+        with redirect_stdout(io.StringIO()):
+            self.town = mm.create_map("town", 50, 50)
+            self.walls = [MapObject(x=i, y=i, layer=1) for i in range(30)]
+            self.town.add_objects(self.walls)
+            self.town.add_object(Token(x=5, y=6, layer=4, entity_id=self.hero.id))
+            mm.create_map("cave", 20, 20)
+            mm.create_instance("cave", "cave_b")
+        self.store = SnapshotStore(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _state(self, engine=None):
+        engine = engine or self.engine
+        return engine.get_persistence_manager().gather_game_state(engine)
+
+    def _blob_count(self):
+        return sum(len(files) for _, _, files in os.walk(self.store.objects_dir))
+
+    def test_saves_write_only_changed_content(self):
+        print("Running test: test_saves_write_only_changed_content")
+        self.store.save(self._state(), "start")
+        # 2 entities + the entity list, 31 objects + 3 maps
+        self.assertEqual(self.store.blobs_written, 37)
+
+        self.store.save(self._state())
+        self.assertEqual(self.store.blobs_written, 0)
+
+        self.town.move_object(self.walls[3].id, 40, 40)
+        self.engine.get_entity_manager().update_attribute(self.goblin.id, "hp", 3)
+        self.store.save(self._state(), "goblin hurt")
+        # The moved object and its map, the changed entity and the entity list
+        self.assertEqual(self.store.blobs_written, 4)
+        self.assertEqual(self._blob_count(), 41)
+        self.assertEqual([(s['id'], s['label']) for s in self.store.snapshots()],
+                         [(1, "start"), (2, ""), (3, "goblin hurt")])
+
+    def test_any_snapshot_can_be_restored(self):
+        print("Running test: test_any_snapshot_can_be_restored")
+        first_state = self._state()
+        self.store.save(first_state)
+        self.town.remove_object(self.walls[0].id)
+        self.engine.get_entity_manager().update_attribute(self.hero.id, "hp", 12)
+        latest_state = self._state()
+        self.store.save(latest_state)
+
+        for snapshot_id, expected in ((1, first_state), (None, latest_state)):
+            restored = Engine()
+            with redirect_stdout(io.StringIO()):
+                restored.load_game_from_dict(self.store.load(snapshot_id))
+            self.assertFalse(restored.get_map_manager().is_loaded("town"))
+            self.assertEqual(self._state(restored), expected)
+
+        with self.assertRaises(KeyError):
+            self.store.load(7)
+
+    def test_gc_removes_unreferenced_blobs(self):
+        print("Running test: test_gc_removes_unreferenced_blobs")
+        self.store.save(self._state())
+        for step in range(3):
+            self.town.move_object(self.walls[0].id, 10 + step, 20)
+            self.store.save(self._state())
+        before = self._blob_count()
+
+        for keep in (0, -1):
+            with self.assertRaises(ValueError):
+                self.store.gc(keep)
+        self.assertEqual(len(self.store.snapshots()), 4)
+
+        self.assertEqual(self.store.gc(keep=2), (2, 4))  # Two old positions of the wall and two old town maps
+        self.assertEqual(self._blob_count(), before - 4)
+        self.assertEqual([s['id'] for s in self.store.snapshots()], [3, 4])
+        self.assertEqual(self.store.load(3)['map_manager']['maps']['town'].load()['objects'][0]['x'], 11)
+
+        # A blob deleted by gc is written again if the content comes back
+        self.town.move_object(self.walls[0].id, 0, 0)
+        self.store.save(self._state())
+        self.assertEqual(self.store.blobs_written, 2)
+
+    def test_chunked_maps_are_not_kept(self):
+        print("Running test: test_chunked_maps_are_not_kept")
+        store_dir = os.path.join(self.directory, "world")
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.engine.get_map_manager().create_chunked_map("world", 100, 100, store_dir, chunk_size=10)
+            self.engine.execute_command(f"history save {self.directory}")
+        self.assertIn("Map 'world' is a chunked map; chunked maps cannot be kept in a save history.", output.getvalue())
+        self.assertEqual(self.store.snapshots(), [])
+        self.assertEqual(self._blob_count(), 0)
+
+    def test_history_commands(self):
+        print("Running test: test_history_commands")
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.engine.execute_command(f"history save {self.directory} before the ambush")
+            self.engine.get_entity_manager().update_attribute(self.hero.id, "hp", 1)
+            self.engine.execute_command(f"history save {self.directory}")
+            self.engine.execute_command(f"history list {self.directory}")
+            self.engine.execute_command(f"history restore {self.directory} 1")
+            self.engine.execute_command(f"history prune {self.directory} -1")
+        self.assertIn("before the ambush", output.getvalue())
+        self.assertIn("Error: At least one snapshot must be kept, not -1.", output.getvalue())
+        self.assertEqual(len(self.store.snapshots()), 2)
+        self.assertIn(f"Game restored from {self.directory}.", output.getvalue())
+        self.assertEqual(self.engine.get_entity_manager().get_attribute(self.hero.id, "hp"), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import io
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from src.engine import Engine
+from src.map_object import MapObject
+from src.sqlite_store import SQLiteStore
+from src.token import Token
+from src.trigger import Trigger
+
+
+class TestSQLiteStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "campaign.db")
+        self.engine = Engine()
+        em = self.engine.get_entity_manager()
+        self.hero = em.create_entity("character", {"name": "Hero", "hp": 20})
+        self.goblin = em.create_entity("npc", {"name": "Goblin", "hp": 7})
+        self.engine.get_initiative_tracker().add_combatant(self.hero.id, 12)
+
+        mm = self.engine.get_map_manager()
+        with redirect_stdout(io.StringIO()):
+            self.town = mm.create_map("town", 50, 50)
+            self.walls = [MapObject(x=i, y=i, layer=1) for i in range(30)]
+            self.town.add_objects(self.walls)
+            self.token = Token(x=5, y=6, layer=4, entity_id=self.hero.id)
+            self.town.add_object(self.token)
+            cave = mm.create_map("cave", 20, 20)
+            cave.add_object(Token(x=1, y=1, layer=4, entity_id=self.goblin.id))
+            mm.create_instance("cave", "cave_b")
+
+    def tearDown(self):
+        for store in self.engine.get_persistence_manager()._stores.values():
+            store.close()
+        shutil.rmtree(self.directory)
+
+    def _save(self):
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(self.engine.save_game(self.path))
+        return self.engine.get_persistence_manager().store(self.path).rows_written
+
+    def test_round_trip_with_deferred_maps(self):
+        print("Running test: test_round_trip_with_deferred_maps")
+        self._save()
+        original_state = self.engine.get_persistence_manager().gather_game_state(self.engine)
+
+        restored = Engine()
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(restored.load_game(self.path))
+        mm = restored.get_map_manager()
+        # cave_b was the active map, so it and its template are built; town waits
+        self.assertEqual(mm.active_map_name, "cave_b")
+        self.assertFalse(mm.is_loaded("town"))
+        self.assertEqual(mm.get_map("cave").locked_by, ["cave_b"])
+        self.assertEqual(restored.get_persistence_manager().gather_game_state(restored), original_state)
+        for store in restored.get_persistence_manager()._stores.values():
+            store.close()
+
+    def test_saves_write_only_dirty_rows(self):
+        print("Running test: test_saves_write_only_dirty_rows")
+        first = self._save()
+        self.assertEqual(first, 2 + 1 + 3 + 32)  # entities, tracker entry, maps, objects
+
+        self.assertEqual(self._save() - first, 0)
+
+        self.town.move_object(self.walls[3].id, 40, 40)
+        self.engine.get_entity_manager().update_attribute(self.goblin.id, "hp", 3)
+        self.assertEqual(self._save() - first, 2)
+
+        # Removing an early object deletes its row without renumbering the rest
+        self.town.remove_object(self.walls[0].id)
+        self.assertEqual(self._save() - first, 3)
+
+        store = SQLiteStore(self.path)
+        self.assertEqual([o['id'] for o in store.load_map("town")['objects']],
+                         [o.id for o in self.town.objects])
+        store.close()
+
+    def test_trigger_changes_are_saved(self):
+        print("Running test: test_trigger_changes_are_saved")
+        self._save()
+        pit = self.town.add_trigger(Trigger(x=2, y=2, width=2, height=2, name="Pit"))
+        self._save()
+
+        restored = Engine()
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(restored.load_game(self.path))
+        self.assertEqual([t.id for t in restored.get_map_manager().get_map("town").triggers], [pit.id])
+        for store in restored.get_persistence_manager()._stores.values():
+            store.close()
+
+        self.town.remove_trigger(pit.id)
+        self._save()
+        store = SQLiteStore(self.path)
+        self.assertEqual(store.load_map("town").get('triggers', []), [])
+        store.close()
+
+    def test_queries_without_loading(self):
+        print("Running test: test_queries_without_loading")
+        self._save()
+        store = SQLiteStore(self.path)
+        self.assertEqual(store.map_names(), ["town", "cave", "cave_b"])
+        self.assertEqual(store.count_objects("town"), 31)
+        self.assertEqual(store.load_entity(self.goblin.id)["attributes"]["hp"], 7)
+        self.assertIsNone(store.load_entity("missing"))
+
+        found = store.objects_in_rect("town", 4, 4, 6, 6)
+        self.assertEqual([o['id'] for o in found], [self.walls[4].id, self.walls[5].id, self.walls[6].id, self.token.id])
+        self.assertEqual([(m, o['id']) for m, o in store.tokens_of_entity(self.hero.id)], [("town", self.token.id)])
+        with self.assertRaises(KeyError):
+            store.load_map("nowhere")
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
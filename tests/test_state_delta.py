@@ -0,0 +1,141 @@
+import unittest
+import io
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+from fastapi.testclient import TestClient
+from src.engine import Engine
+from src.fragments import encode
+from src.map_object import MapObject
+from src.server import COMMAND_OUTPUT, create_app
+from src.state_delta import STATE_DELTA, DeltaTracker, apply_delta
+from src.state_stream import StateAssembler
+from src.token import Token
+from src.trigger import Trigger
+from src.user import User, UserRole
+
+
+class TestStateDelta(unittest.TestCase):
+
+    def setUp(self):
+        self.server = Engine()
+        em = self.server.get_entity_manager()
+        self.hero = em.create_entity("character", {"name": "Hero", "hp": 20})
+        mm = self.server.get_map_manager()
+        with redirect_stdout(io.StringIO()):
+            town = mm.create_map("town", 20, 20)
+            self.token = Token(x=1, y=1, layer=4, entity_id=self.hero.id)
+            self.walls = [MapObject(x=i, y=0, layer=1) for i in range(5)]
+            town.add_objects([self.token] + self.walls)
+            mm.create_map("cave", 10, 10).add_object(MapObject(x=2, y=2, layer=1))
+            mm.create_instance("cave", "cave_b")
+            mm.set_active_map("town")
+        self.gm = User("GM", UserRole.GM)
+        self.tracker = DeltaTracker(self.server)
+        self.client = Engine()
+        with redirect_stdout(io.StringIO()):
+            self.client.load_game_from_dict(self._state(self.server))
+
+    def _state(self, engine):
+        return json.loads(encode(engine.get_persistence_manager().gather_game_state(engine)))
+
+    def _sync(self, *commands):
+        """Runs commands on the server and applies the resulting delta, sent as JSON, to the client."""
+        with redirect_stdout(io.StringIO()):
+            for command in commands:
+                self.server.execute_command(command, self.gm)
+            delta = self.tracker.take()
+            if delta is not None:
+                delta = json.loads(encode(delta))
+                self.assertNotIn('resync', delta)
+                apply_delta(self.client, delta)
+        self.assertEqual(self._state(self.client), self._state(self.server))
+        return delta
+
+    def test_deltas_keep_a_copy_in_sync(self):
+        print("Running test: test_deltas_keep_a_copy_in_sync")
+        town = self.server.get_map_manager().get_map("town")
+        delta = self._sync(f"object move {self.token.id} town 5 5")
+        self.assertEqual(delta['seq'], 1)
+        self.assertEqual(delta['maps'], {'town': {'version': town.version, 'changed': [self.token.to_dict()], 'removed': []}})
+        self.assertEqual(set(delta), {'seq', 'maps'})
+
+        # Changes made outside commands are picked up as well
+        self.server.get_entity_manager().update_attribute(self.hero.id, "hp", 12)
+        delta = self._sync()
+        self.assertEqual(delta['entities'], [self.hero.to_dict()])
+
+        self._sync("object fill # town 0 10 3 10 1")
+        self._sync(f"group create town {self.walls[0].id} {self.walls[1].id}", f"object remove {self.walls[2].id} town")
+        self._sync(f"object move {self.walls[1].id} town 7 7", f"object remove {self.walls[0].id} town")
+        self._sync("create char Goblin hp=7", "add Hero")
+        self._sync("object place X cave_b 5 5 1", "object clear cave_b 2 2 2 2")
+        delta = self._sync("map create dungeon 8 8", "object place D dungeon 1 1 1")
+        self.assertEqual(list(delta['maps_added']), ["dungeon"])
+        self.assertEqual(delta['active_map_name'], "dungeon")
+        self.assertIsNone(self._sync("map list", "status"))
+
+    def test_trigger_reactions_run_once(self):
+        print("Running test: test_trigger_reactions_run_once")
+        town = self.server.get_map_manager().get_map("town")
+        delta = self._sync()
+        self.assertIsNone(delta)
+        town.add_trigger(Trigger(x=8, y=8, width=2, height=2, on_enter="create char Goblin hp=7"))
+        self.assertEqual(len(self._sync()['maps']['town']['triggers']), 1)
+
+        # The server runs the reaction; the client only receives the goblin it created
+        delta = self._sync(f"object move {self.token.id} town 8 8")
+        self.assertEqual([e['attributes']['name'] for e in delta['entities']], ["Goblin"])
+        self.assertEqual(len(self.client.get_entity_manager().list_entities()), 2)
+
+    def test_other_changes_ask_for_the_full_state(self):
+        print("Running test: test_other_changes_ask_for_the_full_state")
+        with tempfile.TemporaryDirectory() as tmp:
+            save_path = os.path.join(tmp, "session.json")
+            with redirect_stdout(io.StringIO()):
+                self.server.execute_command(f"save {save_path}", self.gm)
+            self.assertIsNone(self.tracker.take())
+            for command in ("terrain rect town 0 0 1 1 cost=2", "map delete cave_b", f"load {save_path}"):
+                with redirect_stdout(io.StringIO()):
+                    self.server.execute_command(command, self.gm)
+                delta = self.tracker.take()
+                self.assertTrue(delta['resync'], command)
+        self.assertEqual(delta['seq'], 3)
+        self.assertIsNone(self.tracker.take())
+
+    def test_server_sends_deltas_instead_of_commands(self):
+        print("Running test: test_server_sends_deltas_instead_of_commands")
+        app = create_app(self.server)
+        client = Engine()
+        assembler = StateAssembler(client)
+        with redirect_stdout(io.StringIO()), TestClient(app) as http, http.websocket_connect("/ws/gm") as websocket:
+            while not assembler.complete:
+                message = websocket.receive_json()
+                assembler.feed(message['type'], message['payload'])
+            websocket.send_text(f"object move {self.token.id} town 3 3")
+            message = websocket.receive_json()
+            while message['type'] != STATE_DELTA:
+                message = websocket.receive_json()
+            self.assertEqual(message['payload']['seq'], assembler.seq + 1)
+            apply_delta(client, message['payload'])
+            self.assertEqual(self._state(client), self._state(self.server))
+            # What the command printed comes back to its sender after the changes
+            message = websocket.receive_json()
+            self.assertEqual(message['type'], COMMAND_OUTPUT)
+            self.assertEqual(message['payload'], f"Moved object {self.token.id} to (3, 3) on map 'town'.\n")
+
+            # A terrain edit is sent as a new transfer of the full state
+            websocket.send_text("terrain fill town cost=3")
+            message = websocket.receive_json()
+            self.assertEqual(message['type'], 'state_begin')
+            assembler.feed(message['type'], message['payload'])
+            while not assembler.complete:
+                message = websocket.receive_json()
+                assembler.feed(message['type'], message['payload'])
+            self.assertEqual(websocket.receive_json()['type'], COMMAND_OUTPUT)
+        self.assertEqual(self._state(client), self._state(self.server))
+
+
+if __name__ == '__main__':
+    unittest.main()
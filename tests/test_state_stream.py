@@ -0,0 +1,131 @@
+import unittest
+import io
+import json
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from fastapi.testclient import TestClient
+from src.engine import Engine
+from src.map import Map
+from src.map_object import MapObject
+from src.server import create_app
+from src.state_stream import StateAssembler, stream_game_state
+from src.token import Token
+
+
+class TestStateStream(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = Engine()
+        em = self.engine.get_entity_manager()
+        self.heroes = [em.create_entity("character", {"name": f"Hero{i}", "hp": 20}) for i in range(40)]
+        self.engine.get_initiative_tracker().add_combatant(self.heroes[0].id, 12)
+        mm = self.engine.get_map_manager()
+        with redirect_stdout(io.StringIO()):
+            for name in ("town", "cave", "forest"):
+                game_map = mm.create_map(name, 40, 40)
+                game_map.add_objects([MapObject(x=i, y=i % 40, layer=1) for i in range(60)])
+            mm.get_map("cave").add_object(Token(x=3, y=4, layer=4, entity_id=self.heroes[0].id))
+            mm.create_instance("cave", "cave_b")
+            mm.create_instance("town", "town_b")
+            mm.set_active_map("cave_b")
+
+    def _state(self, engine):
+        return json.loads(json.dumps(engine.get_persistence_manager().gather_game_state(engine)))
+
+    def test_messages_come_in_order_and_within_the_limit(self):
+        print("Running test: test_messages_come_in_order_and_within_the_limit")
+        game_state = self.engine.get_persistence_manager().gather_game_state(self.engine)
+        messages = list(stream_game_state(game_state, transfer=3, max_message_size=2048))
+        self.assertTrue(all(len(message) <= 2048 for message in messages))
+
+        decoded = [json.loads(message) for message in messages]
+        self.assertTrue(all(m['payload']['transfer'] == 3 for m in decoded))
+        outline = [(m['type'], m['payload'].get('name')) for m in decoded
+                   if m['type'] in ('state_begin', 'state_map', 'state_end')]
+        self.assertEqual(outline, [("state_begin", None), ("state_map", "cave"), ("state_map", "cave_b"),
+                                   ("state_map", "town"), ("state_map", "forest"), ("state_map", "town_b"),
+                                   ("state_end", None)])
+        first_entities = next(i for i, m in enumerate(decoded) if m['type'] == 'state_entities')
+        town = next(i for i, m in enumerate(decoded) if m['payload'].get('name') == 'town')
+        self.assertLess(first_entities, town)
+        self.assertEqual(sum(len(m['payload']['objects']) for m in decoded if m['type'] == 'state_objects'), 61 + 60 + 60)
+
+        with self.assertRaises(ValueError):
+            list(stream_game_state(game_state, max_message_size=20))
+
+    def test_client_is_ready_once_the_active_map_arrives(self):
+        print("Running test: test_client_is_ready_once_the_active_map_arrives")
+        game_state = self.engine.get_persistence_manager().gather_game_state(self.engine)
+        messages = [json.loads(m) for m in stream_game_state(game_state, transfer=1, max_message_size=4096)]
+        client = Engine()
+        assembler = StateAssembler(client)
+        mm = client.get_map_manager()
+        with redirect_stdout(io.StringIO()):
+            for message in messages:
+                if message['type'] == 'state_entities':
+                    # The active map can be shown before the entities and other maps arrive
+                    self.assertTrue(assembler.ready)
+                    self.assertEqual(mm.get_active_map().name, "cave_b")
+                    self.assertEqual(len(mm.get_active_map().objects), 61)
+                    self.assertEqual(mm.list_maps(), ["cave", "cave_b"])
+                assembler.feed(message['type'], message['payload'])
+
+        self.assertTrue(assembler.complete)
+        self.assertFalse(mm.is_loaded("forest"))
+        self.assertEqual(mm.get_map("town").locked_by, ["town_b"])
+        self.assertEqual(self._state(client), self._state(self.engine))
+
+        # Once a newer transfer has begun, messages of the older one are ignored
+        with redirect_stdout(io.StringIO()):
+            assembler.feed('state_begin', dict(messages[0]['payload'], transfer=2))
+            for message in messages[1:]:
+                assembler.feed(message['type'], message['payload'])
+        self.assertTrue(assembler.in_progress)
+        self.assertFalse(assembler.ready)
+
+    def test_chunked_maps_are_sent_inline(self):
+        print("Running test: test_chunked_maps_are_sent_inline")
+        store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store_dir)
+        with redirect_stdout(io.StringIO()):
+            world = self.engine.get_map_manager().create_chunked_map("world", 100, 100, store_dir, chunk_size=10)
+        rock = MapObject(x=55, y=5, layer=1)
+        crate = MapObject(x=5, y=5, layer=1)
+        world.add_objects([rock, crate])
+        world.terrain.set_cell(95, 95, blocks_movement=True)
+        world.flush()
+
+        game_state = self.engine.get_persistence_manager().gather_game_state(self.engine, inline_chunked=True)
+        client = Engine()
+        assembler = StateAssembler(client)
+        with redirect_stdout(io.StringIO()):
+            for message in stream_game_state(game_state, max_message_size=4096):
+                message = json.loads(message)
+                assembler.feed(message['type'], message['payload'])
+        # The client holds the map itself, not a reference to the server's chunk store
+        copy = client.get_map_manager().get_map("world")
+        self.assertIsInstance(copy, Map)
+        self.assertEqual([o.id for o in copy.iter_draw_order()], [rock.id, crate.id])
+        self.assertTrue(copy.terrain.blocks_movement(95, 95))
+        self.assertFalse(copy.terrain.blocks_movement(94, 95))
+        # Saves still only reference the store
+        self.assertEqual(self._state(self.engine)['map_manager']['maps']['world']['store_dir'], store_dir)
+
+    def test_server_streams_state_to_new_clients(self):
+        print("Running test: test_server_streams_state_to_new_clients")
+        app = create_app(self.engine, max_message_size=4096)
+        client = Engine()
+        assembler = StateAssembler(client)
+        with redirect_stdout(io.StringIO()), TestClient(app) as http, http.websocket_connect("/ws/gm") as websocket:
+            while not assembler.complete:
+                message = websocket.receive_json()
+                assembler.feed(message['type'], message['payload'])
+            metrics = http.get("/metrics").json()
+        self.assertEqual(self._state(client), self._state(self.engine))
+        self.assertEqual(list(metrics['clients']), ["gm"])
+        self.assertEqual(metrics['resyncs'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+from src.map import Map, GridType
+from src.map_object import MapObject
+from src.terrain import TerrainLayer
+from src.pathfinding import find_path
+import src.fov as fov
+
+class TestTerrain(unittest.TestCase):
+
+    def test_bulk_operations(self):
+        print("Running test: test_bulk_operations")
+        terrain = TerrainLayer(10, 10)
+        self.assertTrue(terrain.is_default())
+
+        count = terrain.fill_rect(2, 2, 4, 3, cost=3)
+        self.assertEqual(count, 6)
+        self.assertEqual(terrain.get_cost(3, 3), 3)
+        self.assertEqual(terrain.get_cost(5, 3), 1)
+
+        # Clipped to the layer bounds
+        self.assertEqual(terrain.fill_rect(8, 8, 20, 20, blocks_movement=True), 4)
+        self.assertTrue(terrain.blocks_movement(9, 9))
+        self.assertFalse(terrain.blocks_movement(10, 10))
+
+        # Setting one property leaves the others untouched
+        terrain.set_cell(3, 3, blocks_light=True)
+        self.assertEqual(terrain.get_cost(3, 3), 3)
+        self.assertTrue(terrain.blocks_light(3, 3))
+
+        with self.assertRaises(ValueError):
+            terrain.fill(cost=0)
+
+    def test_flood_fill(self):
+        print("Running test: test_flood_fill")
+        terrain = TerrainLayer(5, 5)
+        # A wall splitting the map into two halves
+        terrain.fill_rect(2, 0, 2, 4, blocks_movement=True)
+
+        count = terrain.flood_fill(0, 0, cost=2)
+        self.assertEqual(count, 10)
+        self.assertEqual(terrain.get_cost(1, 4), 2)
+        self.assertEqual(terrain.get_cost(3, 0), 1)
+        self.assertTrue(terrain.blocks_movement(2, 2))
+
+    def test_map_serialization(self):
+        print("Running test: test_map_serialization")
+        game_map = Map(name="swamp", width=30, height=20, grid_type=GridType.HEX)
+        self.assertNotIn('terrain', game_map.to_dict())
+
+        game_map.terrain.fill_rect(0, 0, 9, 9, cost=2)
+        game_map.terrain.set_cell(15, 15, blocks_movement=True, blocks_light=True)
+
+        data = game_map.to_dict()
+        self.assertIn('terrain', data)
+        # The compressed grid is much smaller than one entry per cell
+        self.assertLess(len(data['terrain']['data']), 30 * 20)
+
+        new_map = Map.from_dict(data)
+        self.assertTrue(new_map.terrain.hex_layout)
+        self.assertEqual(new_map.terrain.get_cost(5, 5), 2)
+        self.assertTrue(new_map.terrain.blocks_light(15, 15))
+        self.assertTrue((new_map.terrain.cells == game_map.terrain.cells).all())
+
+    def test_fov_respects_opaque_terrain(self):
+        print("Running test: test_fov_respects_opaque_terrain")
+        game_map = Map(name="hall", width=10, height=10)
+        game_map.terrain.fill_rect(5, 0, 5, 9, blocks_light=True)
+
+        visible = fov.calculate_fov(game_map, 2, 5, 8)
+        self.assertIn((5, 5), visible)      # The wall itself is seen
+        self.assertNotIn((7, 5), visible)   # But nothing behind it
+
+        # Opaque objects still block as before
+        game_map.terrain.fill(blocks_light=False)
+        game_map.add_object(MapObject(x=5, y=5, layer=1, blocks_light=True))
+        visible = fov.calculate_fov(game_map, 2, 5, 8)
+        self.assertNotIn((7, 5), visible)
+
+    def test_find_path_square(self):
+        print("Running test: test_find_path_square")
+        game_map = Map(name="maze", width=5, height=5)
+        game_map.terrain.fill_rect(2, 0, 2, 3, blocks_movement=True)
+
+        path, cost = find_path(game_map, (0, 0), (4, 0))
+        self.assertEqual(path[0], (0, 0))
+        self.assertEqual(path[-1], (4, 0))
+        self.assertIn((2, 4), path)  # The only gap in the wall
+        self.assertEqual(cost, len(path) - 1)
+
+        # The route pays the cost of every cell it enters
+        game_map.terrain.set_cell(2, 4, cost=10)
+        self.assertEqual(find_path(game_map, (0, 0), (4, 0))[1], 10 + 7)
+
+        game_map.terrain.set_cell(2, 4, blocks_movement=True)
+        self.assertIsNone(find_path(game_map, (0, 0), (4, 0)))
+
+    def test_find_path_hex(self):
+        print("Running test: test_find_path_hex")
+        game_map = Map(name="hexes", width=6, height=6, grid_type=GridType.HEX)
+        path, cost = find_path(game_map, (0, 0), (5, 0))
+        self.assertEqual(cost, 5)
+        self.assertEqual(len(path), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
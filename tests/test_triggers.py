@@ -0,0 +1,145 @@
+import unittest
+from src.engine import Engine
+from src.map import Map
+from src.map_events import TriggerFired
+from src.map_instance import MapInstance
+from src.map_object import MapObject
+from src.token import Token
+from src.trigger import Trigger
+from src.user import User, UserRole
+
+
+class TestTriggers(unittest.TestCase):
+
+    def setUp(self):
+        self.game_map = Map(name="dungeon", width=20, height=20)
+        self.fired = []
+        self.game_map.subscribe(
+            lambda e: self.fired.append((e.trigger_id, e.event, e.object_id)) if isinstance(e, TriggerFired) else None
+        )
+
+    def test_enter_and_leave(self):
+        print("Running test: test_enter_and_leave")
+        pit = self.game_map.add_trigger(Trigger(x=5, y=5, width=2, height=2))
+        hero = Token(x=0, y=0, layer=4, entity_id="hero")
+        self.game_map.add_object(hero)
+
+        self.game_map.move_object(hero.id, 6, 6)
+        self.game_map.move_object(hero.id, 5, 6)  # Still inside: nothing fires
+        self.game_map.move_object(hero.id, 10, 10)
+        self.assertEqual(self.fired, [(pit.id, 'enter', hero.id), (pit.id, 'leave', hero.id)])
+
+        # A large token enters as soon as any of its cells overlaps
+        ogre = Token(x=3, y=3, layer=4, entity_id="ogre", size=2)
+        self.game_map.add_object(ogre)
+        self.game_map.move_object(ogre.id, 4, 4)
+        self.assertEqual(self.fired[-1], (pit.id, 'enter', ogre.id))
+        self.assertEqual(self.game_map.trigger_occupants(pit.id), {ogre.id})
+
+        # Removing a token drops it quietly; triggers do not count as map changes
+        version = self.game_map.version
+        self.game_map.remove_object(ogre.id)
+        self.assertEqual(self.game_map.trigger_occupants(pit.id), set())
+        self.assertEqual(len(self.fired), 3)
+        self.assertEqual(self.game_map.version, version + 1)
+
+    def test_existing_occupants_do_not_fire(self):
+        print("Running test: test_existing_occupants_do_not_fire")
+        hero = Token(x=1, y=1, layer=4, entity_id="hero")
+        crate = MapObject(x=2, y=2, layer=1)
+        self.game_map.add_objects([hero, crate])
+        zone = self.game_map.add_trigger(Trigger(x=0, y=0, width=4, height=4))
+        self.assertEqual(self.game_map.trigger_occupants(zone.id), {hero.id})
+
+        # Only tokens set triggers off
+        self.game_map.move_object(crate.id, 10, 10)
+        self.game_map.move_object(hero.id, 2, 2)
+        self.assertEqual(self.fired, [])
+
+    def test_aura_follows_its_object(self):
+        print("Running test: test_aura_follows_its_object")
+        paladin = Token(x=5, y=5, layer=4, entity_id="paladin")
+        ally = Token(x=7, y=5, layer=4, entity_id="ally")
+        self.game_map.add_objects([paladin, ally])
+        aura = self.game_map.add_trigger(Trigger(x=0, y=0, radius=2, attached_to=paladin.id))
+        self.assertEqual(self.game_map.trigger_occupants(aura.id), {ally.id})
+
+        # The aura leaves the ally behind, then catches up with it
+        self.game_map.move_object(paladin.id, 2, 5)
+        self.game_map.move_object(paladin.id, 8, 6)
+        self.assertEqual(self.fired, [(aura.id, 'leave', ally.id), (aura.id, 'enter', ally.id)])
+
+        # Auras go away with their object
+        self.game_map.remove_object(paladin.id)
+        self.assertEqual(self.game_map.triggers, [])
+
+    def test_moves_only_check_overlapping_triggers(self):
+        print("Running test: test_moves_only_check_overlapping_triggers")
+        for i in range(10):
+            self.game_map.add_trigger(Trigger(x=i * 2, y=15, width=2, height=2))
+        hero = Token(x=0, y=0, layer=4, entity_id="hero")
+        self.game_map.add_object(hero)
+
+        checked = []
+        settle = self.game_map._settle
+        self.game_map._settle = lambda trigger, token: (checked.append(trigger.id), settle(trigger, token))
+        self.game_map.move_object(hero.id, 4, 16)
+        self.assertEqual(len(checked), 1)
+        self.game_map.move_object(hero.id, 6, 16)
+        self.assertEqual(len(checked), 3)
+
+    def test_triggers_are_saved(self):
+        print("Running test: test_triggers_are_saved")
+        paladin = Token(x=5, y=5, layer=4, entity_id="paladin")
+        self.game_map.add_object(paladin)
+        self.game_map.add_trigger(Trigger(x=1, y=1, width=3, height=1, on_enter="roll 1d6", name="Spikes"))
+        self.game_map.add_trigger(Trigger(x=0, y=0, radius=3, attached_to=paladin.id, on_leave="status"))
+
+        loaded = Map.from_dict(self.game_map.to_dict())
+        self.assertEqual(loaded.triggers, self.game_map.triggers)
+        self.assertNotIn('triggers', Map(name="empty", width=2, height=2).to_dict())
+
+        # Instances start with the template's triggers and save their own list
+        instance = MapInstance.from_template(loaded, "copy")
+        instance.remove_trigger(instance.triggers[0].id)
+        restored = MapInstance.from_dict(instance.to_dict(), loaded)
+        self.assertEqual([t.name for t in restored.triggers], [""])
+        self.assertEqual(len(loaded.triggers), 2)
+
+
+class TestTriggerDispatch(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = Engine()
+        self.engine.current_user = User("GM", UserRole.GM)
+        self.handler = self.engine.get_command_handler()
+        self.map_manager = self.engine.get_map_manager()
+        self.game_map = self.map_manager.create_map("dungeon", 20, 20)
+        self.hero = self.engine.get_entity_manager().create_entity("character", {"name": "Hero", "hp": 10})
+        self.token = Token(x=0, y=0, layer=4, entity_id=self.hero.id)
+        self.map_manager.add_object_to_map("dungeon", self.token)
+
+    def test_command_reaction(self):
+        print("Running test: test_command_reaction")
+        self.handler.handle_command("trigger", ["add", "dungeon", "5", "5", "1", "1",
+                                                "enter=object remove {token} {map}", "name=Pit"])
+        self.assertEqual(len(self.game_map.triggers), 1)
+
+        self.map_manager.move_object("dungeon", self.token.id, 5, 5)
+        self.assertIsNone(self.game_map.get_object(self.token.id))
+
+    def test_action_reaction(self):
+        print("Running test: test_action_reaction")
+        self.engine.get_action_manager().register_action(
+            {"id": "spikes", "formula": "1d1", "onSuccess": "damage(actor, 3)"}
+        )
+        self.handler.handle_command("trigger", ["aura", "dungeon", self.token.id, "1", "leave=action:spikes"])
+        self.handler.handle_command("trigger", ["add", "dungeon", "3", "0", "1", "1", "leave=action:spikes"])
+
+        self.map_manager.move_object("dungeon", self.token.id, 3, 0)
+        self.map_manager.move_object("dungeon", self.token.id, 4, 0)
+        self.assertEqual(self.hero.attributes["hp"], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()